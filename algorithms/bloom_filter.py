@@ -0,0 +1,71 @@
+import hashlib
+import math
+
+class BloomFilter:
+    """
+    Bloom filter of strings: a set that answers "definitely absent" or
+    "probably present", in constant memory.
+
+    The bit array and the number of hash functions are derived from the
+    expected number of items and the acceptable false positive rate. The k
+    bit positions of an item come from one BLAKE2b digest split into two
+    64-bit halves (double hashing: h1 + i * h2).
+
+    add() is not thread-safe: callers that add from several threads must
+    serialize adds. Membership tests can run concurrently with them.
+    """
+    def __init__(self, capacity, fp_rate):
+        """
+        Args:
+            capacity (int): Number of items the filter is sized for.
+            fp_rate (float): False positive rate at capacity, e.g. 0.001.
+        """
+        if capacity <= 0:
+            raise ValueError("Bloom filter capacity must be positive.")
+        if not 0 < fp_rate < 1:
+            raise ValueError("Bloom filter false positive rate must be between 0 and 1.")
+
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.bit_count = max(8, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.bit_count + 7) // 8)
+
+    def add(self, item):
+        """Adds an item to the filter."""
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, items):
+        """Adds every item of an iterable to the filter."""
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item):
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def size_bytes(self):
+        """Memory used by the bit array."""
+        return len(self._bits)
+
+    def estimated_fp_rate(self):
+        """False positive rate expected at the current number of items."""
+        return (1 - math.exp(-self.hash_count * self.count / self.bit_count)) ** self.hash_count
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1  # Odd, so the k positions never collapse
+        bit_count = self.bit_count
+        return [(h1 + i * h2) % bit_count for i in range(self.hash_count)]
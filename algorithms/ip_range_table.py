@@ -0,0 +1,152 @@
+import ipaddress
+import mmap
+import struct
+
+# File layout (all integers big-endian):
+#   header    : magic, IPv4 range count, IPv6 range count, location count, string blob size
+#   IPv4      : (start u32, end u32, location index u32) sorted by start
+#   IPv6      : (start 16 bytes, end 16 bytes, location index u32) sorted by start
+#   locations : (string offset u32, country length u16, city length u16)
+#   strings   : UTF-8 country and city names, deduplicated
+MAGIC = b'KPGEOIP1'
+HEADER = struct.Struct('>8sIIII')
+IPV4_RECORD = struct.Struct('>III')
+IPV6_RECORD = struct.Struct('>16s16sI')
+LOCATION_RECORD = struct.Struct('>IHH')
+
+def write_table(path, ranges):
+    """
+    Writes IP ranges to the compact binary format read by IpRangeTable.
+
+    Args:
+        path (str): Destination file.
+        ranges (iterable): (start_ip, end_ip, country, city) tuples, in any order.
+
+    Returns:
+        tuple: The number of IPv4 and IPv6 ranges written.
+
+    Raises:
+        ValueError: If a range is malformed or overlaps another one.
+    """
+    v4, v6 = [], []
+    locations = {}
+    for start_ip, end_ip, country, city in ranges:
+        start = ipaddress.ip_address(start_ip.strip())
+        end = ipaddress.ip_address(end_ip.strip())
+        if start.version != end.version:
+            raise ValueError(f"Mixed IP versions in range {start_ip} - {end_ip}")
+        if int(start) > int(end):
+            raise ValueError(f"Range start is after its end: {start_ip} - {end_ip}")
+        location = ((country or '').strip(), (city or '').strip())
+        index = locations.setdefault(location, len(locations))
+        (v4 if start.version == 4 else v6).append((int(start), int(end), index))
+
+    for records in (v4, v6):
+        records.sort()
+        for previous, current in zip(records, records[1:]):
+            if current[0] <= previous[1]:
+                raise ValueError(f"Overlapping ranges starting at {ipaddress.ip_address(previous[0])} and {ipaddress.ip_address(current[0])}")
+
+    strings = bytearray()
+    location_table = bytearray()
+    for country, city in locations:
+        country_bytes = country.encode('utf-8')
+        city_bytes = city.encode('utf-8')
+        location_table += LOCATION_RECORD.pack(len(strings), len(country_bytes), len(city_bytes))
+        strings += country_bytes + city_bytes
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(v4), len(v6), len(locations), len(strings)))
+        for start, end, index in v4:
+            f.write(IPV4_RECORD.pack(start, end, index))
+        for start, end, index in v6:
+            f.write(IPV6_RECORD.pack(start.to_bytes(16, 'big'), end.to_bytes(16, 'big'), index))
+        f.write(location_table)
+        f.write(strings)
+
+    return len(v4), len(v6)
+
+class IpRangeTable:
+    """
+    Read-only IP range -> (country, city) table backed by a memory-mapped file.
+
+    Lookups binary-search the mapped records directly, so the table lives in
+    the shared page cache and costs no per-process heap beyond a few objects.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mm) < HEADER.size:
+            raise ValueError(f"{path} is not a GeoIP range table")
+        magic, self.v4_count, self.v6_count, self.location_count, strings_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a GeoIP range table")
+
+        self._v4_offset = HEADER.size
+        self._v6_offset = self._v4_offset + self.v4_count * IPV4_RECORD.size
+        self._locations_offset = self._v6_offset + self.v6_count * IPV6_RECORD.size
+        self._strings_offset = self._locations_offset + self.location_count * LOCATION_RECORD.size
+        if len(self._mm) != self._strings_offset + strings_size:
+            raise ValueError(f"{path} is truncated or corrupted")
+
+    def lookup(self, ip_address):
+        """
+        Returns the (country, city) of the range containing ip_address, or None.
+        """
+        try:
+            ip = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return None
+
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+
+        if ip.version == 4:
+            index = self._search_v4(int(ip))
+        else:
+            index = self._search_v6(ip.packed)
+
+        if index is None:
+            return None
+        return self._location(index)
+
+    def close(self):
+        self._mm.close()
+
+    def _search_v4(self, value):
+        # Find the last range starting at or before value
+        lo, hi = 0, self.v4_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start, = struct.unpack_from('>I', self._mm, self._v4_offset + mid * IPV4_RECORD.size)
+            if start <= value:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+        start, end, index = IPV4_RECORD.unpack_from(self._mm, self._v4_offset + (lo - 1) * IPV4_RECORD.size)
+        return index if value <= end else None
+
+    def _search_v6(self, packed):
+        # Big-endian byte strings compare like the integers they encode
+        lo, hi = 0, self.v6_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = self._v6_offset + mid * IPV6_RECORD.size
+            if self._mm[offset:offset + 16] <= packed:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+        start, end, index = IPV6_RECORD.unpack_from(self._mm, self._v6_offset + (lo - 1) * IPV6_RECORD.size)
+        return index if packed <= end else None
+
+    def _location(self, index):
+        offset, country_len, city_len = LOCATION_RECORD.unpack_from(self._mm, self._locations_offset + index * LOCATION_RECORD.size)
+        start = self._strings_offset + offset
+        country = self._mm[start:start + country_len].decode('utf-8')
+        city = self._mm[start + country_len:start + country_len + city_len].decode('utf-8')
+        return country, city
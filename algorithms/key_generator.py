@@ -1,15 +1,141 @@
+import functools
+import hashlib
+import re
 import secrets
 import string
 
-def generate_license_key():
+CHARACTERS = string.ascii_uppercase + string.digits
+GROUPS = 4
+GROUP_LENGTH = 4
+KEY_LENGTH = GROUPS * GROUP_LENGTH
+
+# Key formats. Format 1 keys are four random groups (XXXX-XXXX-XXXX-XXXX).
+# Format 2 keys add a fifth group, a keyed checksum of the first four, so that
+# keys made up by scanners can be told apart without looking them up.
+# Without a secret anyone could compute the checksum, so format 2 keys are
+# neither generated nor accepted then.
+KEY_FORMAT_PLAIN = 1
+KEY_FORMAT_CHECKSUM = 2
+
+_PLAIN_KEY = re.compile(r'[A-Z0-9]{4}(?:-[A-Z0-9]{4}){3}')
+_CHECKSUM_KEY = re.compile(r'[A-Z0-9]{4}(?:-[A-Z0-9]{4}){4}')
+_PLAIN_KEY_LENGTH = GROUPS * (GROUP_LENGTH + 1) - 1
+
+# Bytes are mapped to characters with byte % 36. Bytes >= 252 (7 * 36) are
+# rejected, otherwise the first 256 % 36 characters would come up more often.
+_ACCEPTED_BYTES = 256 - 256 % len(CHARACTERS)
+_BYTE_TO_CHAR = bytes(ord(CHARACTERS[b % len(CHARACTERS)]) for b in range(256))
+_REJECTED_BYTES = bytes(range(_ACCEPTED_BYTES, 256))
+
+def generate_license_key(key_format=KEY_FORMAT_PLAIN, checksum_secret=''):
     """
-    Generates a unique license key in the format XXXX-XXXX-XXXX-XXXX.
+    Generates a unique license key in the format XXXX-XXXX-XXXX-XXXX, followed
+    by a -CCCC checksum group for format 2.
     Uses cryptographically secure random number generator.
     """
-    characters = string.ascii_uppercase + string.digits
-    groups = []
-    for _ in range(4):
-        group = "".join(secrets.choice(characters) for _ in range(4))
-        groups.append(group)
+    return generate_license_keys(1, key_format, checksum_secret)[0]
+
+def generate_license_keys(count, key_format=KEY_FORMAT_PLAIN, checksum_secret=''):
+    """
+    Generates license keys in the format XXXX-XXXX-XXXX-XXXX in one batch,
+    followed by a -CCCC checksum group for format 2.
+
+    The entropy for the whole batch is drawn with a single secrets.token_bytes
+    call (a second one only if too many bytes were rejected) and mapped to the
+    alphabet with bytes.translate, rejecting the bytes that would bias the
+    mapping. Keys are distinct within the batch; uniqueness against stored
+    keys is still enforced by the database.
+
+    Args:
+        count (int): The number of keys to generate.
+        key_format (int, optional): KEY_FORMAT_PLAIN or KEY_FORMAT_CHECKSUM.
+        checksum_secret (str, optional): The secret keying the checksum of format 2 keys.
+
+    Returns:
+        list: 'count' distinct license keys.
+
+    Raises:
+        ValueError: If the format is unknown, or is format 2 without a checksum secret.
+    """
+    if key_format == KEY_FORMAT_CHECKSUM and not checksum_secret:
+        raise ValueError("Format 2 license keys require a checksum secret (LICENSE_KEY_CHECKSUM_SECRET).")
+    keys = set()
+    while len(keys) < count:
+        keys.update(_format_keys(_random_bytes((count - len(keys)) * KEY_LENGTH)))
+
+    if key_format == KEY_FORMAT_CHECKSUM:
+        mac_key = _mac_key(checksum_secret)
+        return [f"{key}-{_checksum(key, mac_key)}" for key in keys]
+    if key_format != KEY_FORMAT_PLAIN:
+        raise ValueError(f"Unknown license key format: {key_format}")
+    return list(keys)
+
+def key_format_of(license_key, checksum_secret=''):
+    """
+    Tells which format a license key is in, without any lookup.
 
-    return "-".join(groups)
+    Args:
+        license_key (str): The key to check.
+        checksum_secret (str, optional): The secret keying the checksum of format 2 keys.
+
+    Returns:
+        int: KEY_FORMAT_PLAIN or KEY_FORMAT_CHECKSUM.
+        None: If the key is malformed, its checksum does not match, or it is a
+            format 2 key and there is no checksum secret.
+    """
+    if not isinstance(license_key, str):
+        return None
+    if len(license_key) == _PLAIN_KEY_LENGTH:
+        return KEY_FORMAT_PLAIN if _PLAIN_KEY.fullmatch(license_key) else None
+    if (checksum_secret and len(license_key) == _PLAIN_KEY_LENGTH + GROUP_LENGTH + 1
+            and _CHECKSUM_KEY.fullmatch(license_key)):
+        key = license_key[:_PLAIN_KEY_LENGTH]
+        if secrets.compare_digest(_checksum(key, _mac_key(checksum_secret)), license_key[_PLAIN_KEY_LENGTH + 1:]):
+            return KEY_FORMAT_CHECKSUM
+    return None
+
+@functools.lru_cache(maxsize=8)
+def _mac_key(checksum_secret):
+    """
+    Returns a BLAKE2s MAC keyed with the secret, to be copied for each key.
+    BLAKE2s keys are at most 32 bytes: any secret is reduced to that.
+    """
+    return hashlib.blake2s(key=hashlib.sha256(checksum_secret.encode('utf-8')).digest(), digest_size=GROUP_LENGTH)
+
+def _checksum(key, mac_key):
+    """
+    Returns the GROUP_LENGTH check characters of a format 1 key: a keyed BLAKE2s
+    MAC of the key, mapped to the alphabet. Without the secret, a made-up key has
+    about one chance in 1.7 million (36^4) of carrying a valid checksum.
+    """
+    mac = mac_key.copy()
+    mac.update(key.encode('ascii'))
+    return mac.digest().translate(_BYTE_TO_CHAR).decode('ascii')
+
+def _random_bytes(length):
+    """
+    Returns 'length' uniformly distributed alphabet characters, as ASCII bytes.
+    """
+    chars = b''
+    while len(chars) < length:
+        needed = length - len(chars)
+        # Draw ~2% more than needed to cover the rejected bytes (4 out of 256)
+        raw = secrets.token_bytes(needed + needed // 50 + 16)
+        chars += raw.translate(_BYTE_TO_CHAR, _REJECTED_BYTES)
+    return chars[:length]
+
+def _format_keys(chars):
+    """
+    Splits KEY_LENGTH characters per key into dash separated groups.
+    Each character position is copied for all keys at once with an extended
+    slice assignment, rather than formatting the keys one by one.
+    """
+    count = len(chars) // KEY_LENGTH
+    stride = GROUPS * (GROUP_LENGTH + 1)  # Groups and dashes, plus a trailing separator
+    out = bytearray(b'-' * (count * stride))
+    for group in range(GROUPS):
+        for position in range(GROUP_LENGTH):
+            source = group * GROUP_LENGTH + position
+            out[group * (GROUP_LENGTH + 1) + position::stride] = chars[source::KEY_LENGTH]
+    out[stride - 1::stride] = b' ' * count
+    return out.decode('ascii').split()
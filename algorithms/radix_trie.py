@@ -0,0 +1,116 @@
+import ipaddress
+
+class _Node:
+    __slots__ = ('prefix', 'length', 'children', 'value')
+
+    def __init__(self, prefix, length, value=None):
+        self.prefix = prefix    # Network address as an integer, host bits zero
+        self.length = length    # Prefix length in bits
+        self.children = [None, None]
+        self.value = value
+
+class CidrTrie:
+    """
+    Longest-prefix match of IP addresses against CIDR networks, in a
+    path-compressed binary (PATRICIA) trie per IP version.
+
+    Each node is a network; a child extends it by at least one bit, and chains
+    of single-child nodes are collapsed into their last network. A lookup
+    walks at most one node per bit of the longest matching prefix, checking
+    each with a shift and a comparison, so it costs O(prefix length) whatever
+    the number of networks. IPv4-mapped IPv6 addresses are looked up as IPv4.
+
+    The trie is built once and not modified while being read: reloads build
+    a new trie and swap it in.
+    """
+    def __init__(self):
+        self._roots = {4: _Node(0, 0), 6: _Node(0, 0)}
+        self._widths = {4: 32, 6: 128}
+        self._count = 0
+
+    def insert(self, network, value):
+        """
+        Maps a network to a value, replacing the value of an equal network.
+
+        Args:
+            network (str or ip_network): A CIDR network, e.g. '203.0.113.0/24'; host bits are ignored.
+            value: Returned by lookup for the addresses of the network (but not None).
+        """
+        network = ipaddress.ip_network(network, strict=False)
+        width = self._widths[network.version]
+        prefix, length = int(network.network_address), network.prefixlen
+        node = self._roots[network.version]
+
+        while True:
+            if node.length == length:
+                # Only reached with node.prefix == prefix
+                if node.value is None:
+                    self._count += 1
+                node.value = value
+                return
+
+            bit = _bit(prefix, node.length, width)
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _Node(prefix, length, value)
+                self._count += 1
+                return
+
+            common = _common_length(child.prefix, prefix, min(child.length, length), width)
+            if common == child.length:
+                node = child
+                continue
+
+            # The new network and the child diverge (or the new one contains
+            # the child) below 'node': split the edge at their common prefix
+            fork = _Node(_mask(prefix, common, width), common)
+            node.children[bit] = fork
+            fork.children[_bit(child.prefix, common, width)] = child
+            if common == length:
+                fork.value = value
+            else:
+                fork.children[_bit(prefix, common, width)] = _Node(prefix, length, value)
+            self._count += 1
+            return
+
+    def lookup(self, address):
+        """
+        Returns the value of the most specific network containing an address,
+        or None if no network does or the address is malformed.
+        """
+        try:
+            address = ipaddress.ip_address(address)
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        width = self._widths[address.version]
+        value = int(address)
+
+        best = None
+        node = self._roots[address.version]
+        while node is not None:
+            if node.length and (value >> (width - node.length)) != (node.prefix >> (width - node.length)):
+                break
+            if node.value is not None:
+                best = node.value
+            if node.length == width:
+                break
+            node = node.children[_bit(value, node.length, width)]
+        return best
+
+    def __len__(self):
+        return self._count
+
+def _bit(value, position, width):
+    """Returns the bit of 'value' at 'position', counted from the most significant one."""
+    return (value >> (width - position - 1)) & 1
+
+def _mask(value, length, width):
+    """Keeps the first 'length' bits of 'value'."""
+    return (value >> (width - length) << (width - length)) if length else 0
+
+def _common_length(a, b, limit, width):
+    """Returns the number of leading bits shared by 'a' and 'b', at most 'limit'."""
+    diff = a ^ b
+    return min(width - diff.bit_length(), limit)
@@ -0,0 +1,255 @@
+"""
+ASGI entry point serving the license validation API from an asyncio server:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+
+Only the validation, refresh and JWKS endpoints are served here; the admin UI stays on the
+Flask app in main.py. Each worker process handles its connections on one
+event loop, so idle keep-alive clients cost a socket, not a thread.
+"""
+import asyncio
+import json
+import re
+from config.settings import Config
+from config.async_database import AsyncDatabase
+from security import client_address, rate_limiter
+from services import app_registry, ip_filter, license_filter, partition_maintenance, revocation_list
+from services.async_validation_service import validate_license_request, refresh_license_request, sign_token, get_jwks
+
+VALIDATE_PATHS = ('/api/v1/validate', '/api/v1/license/validate')
+REFRESH_PATH = '/api/v1/refresh'
+JWKS_PATH = re.compile(r'^/api/v1/apps/(\d+)/jwks$')
+MAX_BODY_SIZE = 64 * 1024
+
+async def app(scope, receive, send):
+    """ASGI application callable."""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    jwks_match = JWKS_PATH.match(scope['path'])
+    if jwks_match:
+        if scope['method'] != 'GET':
+            await _send_json(send, 405, {'error': 'Method not allowed'})
+            return
+        status, response = await jwks(int(jwks_match.group(1)))
+        await _send_json(send, status, response, [(b'cache-control', b'public, max-age=300')] if status == 200 else [])
+        return
+
+    if scope['path'] not in VALIDATE_PATHS and scope['path'] != REFRESH_PATH:
+        await _send_json(send, 404, {'error': 'Not found'})
+        return
+    if scope['method'] != 'POST':
+        await _send_json(send, 405, {'error': 'Method not allowed'})
+        return
+
+    body = await _read_body(receive)
+    if body is None:
+        await _send_json(send, 413, {'error': 'Request body too large'})
+        return
+
+    if scope['path'] == REFRESH_PATH:
+        status, response = await refresh(scope, body)
+    else:
+        status, response = await validate(scope, body)
+    extra_headers = []
+    if status == 429:
+        # validate() and refresh() hand the Retry-After value over in the response
+        extra_headers.append((b'retry-after', response.pop('retry_after').encode('ascii')))
+    await _send_json(send, status, response, extra_headers)
+
+async def validate(scope, body):
+    """
+    Validates a license key.
+    Expects JSON payload with 'license_key', 'hwid', and optionally 'app_id'.
+    Returns a (status, response) tuple matching the Flask endpoint.
+    """
+    data = _parse_json(body)
+    if not data:
+        return 400, {'error': 'Invalid JSON'}
+
+    client_ip, headers = _client_info(scope)
+
+    # Blocked networks and clients over the rate limits are turned away before
+    # any lookup or telemetry
+    if ip_filter.is_blocked(client_ip):
+        return 403, {'error': 'Access denied'}
+    retry_after = await _admit(client_ip, data.get('app_id'), data.get('license_key'))
+    if retry_after:
+        return 429, {'error': 'Too many requests', 'retry_after': rate_limiter.retry_after_header(retry_after)}
+
+    try:
+        jwt_payload = await validate_license_request(data, headers, client_ip)
+
+        token = await sign_token(jwt_payload)
+        if not token:
+            return 404, {'error': 'App not found'}
+
+        return 200, {'token': token}
+
+    except ValueError as e:
+        return 403, {'error': str(e)}
+    except Exception as e:
+        print(f"Error validating license: {e}")
+        return 500, {'error': 'Internal server error'}
+
+async def refresh(scope, body):
+    """
+    Re-issues a token from a still valid one, without a full validation.
+    Expects JSON payload with 'token' and 'hwid'.
+    Returns a (status, response) tuple matching the Flask endpoint.
+    """
+    data = _parse_json(body)
+    if not data:
+        return 400, {'error': 'Invalid JSON'}
+
+    client_ip, _ = _client_info(scope)
+    if ip_filter.is_blocked(client_ip):
+        return 403, {'error': 'Access denied'}
+    retry_after = await _admit(client_ip, None, None)
+    if retry_after:
+        return 429, {'error': 'Too many requests', 'retry_after': rate_limiter.retry_after_header(retry_after)}
+
+    try:
+        jwt_payload = await refresh_license_request(data)
+
+        token = await sign_token(jwt_payload)
+        if not token:
+            return 404, {'error': 'App not found'}
+
+        return 200, {'token': token}
+
+    except ValueError as e:
+        return 403, {'error': str(e)}
+    except Exception as e:
+        print(f"Error refreshing token: {e}")
+        return 500, {'error': 'Internal server error'}
+
+async def jwks(app_id):
+    """
+    Publishes the public keys that verify the tokens of an app, as a JWK Set.
+    Returns a (status, response) tuple matching the Flask endpoint.
+    """
+    try:
+        document = await get_jwks(app_id)
+        if document is None:
+            return 404, {'error': 'App not found'}
+        return 200, document
+    except Exception as e:
+        print(f"Error serving JWKS: {e}")
+        return 500, {'error': 'Internal server error'}
+
+async def _admit(client_ip, app_id, license_key):
+    """
+    Checks a request against the rate limits: the local buckets
+    inline, the shared ones (a query each) in a worker thread.
+    Returns 0 if it is admitted, otherwise the seconds the client should wait.
+    """
+    if not Config.RATE_LIMIT_ENABLED:
+        return 0.0
+    admission = rate_limiter.get_admission_control()
+    retry_after = admission.check(client_ip, app_id, license_key)
+    if retry_after or not admission.shared:
+        return retry_after
+    return await asyncio.to_thread(admission.check_shared, client_ip, app_id, license_key)
+
+def _parse_json(body):
+    """Returns the JSON object of a request body, or None if it is not one."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def _client_info(scope):
+    """
+    Extracts the client IP and the headers recorded in telemetry from an ASGI scope.
+    X-Forwarded-For is only trusted as far as TRUSTED_PROXY_HOPS proxies wrote it.
+    """
+    request_headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+    client = scope.get('client')
+    client_ip = client_address.client_ip(client[0] if client else None, request_headers.get('x-forwarded-for'))
+
+    headers = {
+        'User-Agent': request_headers.get('user-agent')
+    }
+    return client_ip, headers
+
+async def _read_body(receive):
+    """Reads the request body, or returns None if it exceeds MAX_BODY_SIZE."""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+async def _send_json(send, status, data, extra_headers=None):
+    body = json.dumps(data).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii'))
+        ] + (extra_headers or [])
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await AsyncDatabase.initialize()
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            # Warm the app registry so the first validations do not pay for app lookups
+            if Config.APP_REGISTRY_PRELOAD:
+                try:
+                    print(f"App registry preloaded with {app_registry.preload()} apps.")
+                except Exception as e:
+                    print(f"Error preloading app registry: {e}")
+            # Telemetry inserts fail outside every partition: do not rely on cron alone
+            try:
+                created = await asyncio.to_thread(partition_maintenance.ensure_upcoming)
+                if created:
+                    print(f"Telemetry partitions created: {', '.join(created)}.")
+            except Exception as e:
+                print(f"Error creating telemetry partitions: {e}")
+            # Tokens are refreshed against the revocation list, reloaded in the background
+            try:
+                print(f"Revocation list loaded with {await asyncio.to_thread(revocation_list.load)} licenses.")
+            except Exception as e:
+                print(f"Error loading revocation list: {e}")
+            # Unknown license keys are rejected without a query once the key filter is built
+            try:
+                count = await asyncio.to_thread(license_filter.load)
+                if count is not None:
+                    print(f"License filter built with {count} keys.")
+            except Exception as e:
+                print(f"Error building license filter: {e}")
+            # Requests from blocked networks are turned away from memory once the IP rules are loaded
+            try:
+                count = await asyncio.to_thread(ip_filter.load)
+                if count is not None:
+                    print(f"IP filter loaded with {count} rules.")
+            except Exception as e:
+                print(f"Error loading IP filter: {e}")
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await AsyncDatabase.close_pool()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -0,0 +1,73 @@
+from contextlib import asynccontextmanager
+from config.settings import Config
+
+try:
+    import asyncpg
+except ImportError:  # Only required by the ASGI validation server (asgi.py)
+    asyncpg = None
+
+class AsyncDatabase:
+    """
+    Singleton class to manage the asyncpg connection pool used by the ASGI validation server.
+    """
+    _pool = None
+
+    @classmethod
+    async def initialize(cls):
+        """Initialize the connection pool if it doesn't exist."""
+        if cls._pool is None:
+            if asyncpg is None:
+                raise RuntimeError("asyncpg is required for the async validation server.")
+            try:
+                # Use DATABASE_URL if provided, otherwise individual params
+                if Config.DATABASE_URL:
+                    cls._pool = await asyncpg.create_pool(
+                        dsn=Config.DATABASE_URL,
+                        min_size=Config.ASYNC_DB_POOL_MIN,
+                        max_size=Config.ASYNC_DB_POOL_MAX
+                    )
+                else:
+                    cls._pool = await asyncpg.create_pool(
+                        database=Config.DB_NAME,
+                        user=Config.DB_USER,
+                        password=Config.DB_PASSWORD,
+                        host=Config.DB_HOST,
+                        port=int(Config.DB_PORT),
+                        min_size=Config.ASYNC_DB_POOL_MIN,
+                        max_size=Config.ASYNC_DB_POOL_MAX
+                    )
+                print("Async database connection pool initialized.")
+            except (asyncpg.PostgresError, OSError) as e:
+                print(f"Error connecting to database: {e}")
+                raise e
+
+    @classmethod
+    async def get_pool(cls):
+        """Get the connection pool, initializing it on first use."""
+        if cls._pool is None:
+            await cls.initialize()
+        return cls._pool
+
+    @classmethod
+    async def close_pool(cls):
+        """Close all connections in the pool."""
+        if cls._pool:
+            await cls._pool.close()
+            cls._pool = None
+            print("Async database connection pool closed.")
+
+@asynccontextmanager
+async def get_async_connection(transaction=False):
+    """
+    Async context manager for getting a database connection.
+    Wraps the block in a transaction if transaction=True, which is
+    committed on success and rolled back on error.
+    Automatically returns the connection to the pool.
+    """
+    pool = await AsyncDatabase.get_pool()
+    async with pool.acquire() as conn:
+        if transaction:
+            async with conn.transaction():
+                yield conn
+        else:
+            yield conn
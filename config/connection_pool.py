@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import deque
+from psycopg2 import extensions, pool
+
+class PoolTimeout(pool.PoolError):
+    """Raised when no connection could be acquired within the acquire timeout."""
+
+class _Slot:
+    __slots__ = ('conn', 'created', 'released')
+
+    def __init__(self, conn, now):
+        self.conn = conn
+        self.created = now
+        self.released = now
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    - acquire() waits up to acquire_timeout seconds for a connection when all
+      max_size are in use, rather than failing at once, and raises PoolTimeout
+      past it.
+    - Idle connections are reused most recently released first, so the
+      others stay idle: past max_idle seconds they are closed, down to
+      min_size connections.
+    - Connections are closed once older than max_lifetime seconds (when
+      released, or found idle), so server-side memory and settings do not
+      accumulate forever.
+    - A connection idle for more than health_check_after seconds is checked
+      with a round trip before being handed out; a broken one is replaced.
+    - Connections returned inside a transaction are rolled back.
+
+    Args:
+        connect (callable): Opens a new connection.
+        min_size (int): Connections opened up front and kept open when idle.
+        max_size (int): The maximum number of open connections.
+        acquire_timeout (float): Seconds acquire() waits for a connection.
+        max_lifetime (float): Seconds after which a connection is replaced (0: never).
+        max_idle (float): Seconds after which an idle connection beyond min_size is closed (0: never).
+        health_check_after (float): Idle seconds after which a connection is checked on checkout.
+    """
+    def __init__(self, connect, min_size=1, max_size=20, acquire_timeout=5.0, max_lifetime=3600.0,
+                 max_idle=300.0, health_check_after=30.0, clock=time.monotonic):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f"Invalid pool sizes: min {min_size}, max {max_size}")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self._clock = clock
+        self._idle = deque()      # Slots, oldest release on the left
+        self._in_use = {}         # id(conn) -> slot
+        self._opening = 0         # Connections being opened outside the lock
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.waiting = 0
+        self.acquires = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.acquire_seconds_total = 0.0
+        self.acquire_seconds_max = 0.0
+        self.opened = 0
+        self.recycled = 0
+        self.health_check_failures = 0
+
+        for _ in range(min_size):
+            self._idle.append(_Slot(self._open(), self._clock()))
+
+    def acquire(self, timeout=None):
+        """
+        Checks out a connection, waiting for one to be released if the pool is
+        at max_size.
+
+        Raises:
+            PoolTimeout: If none is available within 'timeout' (by default acquire_timeout) seconds.
+            psycopg2.Error: If a new connection cannot be opened.
+        """
+        started = self._clock()
+        deadline = started + (self.acquire_timeout if timeout is None else timeout)
+        waited = False
+        while True:
+            slot = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise pool.PoolError("connection pool is closed")
+                    if self._idle:
+                        slot = self._idle.pop()
+                        break
+                    if self._size() < self.max_size:
+                        self._opening += 1
+                        break
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"no connection available within {deadline - started:.1f}s ({self.max_size} in use)")
+                    waited = True
+                    self.waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self.waiting -= 1
+
+            if slot is None:
+                try:
+                    slot = _Slot(self._open(), self._clock())
+                finally:
+                    with self._cond:
+                        self._opening -= 1
+                        if slot is not None:
+                            self._in_use[id(slot.conn)] = slot
+                        else:
+                            self._cond.notify()
+                break
+
+            if self._usable(slot):
+                with self._cond:
+                    self._in_use[id(slot.conn)] = slot
+                break
+            # Broken or expired: closed, and its place is free for a new one
+            self._discard(slot)
+
+        elapsed = self._clock() - started
+        with self._cond:
+            self.acquires += 1
+            self.waits += waited
+            self.acquire_seconds_total += elapsed
+            self.acquire_seconds_max = max(self.acquire_seconds_max, elapsed)
+        return slot.conn
+
+    def release(self, conn):
+        """Returns a connection to the pool, rolling back its open transaction if any."""
+        with self._cond:
+            slot = self._in_use.pop(id(conn), None)
+        if slot is None:
+            raise pool.PoolError("trying to release a connection not checked out from this pool")
+
+        now = self._clock()
+        if not conn.closed and conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+        if self._closed or conn.closed or self._expired(slot, now):
+            self._discard(slot)
+            return
+
+        slot.released = now
+        with self._cond:
+            self._idle.append(slot)
+            self._prune_idle(now)
+            self._cond.notify()
+
+    def busy(self):
+        """Returns the number of connections in use plus the number of threads waiting for one."""
+        with self._cond:
+            return len(self._in_use) + self.waiting
+
+    def close(self):
+        """Closes the idle connections; connections in use are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for slot in idle:
+            self._close(slot.conn)
+
+    def stats(self):
+        """Returns the pool sizes, saturation and acquire latency as a dictionary."""
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'waiting': self.waiting,
+                'acquires': self.acquires,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'acquire_ms_avg': round(1000 * self.acquire_seconds_total / self.acquires, 3) if self.acquires else None,
+                'acquire_ms_max': round(1000 * self.acquire_seconds_max, 3),
+                'opened': self.opened,
+                'recycled': self.recycled,
+                'health_check_failures': self.health_check_failures
+            }
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _open(self):
+        conn = self._connect()
+        self.opened += 1
+        return conn
+
+    def _expired(self, slot, now):
+        return bool(self.max_lifetime) and now - slot.created >= self.max_lifetime
+
+    def _usable(self, slot):
+        """Checks a connection taken from the idle ones, outside the lock."""
+        now = self._clock()
+        if slot.conn.closed or self._expired(slot, now):
+            return False
+        if now - slot.released < self.health_check_after:
+            return True
+        try:
+            with slot.conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            slot.conn.rollback()
+            return True
+        except Exception:
+            self.health_check_failures += 1
+            return False
+
+    def _prune_idle(self, now):
+        # Called with the lock held; the longest idle connections are on the left
+        while self.max_idle and len(self._idle) + len(self._in_use) > self.min_size and self._idle:
+            if now - self._idle[0].released < self.max_idle:
+                return
+            slot = self._idle.popleft()
+            self.recycled += 1
+            self._close(slot.conn)
+
+    def _discard(self, slot):
+        self._close(slot.conn)
+        with self._cond:
+            self.recycled += 1
+            self._cond.notify()
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -1,62 +1,169 @@
+import threading
 import psycopg2
-from psycopg2 import pool
 from contextlib import contextmanager
 from config.settings import Config
+from config.connection_pool import ConnectionPool, PoolTimeout
+from config.replicas import Replica, ReplicaSet, replica_name
+from config.prepared_statements import PreparingConnection
+from services import metrics
 
 class Database:
     """
-    Singleton class to manage PostgreSQL connection pool.
+    Singleton class to manage PostgreSQL connection pool, and the pools of
+    the read replicas (DB_REPLICA_URLS) read-only queries may be routed to.
     """
     _pool = None
+    _replicas = None
+    _lock = threading.Lock()
 
     @classmethod
     def initialize(cls):
         """Initialize the connection pool if it doesn't exist."""
         if cls._pool is None:
-            try:
-                # Use DATABASE_URL if provided, otherwise individual params
-                if Config.DATABASE_URL:
-                    cls._pool = psycopg2.pool.ThreadedConnectionPool(
-                        minconn=1,
-                        maxconn=20,
-                        dsn=Config.DATABASE_URL
+            with cls._lock:
+                if cls._pool is not None:
+                    return
+                try:
+                    cls._pool = ConnectionPool(
+                        cls._connect,
+                        min_size=Config.DB_POOL_MIN,
+                        max_size=Config.DB_POOL_MAX,
+                        acquire_timeout=Config.DB_POOL_ACQUIRE_TIMEOUT,
+                        max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+                        max_idle=Config.DB_POOL_MAX_IDLE,
+                        health_check_after=Config.DB_POOL_HEALTH_CHECK_AFTER
                     )
-                else:
-                    cls._pool = psycopg2.pool.ThreadedConnectionPool(
-                        minconn=1,
-                        maxconn=20,
-                        database=Config.DB_NAME,
-                        user=Config.DB_USER,
-                        password=Config.DB_PASSWORD,
-                        host=Config.DB_HOST,
-                        port=Config.DB_PORT
+                    metrics.register_provider('db_pool', cls.stats)
+                    print("Database connection pool initialized.")
+                except psycopg2.Error as e:
+                    print(f"Error connecting to database: {e}")
+                    raise e
+                if Config.DB_REPLICA_URLS:
+                    cls._replicas = ReplicaSet(
+                        [Replica(replica_name(dsn), cls._replica_pool(dsn)) for dsn in Config.DB_REPLICA_URLS],
+                        selection=Config.DB_REPLICA_SELECTION,
+                        max_lag=Config.DB_REPLICA_MAX_LAG,
+                        check_interval=Config.DB_REPLICA_CHECK_INTERVAL
                     )
-                print("Database connection pool initialized.")
-            except psycopg2.Error as e:
-                print(f"Error connecting to database: {e}")
-                raise e
+                    metrics.register_provider('db_replicas', cls._replicas.stats)
+                    print(f"Read replica pools initialized ({len(Config.DB_REPLICA_URLS)}).")
+
+    @classmethod
+    def _replica_pool(cls, dsn):
+        # Replica connections are opened on demand: a replica that is down
+        # must not keep the application from starting
+        return ConnectionPool(
+            lambda: cls._connect(dsn),
+            min_size=0,
+            max_size=Config.DB_POOL_MAX,
+            acquire_timeout=Config.DB_POOL_ACQUIRE_TIMEOUT,
+            max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+            max_idle=Config.DB_POOL_MAX_IDLE,
+            health_check_after=Config.DB_POOL_HEALTH_CHECK_AFTER
+        )
+
+    @staticmethod
+    def _connect(dsn=None):
+        """
+        Open a new connection (to the primary, or to the given DSN), with the
+        configured statement_timeout, and able to run prepared statements.
+        """
+        # Long maintenance statements (migrations, partition retirement) lift it with SET [LOCAL]
+        options = f"-c statement_timeout={Config.DB_STATEMENT_TIMEOUT}"
+        # Use DATABASE_URL if provided, otherwise individual params
+        dsn = dsn or Config.DATABASE_URL
+        if dsn:
+            return psycopg2.connect(dsn=dsn, options=options, connection_factory=PreparingConnection)
+        return psycopg2.connect(
+            database=Config.DB_NAME,
+            user=Config.DB_USER,
+            password=Config.DB_PASSWORD,
+            host=Config.DB_HOST,
+            port=Config.DB_PORT,
+            options=options,
+            connection_factory=PreparingConnection
+        )
 
     @classmethod
     def get_connection(cls):
-        """Get a connection from the pool."""
+        """
+        Get a connection from the pool, waiting up to DB_POOL_ACQUIRE_TIMEOUT
+        seconds for one when all are in use.
+        Raises PoolTimeout past it.
+        """
         if cls._pool is None:
             cls.initialize()
-        return cls._pool.getconn()
+        try:
+            return cls._pool.acquire()
+        except PoolTimeout as e:
+            print(f"Database connection pool exhausted: {e}")
+            raise
 
     @classmethod
     def return_connection(cls, conn):
         """Return a connection to the pool."""
         if cls._pool:
-            cls._pool.putconn(conn)
+            cls._pool.release(conn)
+
+    @classmethod
+    def get_replica_connection(cls):
+        """
+        Get a connection from the pool of a healthy read replica.
+        Returns a (replica, connection) tuple, or None when no replica is
+        configured or usable and the query must go to the primary.
+        """
+        if cls._pool is None:
+            cls.initialize()
+        if cls._replicas is None:
+            return None
+        return cls._replicas.checkout()
+
+    @classmethod
+    def return_replica_connection(cls, replica, conn, failed=False):
+        """Return a connection to its replica's pool."""
+        if cls._replicas:
+            cls._replicas.release(replica, conn, failed)
+
+    @classmethod
+    def stats(cls):
+        """Returns the pool metrics (in use, idle, waiting, acquire latency...) as a dictionary."""
+        if cls._pool is None:
+            return {'initialized': False}
+        return cls._pool.stats()
 
     @classmethod
     def close_pool(cls):
         """Close all connections in the pool."""
+        if cls._replicas:
+            cls._replicas.close()
+            cls._replicas = None
         if cls._pool:
-            cls._pool.closeall()
+            cls._pool.close()
             cls._pool = None
             print("Database connection pool closed.")
 
+@contextmanager
+def _checkout(readonly=False):
+    """Yields a connection of a read replica if 'readonly' and one is usable, else of the primary."""
+    routed = Database.get_replica_connection() if readonly else None
+    if routed is None:
+        conn = Database.get_connection()
+        try:
+            yield conn
+        finally:
+            Database.return_connection(conn)
+        return
+
+    replica, conn = routed
+    failed = False
+    try:
+        yield conn
+    except Exception:
+        failed = True
+        raise
+    finally:
+        Database.return_replica_connection(replica, conn, failed)
+
 @contextmanager
 def get_db_connection():
     """
@@ -70,21 +177,44 @@ def get_db_connection():
         Database.return_connection(conn)
 
 @contextmanager
-def get_db_cursor(commit=False):
+def get_db_cursor(commit=False, readonly=False):
     """
     Context manager for getting a database cursor.
     Handles commit/rollback automatically if commit=True.
+
+    With readonly=True the cursor may be on a read replica: for queries that
+    write nothing and can tolerate data up to DB_REPLICA_MAX_LAG seconds old.
+    It is on the primary when no replica is configured or healthy.
     """
-    conn = Database.get_connection()
-    cursor = conn.cursor()
-    try:
-        yield cursor
-        if commit:
-            conn.commit()
-    except Exception as e:
-        if commit:
-            conn.rollback()
-        raise e
-    finally:
-        cursor.close()
-        Database.return_connection(conn)
+    with _checkout(readonly and not commit) as conn:
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            if commit:
+                conn.commit()
+        except Exception as e:
+            if commit:
+                conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+@contextmanager
+def get_db_server_cursor(name, itersize=2000, readonly=False):
+    """
+    Context manager for getting a server-side (named) cursor, for reading
+    result sets too large to hold in memory. Rows are transferred from the
+    server 'itersize' at a time as the cursor is iterated or fetched from.
+    The transaction the cursor lives in is rolled back on exit.
+    With readonly=True the cursor may be on a read replica, as with get_db_cursor.
+    """
+    with _checkout(readonly) as conn:
+        cursor = conn.cursor(name=name)
+        cursor.itersize = itersize
+        try:
+            yield cursor
+        finally:
+            try:
+                cursor.close()
+            finally:
+                conn.rollback()
@@ -0,0 +1,120 @@
+import re
+import threading
+from psycopg2 import errors, extensions
+from config.settings import Config
+from services import metrics
+
+class PreparingConnection(extensions.connection):
+    """
+    psycopg2 connection remembering which registered statements are prepared
+    in its session. A new connection (after a reconnect, or when the pool
+    replaces one) starts with none, so they are prepared again on first use.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+class Statement:
+    """
+    A query declared once and run as a server-side prepared statement:
+    PREPARE on its first use on a connection, then EXECUTE, which skips
+    parsing and, once the server settles on a generic plan, planning.
+
+    Queries use psycopg2 %s placeholders. They run as plain queries on
+    connections that are not PreparingConnections, or with
+    DB_PREPARED_STATEMENTS off (e.g. behind a transaction-pooling proxy,
+    where session state does not follow the client).
+    """
+    def __init__(self, name, query):
+        self.name = name
+        self.query = query
+        self.param_count = query.count('%s')
+        numbers = iter(range(1, self.param_count + 1))
+        self.prepare_query = f"PREPARE {name} AS {re.sub(r'%s', lambda _: f'${next(numbers)}', query)}"
+        placeholders = ', '.join(['%s'] * self.param_count)
+        self.execute_query = f"EXECUTE {name} ({placeholders})" if self.param_count else f"EXECUTE {name}"
+        self.prepares = 0
+        self.executions = 0
+
+    def execute(self, cursor, params=()):
+        """Runs the statement on a cursor, preparing it first on this connection if needed."""
+        conn = cursor.connection
+        if not Config.DB_PREPARED_STATEMENTS or not isinstance(conn, PreparingConnection):
+            cursor.execute(self.query, params)
+            return
+        if self.name not in conn.prepared:
+            try:
+                self._prepare(cursor, conn)
+                self.prepares += 1
+            except errors.DuplicatePreparedStatement:
+                # The session has it already (e.g. prepared by a query the
+                # failed transaction of which made us forget it): use it
+                if not conn.autocommit:
+                    cursor.execute(f"ROLLBACK TO SAVEPOINT {self.name}")
+            conn.prepared.add(self.name)
+        try:
+            cursor.execute(self.execute_query, params)
+        except errors.InvalidSqlStatementName:
+            # Deallocated behind our back (e.g. DEALLOCATE): prepare it again on
+            # next use. Only this one is known to be gone; forgetting the others
+            # would PREPARE names the server still has
+            conn.prepared.discard(self.name)
+            raise
+        self.executions += 1
+
+    def _prepare(self, cursor, conn):
+        # A prepared statement outlives the transaction, even rolled back.
+        # Inside one, PREPARE runs in a savepoint (in the same round trip), so
+        # that a duplicate name does not abort the caller's transaction
+        if conn.autocommit:
+            cursor.execute(self.prepare_query)
+        else:
+            cursor.execute(f"SAVEPOINT {self.name}; {self.prepare_query}; RELEASE SAVEPOINT {self.name}")
+
+_statements = {}
+_lock = threading.Lock()
+
+def register(name, query):
+    """
+    Declares a prepared statement. Called at import time by the models.
+
+    Args:
+        name (str): The statement name, unique in the application.
+        query (str): The SQL, with %s placeholders.
+
+    Returns:
+        Statement: The statement, to run with statement.execute(cursor, params).
+
+    Raises:
+        ValueError: If the name is invalid or taken by another query.
+    """
+    if not re.fullmatch(r'[a-z][a-z0-9_]*', name):
+        raise ValueError(f"Invalid statement name: {name}")
+    if '%%' in query or '%(' in query:
+        raise ValueError(f"Statement {name} must only use %s placeholders")
+    with _lock:
+        existing = _statements.get(name)
+        if existing is not None:
+            if existing.query != query:
+                raise ValueError(f"Statement {name} is already registered")
+            return existing
+        statement = Statement(name, query)
+        _statements[name] = statement
+        return statement
+
+def statements():
+    """Returns the registered statements, by name."""
+    with _lock:
+        return dict(_statements)
+
+def stats():
+    """Returns the prepare and execute counts of each statement."""
+    return {
+        'enabled': Config.DB_PREPARED_STATEMENTS,
+        'statements': {
+            name: {'prepares': statement.prepares, 'executions': statement.executions}
+            for name, statement in statements().items()
+        }
+    }
+
+metrics.register_provider('prepared_statements', stats)
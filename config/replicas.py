@@ -0,0 +1,174 @@
+import itertools
+import threading
+import time
+from urllib.parse import urlsplit
+from config.connection_pool import PoolTimeout
+
+SELECTIONS = ('round_robin', 'least_busy')
+
+# Seconds of replay lag; 0 when the replica has replayed everything it received
+# (an idle primary does not make an up-to-date replica look late)
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+class Replica:
+    """A read replica: its connection pool and last known health."""
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = False
+        self.lag = None
+        self.checked_at = None
+        self.error = None
+        self.checkouts = 0
+        self._check_lock = threading.Lock()
+
+class ReplicaSet:
+    """
+    Routes read-only queries to read replicas, one pool per replica.
+
+    A replica is used only while healthy: reachable, and replaying less than
+    max_lag seconds behind the primary. Its health is checked again by the
+    first checkout after check_interval seconds (other threads meanwhile use
+    the last known health, so checks never queue requests), and at once when
+    opening or using one of its connections fails. checkout() returns None
+    when no replica is usable, and the caller falls back to the primary.
+
+    Args:
+        replicas (list): Replica objects.
+        selection (str): 'round_robin', or 'least_busy' (fewest connections in use or awaited).
+        max_lag (float): Replay lag in seconds past which a replica is not used.
+        check_interval (float): Seconds between health checks of a replica.
+    """
+    def __init__(self, replicas, selection='round_robin', max_lag=5.0, check_interval=5.0, clock=time.monotonic):
+        if selection not in SELECTIONS:
+            raise ValueError(f"Invalid replica selection: {selection}")
+        self.replicas = replicas
+        self.selection = selection
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._clock = clock
+        self._next = itertools.count()
+        self.fallbacks = 0
+
+    def checkout(self):
+        """
+        Checks out a connection of a healthy replica.
+        Returns a (replica, connection) tuple, or None if no replica is usable.
+        """
+        for replica in self.replicas:
+            if self._check_due(replica):
+                # Only the first checkout ever waits for a check
+                self._check(replica, blocking=replica.checked_at is None)
+
+        for replica in self._candidates():
+            try:
+                conn = replica.pool.acquire()
+            except PoolTimeout:
+                continue
+            except Exception as e:
+                self._mark_down(replica, e)
+                continue
+            replica.checkouts += 1
+            return replica, conn
+
+        self.fallbacks += 1
+        return None
+
+    def release(self, replica, conn, failed=False):
+        """Returns a connection to its replica's pool; 'failed' schedules a health check of the replica."""
+        if failed and conn.closed:
+            self._mark_down(replica, "connection lost")
+        replica.pool.release(conn)
+
+    def check_all(self):
+        """Checks the health of every replica now."""
+        for replica in self.replicas:
+            self._check(replica, blocking=True, force=True)
+
+    def close(self):
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def stats(self):
+        """Returns the routing counters and the health and pool metrics of each replica."""
+        return {
+            'selection': self.selection,
+            'fallbacks': self.fallbacks,
+            'replicas': {
+                replica.name: {
+                    'healthy': replica.healthy,
+                    'lag_seconds': replica.lag,
+                    'error': replica.error,
+                    'checkouts': replica.checkouts,
+                    'pool': replica.pool.stats()
+                } for replica in self.replicas
+            }
+        }
+
+    def _candidates(self):
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if self.selection == 'least_busy':
+            return sorted(healthy, key=lambda replica: replica.pool.busy())
+        # Rotate the starting replica, keeping the others as fallbacks
+        if not healthy:
+            return healthy
+        start = next(self._next) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def _check_due(self, replica):
+        return replica.checked_at is None or self._clock() - replica.checked_at >= self.check_interval
+
+    def _check(self, replica, blocking=False, force=False):
+        if not replica._check_lock.acquire(blocking=blocking):
+            return
+        if not force and not self._check_due(replica):
+            # Checked by another thread while this one waited
+            replica._check_lock.release()
+            return
+        was_healthy = replica.healthy
+        try:
+            conn = replica.pool.acquire()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(LAG_QUERY)
+                    lag = float(cursor.fetchone()[0])
+                conn.rollback()
+            finally:
+                replica.pool.release(conn)
+            replica.lag = round(lag, 3)
+            replica.error = None if lag <= self.max_lag else f"lagging {lag:.1f}s behind"
+            replica.healthy = replica.error is None
+        except Exception as e:
+            replica.lag = None
+            replica.error = str(e).strip()
+            replica.healthy = False
+        finally:
+            if not replica.healthy and (was_healthy or replica.checked_at is None):
+                print(f"Read replica {replica.name} not used: {replica.error}")
+            elif replica.healthy and not was_healthy:
+                print(f"Read replica {replica.name} in use.")
+            replica.checked_at = self._clock()
+            replica._check_lock.release()
+
+    def _mark_down(self, replica, error):
+        # Unused until the next check, which is due at once
+        if replica.healthy:
+            print(f"Read replica {replica.name} not used: {str(error).strip()}")
+        replica.healthy = False
+        replica.error = str(error).strip()
+        replica.checked_at = self._clock() - self.check_interval
+
+def replica_name(dsn):
+    """A name for a replica DSN that does not leak its credentials (host:port/database)."""
+    parts = urlsplit(dsn)
+    if parts.hostname:
+        port = f":{parts.port}" if parts.port else ''
+        return f"{parts.hostname}{port}{parts.path}"
+    # key=value DSN
+    fields = dict(item.split('=', 1) for item in dsn.split() if '=' in item)
+    return f"{fields.get('host', 'localhost')}:{fields.get('port', '5432')}/{fields.get('dbname', '')}"
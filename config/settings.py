@@ -22,6 +22,169 @@ class Config:
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'password')
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_PORT = os.getenv('DB_PORT', '5432')
+    # Connection pool: bounds, seconds a request waits for a free connection,
+    # seconds after which a connection is replaced (lifetime) or an idle one
+    # beyond DB_POOL_MIN closed, idle seconds before a checkout health check,
+    # and the statement_timeout of every pooled connection (0 = none)
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '20'))
+    DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '5'))
+    DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '3600'))
+    DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', '300'))
+    DB_POOL_HEALTH_CHECK_AFTER = float(os.getenv('DB_POOL_HEALTH_CHECK_AFTER', '30'))
+    DB_STATEMENT_TIMEOUT = os.getenv('DB_STATEMENT_TIMEOUT', '30s')
+    # Run the hot model queries as server-side prepared statements (PREPARE once
+    # per connection, then EXECUTE). Turn off behind a transaction-pooling proxy
+    DB_PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', 'True').lower() in ('true', '1', 't')
+    # Read replicas (comma-separated DSNs) for the queries marked read-only, picked
+    # 'round_robin' or 'least_busy'. A replica replaying more than DB_REPLICA_MAX_LAG
+    # seconds behind, or unreachable, is skipped (the primary serves when none is
+    # usable) until a check every DB_REPLICA_CHECK_INTERVAL seconds finds it healthy.
+    # Only lag-tolerant reads (history, exports, dashboard counters) are marked
+    # read-only: license and app lookups that get cached stay on the primary
+    DB_REPLICA_URLS = [url.strip() for url in os.getenv('DB_REPLICA_URLS', '').split(',') if url.strip()]
+    DB_REPLICA_SELECTION = os.getenv('DB_REPLICA_SELECTION', 'round_robin')
+    DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '5'))
+    DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', '5'))
+
+    # Geolocation
+    GEOLOCATION_URL = os.getenv('GEOLOCATION_URL', 'http://ip-api.com/json')
+    GEOLOCATION_TIMEOUT = float(os.getenv('GEOLOCATION_TIMEOUT', '2'))
+    GEOLOCATION_WORKERS = int(os.getenv('GEOLOCATION_WORKERS', '2'))
+    GEOLOCATION_QUEUE_SIZE = int(os.getenv('GEOLOCATION_QUEUE_SIZE', '10000'))
+    # Every GEOLOCATION_SWEEP_INTERVAL seconds (0 disables it), up to
+    # GEOLOCATION_SWEEP_BATCH IPs of rows still pending a location are queued
+    # again: those dropped on a full queue, or whose enrichment failed
+    GEOLOCATION_SWEEP_INTERVAL = float(os.getenv('GEOLOCATION_SWEEP_INTERVAL', '300'))
+    GEOLOCATION_SWEEP_BATCH = int(os.getenv('GEOLOCATION_SWEEP_BATCH', '1000'))
+    # Geolocation cache: size bound (0 disables it), TTL and negative TTL in seconds,
+    # and whether results are also shared across the /24 (IPv4) or /48 (IPv6) prefix
+    GEOLOCATION_CACHE_SIZE = int(os.getenv('GEOLOCATION_CACHE_SIZE', '50000'))
+    GEOLOCATION_CACHE_TTL = float(os.getenv('GEOLOCATION_CACHE_TTL', '86400'))
+    GEOLOCATION_NEGATIVE_TTL = float(os.getenv('GEOLOCATION_NEGATIVE_TTL', '60'))
+    GEOLOCATION_CACHE_PREFIXES = os.getenv('GEOLOCATION_CACHE_PREFIXES', 'True').lower() in ('true', '1', 't')
+    # Offline database built with scripts/build_geoip_db.py; replaces the HTTP lookup when set
+    GEOIP_DATABASE_PATH = os.getenv('GEOIP_DATABASE_PATH')
+
+    # Telemetry write-behind buffer: flush every TELEMETRY_BATCH_SIZE events or
+    # TELEMETRY_FLUSH_INTERVAL seconds; beyond TELEMETRY_MAX_BUFFER buffered events,
+    # drop the 'oldest' or the 'newest' one
+    TELEMETRY_BATCH_SIZE = int(os.getenv('TELEMETRY_BATCH_SIZE', '500'))
+    TELEMETRY_FLUSH_INTERVAL = float(os.getenv('TELEMETRY_FLUSH_INTERVAL', '1'))
+    TELEMETRY_MAX_BUFFER = int(os.getenv('TELEMETRY_MAX_BUFFER', '50000'))
+    TELEMETRY_DROP_POLICY = os.getenv('TELEMETRY_DROP_POLICY', 'oldest')
+
+    # License cache: validation records keyed by license key (0 disables it).
+    # Writes in this process invalidate entries immediately; the TTL bounds how long
+    # a change made by another worker process can go unnoticed
+    LICENSE_CACHE_SIZE = int(os.getenv('LICENSE_CACHE_SIZE', '100000'))
+    LICENSE_CACHE_TTL = float(os.getenv('LICENSE_CACHE_TTL', '60'))
+
+    # App registry: app records used for JWT signing, filled lazily or preloaded at startup
+    APP_REGISTRY_SIZE = int(os.getenv('APP_REGISTRY_SIZE', '10000'))
+    APP_REGISTRY_TTL = float(os.getenv('APP_REGISTRY_TTL', '300'))
+    APP_REGISTRY_NEGATIVE_TTL = float(os.getenv('APP_REGISTRY_NEGATIVE_TTL', '30'))
+    APP_REGISTRY_PRELOAD = os.getenv('APP_REGISTRY_PRELOAD', 'False').lower() in ('true', '1', 't')
+
+    # Token signing: 'EdDSA' or 'ES256' sign with per-app asymmetric keys published at
+    # /api/v1/apps/<id>/jwks; 'HS256' signs with the app secret (no local verification).
+    # Retired keys stay published for SIGNING_KEY_GRACE_MINUTES so issued tokens keep verifying
+    TOKEN_SIGNING_ALGORITHM = os.getenv('TOKEN_SIGNING_ALGORITHM', 'EdDSA')
+    TOKEN_EXPIRATION_MINUTES = int(os.getenv('TOKEN_EXPIRATION_MINUTES', '60'))
+    SIGNING_KEY_GRACE_MINUTES = int(os.getenv('SIGNING_KEY_GRACE_MINUTES', '1440'))
+
+    # Revocation set used by /api/v1/refresh: reloaded from licenses.status every
+    # REVOCATION_REFRESH_INTERVAL seconds to pick up revocations made by other workers
+    REVOCATION_REFRESH_INTERVAL = float(os.getenv('REVOCATION_REFRESH_INTERVAL', '30'))
+
+    # Bloom filter of license keys: unknown keys are answered "License not found" without
+    # a query. Sized for the given false positive rate (share of unknown keys still
+    # looked up); keys created by other workers are picked up every SYNC_INTERVAL seconds
+    LICENSE_FILTER_ENABLED = os.getenv('LICENSE_FILTER_ENABLED', 'True').lower() in ('true', '1', 't')
+    LICENSE_FILTER_FALSE_POSITIVE_RATE = float(os.getenv('LICENSE_FILTER_FALSE_POSITIVE_RATE', '0.001'))
+    LICENSE_FILTER_MIN_CAPACITY = int(os.getenv('LICENSE_FILTER_MIN_CAPACITY', '100000'))
+    LICENSE_FILTER_SYNC_INTERVAL = float(os.getenv('LICENSE_FILTER_SYNC_INTERVAL', '5'))
+
+    # Maximum number of items accepted by /api/v1/validate/batch
+    VALIDATE_BATCH_MAX_ITEMS = int(os.getenv('VALIDATE_BATCH_MAX_ITEMS', '1000'))
+
+    # Reverse proxies in front of the API that append the client address to
+    # X-Forwarded-For. The client IP (rate limits, IP filter, telemetry) is the
+    # entry written by the outermost one; with 0 the header is ignored, as any
+    # client can set it, and the TCP peer address is used. TRUSTED_PROXY_NETWORKS
+    # (comma-separated CIDRs) are the proxies' own addresses, never auto-blocked
+    TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', '0'))
+    TRUSTED_PROXY_NETWORKS = [network.strip() for network in os.getenv('TRUSTED_PROXY_NETWORKS', '').split(',') if network.strip()]
+
+    # Rate limits of /api/v1/validate: token buckets per client IP, app_id and
+    # license key, as a sustained RATE per second (0 disables the bucket) and a
+    # BURST. Requests over a limit get 429 with Retry-After before any I/O.
+    # Batch validation takes one IP token per request and app and key tokens
+    # per item; /api/v1/refresh takes one IP token. The IP bucket is off by
+    # default until TRUSTED_PROXY_HOPS is set: behind an unconfigured proxy,
+    # every client would share the proxy's bucket.
+    # Buckets are held per process (at most RATE_LIMIT_MAX_BUCKETS per scope);
+    # RATE_LIMIT_SHARED also counts them in PostgreSQL, across workers
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() in ('true', '1', 't')
+    RATE_LIMIT_IP_RATE = float(os.getenv('RATE_LIMIT_IP_RATE', '5' if TRUSTED_PROXY_HOPS else '0'))
+    RATE_LIMIT_IP_BURST = float(os.getenv('RATE_LIMIT_IP_BURST', '20'))
+    RATE_LIMIT_APP_RATE = float(os.getenv('RATE_LIMIT_APP_RATE', '500'))
+    RATE_LIMIT_APP_BURST = float(os.getenv('RATE_LIMIT_APP_BURST', '1000'))
+    RATE_LIMIT_KEY_RATE = float(os.getenv('RATE_LIMIT_KEY_RATE', '0.2'))
+    RATE_LIMIT_KEY_BURST = float(os.getenv('RATE_LIMIT_KEY_BURST', '5'))
+    RATE_LIMIT_MAX_BUCKETS = int(os.getenv('RATE_LIMIT_MAX_BUCKETS', '100000'))
+    RATE_LIMIT_SHARED = os.getenv('RATE_LIMIT_SHARED', 'False').lower() in ('true', '1', 't')
+    RATE_LIMIT_SHARED_CLEANUP_INTERVAL = float(os.getenv('RATE_LIMIT_SHARED_CLEANUP_INTERVAL', '60'))
+
+    # IP filter: block and allow networks of the ip_rules table (admin page
+    # "Règles IP"), checked from memory against the client IP (see
+    # TRUSTED_PROXY_HOPS) before validation and refresh, and reloaded every
+    # IP_RULES_REFRESH_INTERVAL seconds. IPs with IP_AUTOBLOCK_THRESHOLD failed
+    # attempts (0 disables it) in IP_AUTOBLOCK_WINDOW_MINUTES are blocked for
+    # IP_AUTOBLOCK_MINUTES, checked every IP_AUTOBLOCK_INTERVAL seconds. The
+    # autoblock is off by default until TRUSTED_PROXY_HOPS is set: behind an
+    # unconfigured proxy, every client has the proxy's address
+    IP_FILTER_ENABLED = os.getenv('IP_FILTER_ENABLED', 'True').lower() in ('true', '1', 't')
+    IP_RULES_REFRESH_INTERVAL = float(os.getenv('IP_RULES_REFRESH_INTERVAL', '10'))
+    IP_AUTOBLOCK_THRESHOLD = int(os.getenv('IP_AUTOBLOCK_THRESHOLD', '100' if TRUSTED_PROXY_HOPS else '0'))
+    IP_AUTOBLOCK_WINDOW_MINUTES = int(os.getenv('IP_AUTOBLOCK_WINDOW_MINUTES', '10'))
+    IP_AUTOBLOCK_MINUTES = int(os.getenv('IP_AUTOBLOCK_MINUTES', '1440'))
+    IP_AUTOBLOCK_INTERVAL = float(os.getenv('IP_AUTOBLOCK_INTERVAL', '60'))
+
+    # License key format of new apps: 1 = XXXX-XXXX-XXXX-XXXX, 2 = with a fifth
+    # checksum group that lets malformed keys be rejected without a query.
+    # The checksum secret must never change once format 2 keys have been issued.
+    # Without it, new apps fall back to format 1 and format 2 keys are refused
+    LICENSE_KEY_FORMAT = int(os.getenv('LICENSE_KEY_FORMAT', '2'))
+    LICENSE_KEY_CHECKSUM_SECRET = os.getenv('LICENSE_KEY_CHECKSUM_SECRET', '')
+
+    # Bulk license generation: licenses per request, and per insert/commit
+    BULK_LICENSE_MAX_COUNT = int(os.getenv('BULK_LICENSE_MAX_COUNT', '100000'))
+    BULK_LICENSE_CHUNK_SIZE = int(os.getenv('BULK_LICENSE_CHUNK_SIZE', '5000'))
+
+    # Rows per page of the activations and security log admin lists
+    ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', '50'))
+
+    # Activation and failed attempt exports: rows per server-side cursor fetch
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+    # Async (ASGI) validation server: asyncpg pool bounds
+    ASYNC_DB_POOL_MIN = int(os.getenv('ASYNC_DB_POOL_MIN', '2'))
+    ASYNC_DB_POOL_MAX = int(os.getenv('ASYNC_DB_POOL_MAX', '20'))
+
+    # Schema migrations (python scripts/init_db.py): give up on a lock after this
+    # long rather than queue every query on the table behind the migration
+    MIGRATION_LOCK_TIMEOUT = os.getenv('MIGRATION_LOCK_TIMEOUT', '5s')
+
+    # Monthly partitions of activations and failed_attempts
+    # (python scripts/maintain_partitions.py, daily): months created ahead, and
+    # months kept besides the current one before a partition is dropped, or
+    # kept as a standalone archive table with TELEMETRY_ARCHIVE_EXPIRED.
+    # A retention of 0 keeps every month.
+    TELEMETRY_PARTITIONS_AHEAD = int(os.getenv('TELEMETRY_PARTITIONS_AHEAD', '3'))
+    ACTIVATIONS_RETENTION_MONTHS = int(os.getenv('ACTIVATIONS_RETENTION_MONTHS', '24'))
+    FAILED_ATTEMPTS_RETENTION_MONTHS = int(os.getenv('FAILED_ATTEMPTS_RETENTION_MONTHS', '3'))
+    TELEMETRY_ARCHIVE_EXPIRED = os.getenv('TELEMETRY_ARCHIVE_EXPIRED', 'False').lower() in ('true', '1', 't')
 
     # Application settings
     DEBUG = os.getenv('DEBUG', 'False').lower() in ('true', '1', 't')
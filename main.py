@@ -3,6 +3,7 @@ from config.settings import Config
 from routes.api_routes import api_bp
 from routes.admin_routes import admin_bp
 from routes.auth_routes import auth_bp
+from services import app_registry, ip_filter, license_filter, partition_maintenance, revocation_list
 
 app = Flask(__name__, static_folder='statics')
 app.config.from_object(Config)
@@ -13,6 +14,43 @@ app.register_blueprint(auth_bp)
 app.register_blueprint(api_bp)
 app.register_blueprint(admin_bp)
 
+# Warm the app registry so the first validations do not pay for app lookups
+if Config.APP_REGISTRY_PRELOAD:
+    try:
+        print(f"App registry preloaded with {app_registry.preload()} apps.")
+    except Exception as e:
+        print(f"Error preloading app registry: {e}")
+
+# Telemetry inserts fail outside every partition: do not rely on cron alone
+try:
+    created = partition_maintenance.ensure_upcoming()
+    if created:
+        print(f"Telemetry partitions created: {', '.join(created)}.")
+except Exception as e:
+    print(f"Error creating telemetry partitions: {e}")
+
+# Tokens are refreshed against the revocation list, reloaded in the background
+try:
+    print(f"Revocation list loaded with {revocation_list.load()} licenses.")
+except Exception as e:
+    print(f"Error loading revocation list: {e}")
+
+# Unknown license keys are rejected without a query once the key filter is built
+try:
+    count = license_filter.load()
+    if count is not None:
+        print(f"License filter built with {count} keys.")
+except Exception as e:
+    print(f"Error building license filter: {e}")
+
+# Requests from blocked networks are turned away from memory once the IP rules are loaded
+try:
+    count = ip_filter.load()
+    if count is not None:
+        print(f"IP filter loaded with {count} rules.")
+except Exception as e:
+    print(f"Error loading IP filter: {e}")
+
 @app.route('/')
 def index():
     return redirect(url_for('admin.dashboard'))
@@ -0,0 +1,4 @@
+"""
+Versioned schema migrations, applied in order by migrations.runner.migrate
+(python scripts/init_db.py). See migrations/runner.py for how to write one.
+"""
@@ -0,0 +1,178 @@
+import importlib
+import pkgutil
+import re
+from collections import namedtuple
+from config.database import get_db_connection
+from config.settings import Config
+
+# Migrations are the modules of this package named v<version>_<name>.py. Each
+# defines upgrade(cursor) and TRANSACTIONAL:
+#   - True: upgrade runs in one transaction with the recording of its version.
+#   - False: each statement commits on its own, which CREATE INDEX CONCURRENTLY
+#     and long validations require. Such migrations must be safe to re-run
+#     after a partial failure (IF NOT EXISTS, create_index_concurrently).
+# The first line of the module docstring describes the migration.
+Migration = namedtuple('Migration', ['version', 'name', 'description', 'transactional', 'upgrade'])
+
+_MIGRATION_MODULE = re.compile(r'^v(\d+)_(\w+)$')
+
+# Key of the advisory lock held while migrating, so that concurrent deploys
+# do not apply the same migration twice
+_ADVISORY_LOCK_KEY = 0x4B50_0019
+
+def discover():
+    """
+    Lists the migrations of the package, in version order.
+    Raises ValueError if two migrations share a version.
+    """
+    import migrations
+
+    found = {}
+    for module_info in pkgutil.iter_modules(migrations.__path__):
+        match = _MIGRATION_MODULE.match(module_info.name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in found:
+            raise ValueError(f"Duplicate migration version {version}: {found[version].name} and {module_info.name}")
+        module = importlib.import_module(f"migrations.{module_info.name}")
+        description = (module.__doc__ or match.group(2)).strip().splitlines()[0]
+        found[version] = Migration(version, module_info.name, description, module.TRANSACTIONAL, module.upgrade)
+    return [found[version] for version in sorted(found)]
+
+def applied_versions(cursor):
+    """Returns the set of applied migration versions."""
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def migrate(conn=None, target=None):
+    """
+    Applies the pending migrations, in version order, up to 'target' (all by default).
+
+    Statements run with lock_timeout set to MIGRATION_LOCK_TIMEOUT: a migration
+    waiting too long for a lock fails (and can be re-run) rather than queueing
+    every query on the table behind it. The pool's DB_STATEMENT_TIMEOUT is
+    lifted: rebuilding a table or an index may take as long as it needs.
+
+    Args:
+        conn (optional): A psycopg2 connection; by default one from the pool.
+        target (int, optional): The last version to apply.
+
+    Returns:
+        list: The versions applied.
+    """
+    if conn is None:
+        with get_db_connection() as conn:
+            return migrate(conn, target)
+
+    autocommit = conn.autocommit
+    conn.rollback()
+    conn.autocommit = True
+    applied = []
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", (_ADVISORY_LOCK_KEY,))
+            try:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT NOT NULL,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+                """)
+                done = applied_versions(cursor)
+                cursor.execute("SET lock_timeout = %s", (Config.MIGRATION_LOCK_TIMEOUT,))
+                cursor.execute("SET statement_timeout = 0")
+                for migration in discover():
+                    if migration.version in done or (target is not None and migration.version > target):
+                        continue
+                    print(f"Applying migration {migration.version}: {migration.description}")
+                    _apply(cursor, migration)
+                    applied.append(migration.version)
+            finally:
+                cursor.execute("RESET lock_timeout")
+                cursor.execute("RESET statement_timeout")
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (_ADVISORY_LOCK_KEY,))
+    finally:
+        conn.autocommit = autocommit
+    return applied
+
+def _apply(cursor, migration):
+    record = "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)"
+    if not migration.transactional:
+        migration.upgrade(cursor)
+        cursor.execute(record, (migration.version, migration.description))
+        return
+
+    cursor.execute("BEGIN")
+    try:
+        migration.upgrade(cursor)
+        cursor.execute(record, (migration.version, migration.description))
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    cursor.execute("COMMIT")
+
+def create_index_concurrently(cursor, name, definition):
+    """
+    Builds an index without blocking writes to its table, for non-transactional
+    migrations. An invalid index left by an interrupted build is dropped and
+    rebuilt; a valid one is kept.
+
+    Args:
+        cursor: A cursor of a connection in autocommit mode.
+        name (str): The index name.
+        definition (str): What follows 'ON', e.g. "licenses (app_id, created_at DESC)".
+    """
+    cursor.execute("""
+        SELECT i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND pg_catalog.pg_table_is_visible(c.oid)
+    """, (name,))
+    row = cursor.fetchone()
+    if row and row[0]:
+        return
+    if row:
+        print(f"Dropping invalid index {name} left by an interrupted build...")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    print(f"Creating index {name}...")
+    cursor.execute(f"CREATE INDEX CONCURRENTLY {name} ON {definition}")
+
+def create_partitioned_index_concurrently(cursor, name, table, columns, where=None):
+    """
+    Builds an index of a partitioned table without blocking writes to it, for
+    non-transactional migrations: the index is created on the parent table
+    only (invalid, as nothing backs it yet), then built concurrently on each
+    partition and attached. It becomes valid once every partition is, and
+    partitions created later get their own copy. Safe to re-run.
+
+    Args:
+        cursor: A cursor of a connection in autocommit mode.
+        name (str): The index name on the partitioned table.
+        table (str): The partitioned table.
+        columns (str): The indexed columns, e.g. "(ip_address)".
+        where (str, optional): The predicate of a partial index.
+    """
+    predicate = f" WHERE {where}" if where else ""
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {columns}{predicate}")
+    cursor.execute("""
+        SELECT c.relname,
+            EXISTS (
+                SELECT 1 FROM pg_inherits ii
+                JOIN pg_index pi ON pi.indexrelid = ii.inhrelid
+                WHERE ii.inhparent = to_regclass(%s) AND pi.indrelid = c.oid
+            )
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+    """, (name, table))
+    for partition, attached in cursor.fetchall():
+        if attached:
+            continue
+        # Named as Postgres names the copies it makes for new partitions
+        column_names = '_'.join(re.findall(r'\w+', columns))
+        partition_index = f"{partition}_{column_names}_idx"
+        create_index_concurrently(cursor, partition_index, f"{partition} {columns}{predicate}")
+        cursor.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
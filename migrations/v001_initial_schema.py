@@ -0,0 +1,216 @@
+"""
+Initial schema: the tables, and the triggers maintaining app_stats.
+
+Tables are created with IF NOT EXISTS, so that databases set up before
+migrations existed adopt this version as they are.
+"""
+
+TRANSACTIONAL = True
+
+# Counters of app_stats maintained from each table: the delta query of the rows
+# of a statement (the 'rows' subquery yields app_id and sign, +1 or -1).
+_LICENSE_COUNTERS = {
+    'licenses': "1",
+    'licenses_active': "CASE WHEN status = 'active' THEN 1 ELSE 0 END",
+    'licenses_used': "CASE WHEN status = 'used' THEN 1 ELSE 0 END",
+    'licenses_revoked': "CASE WHEN status = 'revoked' THEN 1 ELSE 0 END",
+    'licenses_expired': "CASE WHEN status = 'expired' THEN 1 ELSE 0 END",
+    'licenses_trial': "CASE WHEN type = 'trial' THEN 1 ELSE 0 END",
+    'licenses_lifetime': "CASE WHEN type = 'lifetime' THEN 1 ELSE 0 END"
+}
+
+_APP_STATS_TRIGGERS = {
+    # table: (counters, columns of the delta rows, row source per transition table)
+    'licenses': (_LICENSE_COUNTERS, "app_id, status, type", "{table}"),
+    'activations': ({'activations': "1"}, "l.app_id", "{table} t JOIN licenses l ON l.id = t.license_id"),
+    'failed_attempts': ({'failed_attempts': "1"}, "app_id", "{table}")
+}
+
+def _app_stats_delta(counters, columns, source):
+    """
+    Returns the statement applying the rows of the transition tables in
+    'source' (a query yielding the delta columns and a sign) to app_stats.
+    Apps deleted in the same statement (cascades) are skipped, and rows are
+    locked in app order so that concurrent statements cannot deadlock.
+    """
+    names = list(counters)
+    return f"""
+        INSERT INTO app_stats (app_id, {', '.join(names)})
+        SELECT d.app_id, {', '.join(f'SUM(d.sign * ({counters[name]}))' for name in names)}
+        FROM ({source}) d
+        WHERE d.app_id IN (SELECT id FROM apps)
+        GROUP BY d.app_id
+        ORDER BY d.app_id
+        ON CONFLICT (app_id) DO UPDATE SET
+            {', '.join(f'{name} = app_stats.{name} + EXCLUDED.{name}' for name in names)},
+            updated_at = CURRENT_TIMESTAMP;
+    """
+
+def _create_app_stats_triggers(cursor, tables=None):
+    """
+    Creates the statement-level triggers maintaining app_stats. Each INSERT,
+    UPDATE or DELETE statement applies its net effect per app in one upsert,
+    so a multi-row insert of thousands of licenses updates one row per app.
+
+    Args:
+        cursor: The migration cursor.
+        tables (list, optional): Only (re)create the triggers of these tables.
+    """
+    for table, (counters, columns, rows) in _APP_STATS_TRIGGERS.items():
+        if tables is not None and table not in tables:
+            continue
+        inserted = f"SELECT {columns}, 1 AS sign FROM {rows.format(table='new_rows')}"
+        deleted = f"SELECT {columns}, -1 AS sign FROM {rows.format(table='old_rows')}"
+        cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION app_stats_{table}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    {_app_stats_delta(counters, columns, inserted)}
+                ELSIF TG_OP = 'UPDATE' THEN
+                    {_app_stats_delta(counters, columns, inserted + ' UNION ALL ' + deleted)}
+                ELSE
+                    {_app_stats_delta(counters, columns, deleted)}
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+
+        events = [('insert', 'INSERT', 'NEW TABLE AS new_rows'), ('delete', 'DELETE', 'OLD TABLE AS old_rows')]
+        if table == 'licenses':
+            # Status changes move license counters (transition tables rule out an UPDATE OF column list)
+            events.append(('update', 'UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'))
+        for suffix, event, transition in events:
+            cursor.execute(f"DROP TRIGGER IF EXISTS app_stats_{table}_{suffix} ON {table};")
+            cursor.execute(f"""
+                CREATE TRIGGER app_stats_{table}_{suffix}
+                AFTER {event} ON {table}
+                REFERENCING {transition}
+                FOR EACH STATEMENT EXECUTE FUNCTION app_stats_{table}();
+            """)
+
+def upgrade(cursor):
+    # Create admins table
+    print("Creating 'admins' table...")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS admins (
+            id SERIAL PRIMARY KEY,
+            username VARCHAR(255) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL
+        );
+    """)
+
+    # Create apps table
+    print("Creating 'apps' table...")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS apps (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            app_secret VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            key_format INTEGER NOT NULL DEFAULT 1
+        );
+    """)
+    # License key format of the app (see algorithms/key_generator.py);
+    # apps created before key formats existed keep format 1
+    cursor.execute("ALTER TABLE apps ADD COLUMN IF NOT EXISTS key_format INTEGER NOT NULL DEFAULT 1;")
+
+    # Create licenses table
+    print("Creating 'licenses' table...")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS licenses (
+            id SERIAL PRIMARY KEY,
+            app_id INTEGER REFERENCES apps(id) ON DELETE CASCADE,
+            license_key VARCHAR(255) UNIQUE NOT NULL,
+            type VARCHAR(50) CHECK (type IN ('trial', 'lifetime')) NOT NULL,
+            duration_days INTEGER,
+            status VARCHAR(50) CHECK (status IN ('active', 'revoked', 'expired')) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+    # Create machines table
+    print("Creating 'machines' table...")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS machines (
+            id SERIAL PRIMARY KEY,
+            license_id INTEGER REFERENCES licenses(id) ON DELETE CASCADE,
+            hwid VARCHAR(255) UNIQUE NOT NULL,
+            activated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+    # Create activations table
+    print("Creating 'activations' table...")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS activations (
+            id SERIAL PRIMARY KEY,
+            license_id INTEGER REFERENCES licenses(id) ON DELETE CASCADE,
+            ip_address VARCHAR(255),
+            mac_address VARCHAR(255),
+            user_agent VARCHAR(255),
+            country VARCHAR(100),
+            city VARCHAR(100),
+            activated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+    # Create app_signing_keys table
+    # At most one active (non retired) key per app; retired keys stay
+    # published in the JWKS for SIGNING_KEY_GRACE_MINUTES.
+    print("Creating 'app_signing_keys' table...")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS app_signing_keys (
+            id SERIAL PRIMARY KEY,
+            app_id INTEGER REFERENCES apps(id) ON DELETE CASCADE,
+            kid VARCHAR(64) UNIQUE NOT NULL,
+            algorithm VARCHAR(16) NOT NULL,
+            private_key TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            retired_at TIMESTAMP
+        );
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_app_signing_keys_active
+        ON app_signing_keys (app_id) WHERE retired_at IS NULL;
+    """)
+
+    # Create failed_attempts table
+    print("Creating 'failed_attempts' table...")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS failed_attempts (
+            id SERIAL PRIMARY KEY,
+            app_id INTEGER REFERENCES apps(id) ON DELETE CASCADE,
+            attempted_key VARCHAR(255),
+            ip_address VARCHAR(255),
+            mac_address VARCHAR(255),
+            user_agent VARCHAR(255),
+            country VARCHAR(100),
+            city VARCHAR(100),
+            reason VARCHAR(255),
+            attempted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+    # Create app_stats table
+    # Per-app counters kept up to date by statement-level triggers, so the
+    # dashboard reads one row per app instead of counting the tables.
+    # scripts/reconcile_app_stats.py corrects any drift.
+    print("Creating 'app_stats' table...")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS app_stats (
+            app_id INTEGER PRIMARY KEY REFERENCES apps(id) ON DELETE CASCADE,
+            licenses BIGINT NOT NULL DEFAULT 0,
+            licenses_active BIGINT NOT NULL DEFAULT 0,
+            licenses_used BIGINT NOT NULL DEFAULT 0,
+            licenses_revoked BIGINT NOT NULL DEFAULT 0,
+            licenses_expired BIGINT NOT NULL DEFAULT 0,
+            licenses_trial BIGINT NOT NULL DEFAULT 0,
+            licenses_lifetime BIGINT NOT NULL DEFAULT 0,
+            activations BIGINT NOT NULL DEFAULT 0,
+            failed_attempts BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    _create_app_stats_triggers(cursor)
+    print("Run scripts/reconcile_app_stats.py to count the rows that existed before the app_stats triggers.")
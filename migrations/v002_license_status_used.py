@@ -0,0 +1,19 @@
+"""
+Allow the 'used' license status in the licenses status check.
+
+Validation marks activated licenses as 'used', which the original check
+('active', 'revoked', 'expired') rejected. The new check is added NOT VALID
+(a catalog change, no scan) and validated in a separate statement, which
+scans the table without blocking reads or writes.
+"""
+
+TRANSACTIONAL = False
+
+def upgrade(cursor):
+    cursor.execute("""
+        ALTER TABLE licenses
+            DROP CONSTRAINT IF EXISTS licenses_status_check,
+            ADD CONSTRAINT licenses_status_check
+                CHECK (status IN ('active', 'used', 'revoked', 'expired')) NOT VALID;
+    """)
+    cursor.execute("ALTER TABLE licenses VALIDATE CONSTRAINT licenses_status_check;")
@@ -0,0 +1,30 @@
+"""
+Index the hot-path queries, built concurrently so writes are never blocked.
+
+- machines (license_id): the machine bound to a license, joined on every validation.
+- licenses (app_id, created_at DESC): the licenses of an app, newest first,
+  and the per-app recount of app_stats.
+- activations (activated_at DESC, id DESC) and failed_attempts (attempted_at
+  DESC, id DESC): the keyset paged admin lists.
+- failed_attempts (app_id, attempted_at DESC, id DESC): the same list for one app.
+- activations (license_id): activations of a license, and license deletes.
+"""
+from migrations.runner import create_index_concurrently
+
+TRANSACTIONAL = False
+
+INDEXES = {
+    'idx_machines_license_id': "machines (license_id)",
+    'idx_licenses_app_id_created_at': "licenses (app_id, created_at DESC)",
+    'idx_activations_activated_at': "activations (activated_at DESC, id DESC)",
+    'idx_activations_license_id': "activations (license_id)",
+    'idx_failed_attempts_attempted_at': "failed_attempts (attempted_at DESC, id DESC)",
+    'idx_failed_attempts_app_attempted_at': "failed_attempts (app_id, attempted_at DESC, id DESC)"
+}
+
+def upgrade(cursor):
+    for name, definition in INDEXES.items():
+        create_index_concurrently(cursor, name, definition)
+
+    # Superseded by idx_licenses_app_id_created_at (created by init_db before migrations)
+    cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_licenses_app_id")
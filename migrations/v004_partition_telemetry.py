@@ -0,0 +1,128 @@
+"""
+Partition activations and failed_attempts by month on their timestamps.
+
+Old partitions are dropped (or archived) whole by scripts/maintain_partitions.py
+instead of deleting rows, and the admin lists only scan the months they reach.
+
+Each table is swapped for a partitioned one in a short transaction: the old
+table is renamed <table>_unpartitioned, and the new one takes over its name,
+ID sequence, indexes and app_stats triggers, so writes go on from there. The
+old rows are then moved over in batches (a DELETE ... RETURNING feeding an
+INSERT, so each batch moves exactly once, and the app_stats triggers of both
+tables cancel out), and the emptied table is dropped. An interrupted run
+resumes where it stopped. Admin lists miss the rows not moved yet.
+
+Primary keys become (id, <timestamp>), as a partitioned table requires, and
+the timestamps NOT NULL; rows without one get the time of the move.
+"""
+from datetime import date
+from config.settings import Config
+from migrations.v001_initial_schema import _create_app_stats_triggers
+from migrations.v003_hot_path_indexes import INDEXES
+from models.partition_model import PARTITIONED_TABLES, add_months, create_partition_statement, month_start
+
+TRANSACTIONAL = False
+
+# Rows moved per statement
+_BATCH_SIZE = 50000
+
+_COLUMNS = {
+    'activations': """
+        id INTEGER NOT NULL DEFAULT nextval('activations_id_seq'),
+        license_id INTEGER REFERENCES licenses(id) ON DELETE CASCADE,
+        ip_address VARCHAR(255),
+        mac_address VARCHAR(255),
+        user_agent VARCHAR(255),
+        country VARCHAR(100),
+        city VARCHAR(100),
+        activated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, activated_at)
+    """,
+    'failed_attempts': """
+        id INTEGER NOT NULL DEFAULT nextval('failed_attempts_id_seq'),
+        app_id INTEGER REFERENCES apps(id) ON DELETE CASCADE,
+        attempted_key VARCHAR(255),
+        ip_address VARCHAR(255),
+        mac_address VARCHAR(255),
+        user_agent VARCHAR(255),
+        country VARCHAR(100),
+        city VARCHAR(100),
+        reason VARCHAR(255),
+        attempted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, attempted_at)
+    """
+}
+
+def upgrade(cursor):
+    for table, time_column in PARTITIONED_TABLES.items():
+        old_table = f"{table}_unpartitioned"
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        if cursor.fetchone()[0] != 'p':
+            _swap_table(cursor, table, old_table)
+
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (old_table,))
+        if cursor.fetchone()[0]:
+            _move_rows(cursor, table, old_table, time_column)
+            cursor.execute(f"DROP TABLE {old_table}")
+
+def _swap_table(cursor, table, old_table):
+    print(f"Replacing '{table}' with a partitioned table...")
+    indexes = {name: definition for name, definition in INDEXES.items() if definition.startswith(f"{table} ")}
+    cursor.execute("BEGIN")
+    try:
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+        # Free the index names for the new table; the old one is only read by ID from now on
+        cursor.execute(f"ALTER TABLE {old_table} RENAME CONSTRAINT {table}_pkey TO {old_table}_pkey")
+        for name in indexes:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+        cursor.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+        cursor.execute(f"CREATE TABLE {table} ({_COLUMNS[table]}) PARTITION BY RANGE ({PARTITIONED_TABLES[table]})")
+        cursor.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        for name, definition in indexes.items():
+            cursor.execute(f"CREATE INDEX {name} ON {definition}")
+        _create_partitions(cursor, table, None, None)
+        _create_app_stats_triggers(cursor, [table])
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    cursor.execute("COMMIT")
+
+def _move_rows(cursor, table, old_table, time_column):
+    cursor.execute(f"SELECT MIN({time_column}), MAX({time_column}) FROM {old_table}")
+    _create_partitions(cursor, table, *cursor.fetchone())
+
+    cursor.execute(
+        "SELECT string_agg(attname, ', ' ORDER BY attnum) FROM pg_attribute "
+        "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped",
+        (table,)
+    )
+    columns = cursor.fetchone()[0]
+    values = columns.replace(time_column, f"COALESCE({time_column}, CURRENT_TIMESTAMP)")
+    moved = 0
+    while True:
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM {old_table}
+                WHERE id IN (SELECT id FROM {old_table} ORDER BY id LIMIT %s)
+                RETURNING {columns}
+            )
+            INSERT INTO {table} ({columns})
+            SELECT {values} FROM moved
+        """, (_BATCH_SIZE,))
+        moved += cursor.rowcount
+        if cursor.rowcount < _BATCH_SIZE:
+            break
+        print(f"Moved {moved} rows to '{table}'...")
+    print(f"Moved {moved} rows to '{table}'.")
+
+def _create_partitions(cursor, table, first, last):
+    """Creates the monthly partitions from 'first' (or this month) to 'last', and TELEMETRY_PARTITIONS_AHEAD months ahead."""
+    this_month = month_start(date.today())
+    month = min(month_start(first), this_month) if first else this_month
+    end = add_months(this_month, Config.TELEMETRY_PARTITIONS_AHEAD)
+    if last:
+        end = max(end, month_start(last))
+    while month <= end:
+        cursor.execute(create_partition_statement(table, month))
+        month = add_months(month, 1)
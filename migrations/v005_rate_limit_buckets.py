@@ -0,0 +1,41 @@
+"""
+Shared rate limit buckets, for RATE_LIMIT_SHARED.
+
+The table is UNLOGGED: buckets are lost on a crash, which only resets the
+limits, and updates on every validation do not go through the WAL.
+rate_limit_acquire refills a bucket and takes a token in one call, holding
+the row lock of the bucket in between.
+"""
+
+TRANSACTIONAL = True
+
+def upgrade(cursor):
+    print("Creating 'rate_limit_buckets' table...")
+    cursor.execute("""
+        CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+            key TEXT PRIMARY KEY,
+            tokens DOUBLE PRECISION NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        );
+    """)
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION rate_limit_acquire(p_key TEXT, p_rate DOUBLE PRECISION, p_burst DOUBLE PRECISION)
+        RETURNS DOUBLE PRECISION AS $$
+        DECLARE
+            available DOUBLE PRECISION;
+        BEGIN
+            INSERT INTO rate_limit_buckets AS b (key, tokens, updated_at)
+            VALUES (p_key, p_burst, clock_timestamp())
+            ON CONFLICT (key) DO UPDATE SET
+                tokens = LEAST(p_burst, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * p_rate),
+                updated_at = clock_timestamp()
+            RETURNING tokens INTO available;
+
+            IF available >= 1 THEN
+                UPDATE rate_limit_buckets SET tokens = tokens - 1 WHERE key = p_key;
+                RETURN 0;
+            END IF;
+            RETURN (1 - available) / p_rate;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
@@ -0,0 +1,20 @@
+"""
+IP rules: admin-managed block and allow networks, and expiring blocks promoted
+from failed_attempts, loaded by the IP filter (services/ip_filter.py).
+"""
+
+TRANSACTIONAL = True
+
+def upgrade(cursor):
+    print("Creating 'ip_rules' table...")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ip_rules (
+            id SERIAL PRIMARY KEY,
+            network CIDR UNIQUE NOT NULL,
+            action VARCHAR(10) CHECK (action IN ('allow', 'block')) NOT NULL,
+            reason VARCHAR(255),
+            source VARCHAR(10) CHECK (source IN ('admin', 'auto')) NOT NULL DEFAULT 'admin',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP
+        );
+    """)
@@ -0,0 +1,19 @@
+"""
+Index the telemetry rows still waiting for their geolocation, per IP address.
+
+Each location the geolocation pipeline resolves is applied with an UPDATE of
+the rows of that IP whose country is still NULL (tracking_model.apply_geolocation).
+Without an index it scans every partition of activations and failed_attempts.
+Rows leave these partial indexes once located, so they stay small however
+long the tables grow.
+"""
+from migrations.runner import create_partitioned_index_concurrently
+from models.partition_model import PARTITIONED_TABLES
+
+TRANSACTIONAL = False
+
+def upgrade(cursor):
+    for table in PARTITIONED_TABLES:
+        create_partitioned_index_concurrently(
+            cursor, f"idx_{table}_pending_geolocation", table, "(ip_address)", where="country IS NULL"
+        )
@@ -1,24 +1,26 @@
 from config.database import get_db_cursor
+from config import prepared_statements
 
-def create_app(name, app_secret):
+def create_app(name, app_secret, key_format=1):
     """
     Creates a new app.
     Returns the created app as a dictionary.
     """
     query = """
-        INSERT INTO apps (name, app_secret)
-        VALUES (%s, %s)
-        RETURNING id, name, app_secret, created_at;
+        INSERT INTO apps (name, app_secret, key_format)
+        VALUES (%s, %s, %s)
+        RETURNING id, name, app_secret, created_at, key_format;
     """
     with get_db_cursor(commit=True) as cursor:
-        cursor.execute(query, (name, app_secret))
+        cursor.execute(query, (name, app_secret, key_format))
         row = cursor.fetchone()
         if row:
             return {
                 'id': row[0],
                 'name': row[1],
                 'app_secret': row[2],
-                'created_at': row[3]
+                'created_at': row[3],
+                'key_format': row[4]
             }
         return None
 
@@ -27,7 +29,7 @@ def list_apps():
     Lists all apps.
     Returns a list of dictionaries.
     """
-    query = "SELECT id, name, app_secret, created_at FROM apps ORDER BY created_at DESC"
+    query = "SELECT id, name, app_secret, created_at, key_format FROM apps ORDER BY created_at DESC"
     with get_db_cursor() as cursor:
         cursor.execute(query)
         rows = cursor.fetchall()
@@ -37,24 +39,50 @@ def list_apps():
                 'id': row[0],
                 'name': row[1],
                 'app_secret': row[2],
-                'created_at': row[3]
+                'created_at': row[3],
+                'key_format': row[4]
             })
         return apps
 
+_APP_BY_ID = prepared_statements.register('app_by_id', "SELECT id, name, app_secret, created_at, key_format FROM apps WHERE id = %s")
+
 def get_app_by_id(app_id):
     """
     Retrieves an app by its ID.
     Returns a dictionary or None if not found.
     """
-    query = "SELECT id, name, app_secret, created_at FROM apps WHERE id = %s"
     with get_db_cursor() as cursor:
-        cursor.execute(query, (app_id,))
+        _APP_BY_ID.execute(cursor, (app_id,))
+        row = cursor.fetchone()
+        if row:
+            return {
+                'id': row[0],
+                'name': row[1],
+                'app_secret': row[2],
+                'created_at': row[3],
+                'key_format': row[4]
+            }
+        return None
+
+def update_app_secret(app_id, app_secret):
+    """
+    Replaces the secret of an app.
+    Returns the updated app as a dictionary, or None if not found.
+    """
+    query = """
+        UPDATE apps SET app_secret = %s
+        WHERE id = %s
+        RETURNING id, name, app_secret, created_at, key_format;
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(query, (app_secret, app_id))
         row = cursor.fetchone()
         if row:
             return {
                 'id': row[0],
                 'name': row[1],
                 'app_secret': row[2],
-                'created_at': row[3]
+                'created_at': row[3],
+                'key_format': row[4]
             }
         return None
@@ -0,0 +1,70 @@
+from config.database import get_db_cursor
+
+# Counters of the app_stats table, maintained by triggers (see migrations/v001_initial_schema.py)
+COUNTERS = [
+    'licenses', 'licenses_active', 'licenses_used', 'licenses_revoked', 'licenses_expired',
+    'licenses_trial', 'licenses_lifetime', 'activations', 'failed_attempts'
+]
+
+def get_totals():
+    """
+    Sums the counters of every app, reading one app_stats row per app.
+    Returns a dictionary of COUNTERS.
+    """
+    query = f"SELECT {', '.join(f'COALESCE(SUM({name}), 0)' for name in COUNTERS)} FROM app_stats"
+    with get_db_cursor(readonly=True) as cursor:
+        cursor.execute(query)
+        row = cursor.fetchone()
+        return dict(zip(COUNTERS, row))
+
+def list_app_ids():
+    """
+    Lists the IDs of all apps.
+    Returns a list of integers.
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute("SELECT id FROM apps ORDER BY id")
+        return [row[0] for row in cursor.fetchall()]
+
+def reconcile_app(app_id):
+    """
+    Recounts the counters of an app from the tables and corrects its app_stats
+    row if it drifted.
+
+    The row is locked before counting: a concurrent statement that already
+    applied its delta has committed (and is counted) or holds the lock (and is
+    waited for), and one that has not yet applied it will add it on top of
+    the corrected counters. The recount is exact either way.
+
+    Returns:
+        dict: The counters that were wrong, by name, as (stored, actual) tuples.
+    """
+    count_query = """
+        SELECT
+            COUNT(*),
+            COUNT(*) FILTER (WHERE status = 'active'),
+            COUNT(*) FILTER (WHERE status = 'used'),
+            COUNT(*) FILTER (WHERE status = 'revoked'),
+            COUNT(*) FILTER (WHERE status = 'expired'),
+            COUNT(*) FILTER (WHERE type = 'trial'),
+            COUNT(*) FILTER (WHERE type = 'lifetime'),
+            (SELECT COUNT(*) FROM activations a JOIN licenses l ON l.id = a.license_id WHERE l.app_id = %s),
+            (SELECT COUNT(*) FROM failed_attempts WHERE app_id = %s)
+        FROM licenses
+        WHERE app_id = %s
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute("INSERT INTO app_stats (app_id) VALUES (%s) ON CONFLICT (app_id) DO NOTHING", (app_id,))
+        cursor.execute(f"SELECT {', '.join(COUNTERS)} FROM app_stats WHERE app_id = %s FOR UPDATE", (app_id,))
+        stored = cursor.fetchone()
+        cursor.execute(count_query, (app_id, app_id, app_id))
+        actual = cursor.fetchone()
+
+        drift = {name: (s, a) for name, s, a in zip(COUNTERS, stored, actual) if s != a}
+        if drift:
+            assignments = ', '.join(f"{name} = %s" for name in COUNTERS)
+            cursor.execute(
+                f"UPDATE app_stats SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE app_id = %s",
+                tuple(actual) + (app_id,)
+            )
+        return drift
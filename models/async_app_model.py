@@ -0,0 +1,19 @@
+from config.async_database import get_async_connection
+
+async def get_app_by_id(app_id):
+    """
+    Retrieves an app by its ID.
+    Returns a dictionary or None if not found.
+    """
+    query = "SELECT id, name, app_secret, created_at, key_format FROM apps WHERE id = $1"
+    async with get_async_connection() as conn:
+        row = await conn.fetchrow(query, app_id)
+    if row:
+        return {
+            'id': row[0],
+            'name': row[1],
+            'app_secret': row[2],
+            'created_at': row[3],
+            'key_format': row[4]
+        }
+    return None
@@ -0,0 +1,70 @@
+from config.async_database import get_async_connection
+from models import license_cache
+from models.license_model import validation_record_from_row
+
+# asyncpg counterparts of the license_model functions on the validation path,
+# used by the ASGI validation server. They share the license cache with license_model.
+
+async def get_license_for_validation(license_key):
+    """
+    Retrieves a license together with its bound machine in a single query.
+    Returns a dictionary with 'license' and 'machine' keys, or None if not found.
+    'machine' is None when no HWID has been bound to the license yet.
+
+    Records are served from the license cache when possible and must not be modified.
+    """
+    cached = license_cache.get(license_key)
+    if cached:
+        return cached
+
+    query = """
+        SELECT
+            l.id, l.app_id, l.license_key, l.type, l.duration_days, l.status, l.created_at,
+            m.id, m.hwid, m.activated_at
+        FROM licenses l
+        LEFT JOIN machines m ON m.license_id = l.id
+        WHERE l.license_key = $1
+        ORDER BY m.id
+        LIMIT 1
+    """
+    async with get_async_connection() as conn:
+        row = await conn.fetchrow(query, license_key)
+    if row:
+        record = validation_record_from_row(row)
+        license_cache.put(license_key, record)
+        return record
+    return None
+
+async def activate_license(license_id, hwid):
+    """
+    Activates an 'active' license in a single statement: marks it 'used'
+    and binds the HWID.
+    Returns the bound machine id, or None if the license was no longer
+    'active' (e.g. a concurrent request activated it first).
+    """
+    query = """
+        WITH claimed AS (
+            UPDATE licenses SET status = 'used'
+            WHERE id = $1 AND status = 'active'
+            RETURNING id
+        )
+        INSERT INTO machines (license_id, hwid)
+        SELECT id, $2 FROM claimed
+        RETURNING id;
+    """
+    async with get_async_connection(transaction=True) as conn:
+        machine_id = await conn.fetchval(query, license_id, hwid)
+    license_cache.invalidate_license_id(license_id)
+    return machine_id
+
+async def update_license_status(license_id, status):
+    """
+    Updates the status of a license.
+    Returns True if successful, False otherwise.
+    """
+    query = "UPDATE licenses SET status = $1 WHERE id = $2"
+    async with get_async_connection(transaction=True) as conn:
+        result = await conn.execute(query, status, license_id)
+    license_cache.invalidate_license_id(license_id)
+    # asyncpg returns the command tag, e.g. 'UPDATE 1'
+    return result.split()[-1] != '0'
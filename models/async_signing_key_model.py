@@ -0,0 +1,36 @@
+from config.async_database import get_async_connection
+
+# asyncpg counterparts of the signing_key_model functions used to sign tokens,
+# used by the ASGI validation server.
+
+async def get_publishable_keys(app_id, grace_minutes):
+    """
+    Retrieves the signing keys of an app that are active or were retired
+    less than grace_minutes ago, oldest first.
+    Returns a list of dictionaries.
+    """
+    query = """
+        SELECT id, app_id, kid, algorithm, private_key, created_at, retired_at
+        FROM app_signing_keys
+        WHERE app_id = $1
+          AND (retired_at IS NULL OR retired_at > NOW() - make_interval(mins => $2))
+        ORDER BY id
+    """
+    async with get_async_connection() as conn:
+        rows = await conn.fetch(query, app_id, grace_minutes)
+    return [dict(row) for row in rows]
+
+async def create_key(app_id, kid, algorithm, private_key):
+    """
+    Stores a new active signing key for an app.
+    Returns True if it was created, False if the app already has an active key.
+    """
+    query = """
+        INSERT INTO app_signing_keys (app_id, kid, algorithm, private_key)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (app_id) WHERE retired_at IS NULL DO NOTHING
+        RETURNING id;
+    """
+    async with get_async_connection(transaction=True) as conn:
+        key_id = await conn.fetchval(query, app_id, kid, algorithm, private_key)
+    return key_id is not None
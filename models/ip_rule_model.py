@@ -0,0 +1,115 @@
+from psycopg2.extras import execute_values
+from config.database import get_db_cursor
+
+# Actions of an IP rule: requests from a blocked network are turned away
+# before validation; 'allow' exempts a network from the block rules around it
+ACTIONS = ('allow', 'block')
+
+def list_active_rules():
+    """
+    Lists the rules that have not expired, as loaded into the IP filter.
+    Returns a list of (network, action) tuples, networks as CIDR strings.
+    """
+    query = """
+        SELECT network::text, action FROM ip_rules
+        WHERE expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(query)
+        return cursor.fetchall()
+
+def list_rules():
+    """
+    Lists every rule for the admin page, most recent first.
+    Returns a list of dictionaries.
+    """
+    query = """
+        SELECT id, network::text, action, reason, source, created_at, expires_at
+        FROM ip_rules
+        ORDER BY created_at DESC, id DESC
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(query)
+        return [
+            {
+                'id': row[0],
+                'network': row[1],
+                'action': row[2],
+                'reason': row[3],
+                'source': row[4],
+                'created_at': row[5],
+                'expires_at': row[6]
+            }
+            for row in cursor.fetchall()
+        ]
+
+def save_rule(network, action, reason=None):
+    """
+    Creates the rule of a network, or replaces it (an admin rule never expires).
+
+    Args:
+        network (str): A CIDR network or an IP address.
+        action (str): 'allow' or 'block'.
+        reason (str, optional): Why the rule exists, shown on the admin page.
+
+    Returns:
+        int: The rule ID.
+    """
+    query = """
+        INSERT INTO ip_rules (network, action, reason, source)
+        VALUES (%s, %s, %s, 'admin')
+        ON CONFLICT (network) DO UPDATE SET
+            action = EXCLUDED.action, reason = EXCLUDED.reason, source = 'admin',
+            created_at = CURRENT_TIMESTAMP, expires_at = NULL
+        RETURNING id;
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(query, (network, action, reason))
+        return cursor.fetchone()[0]
+
+def delete_rule(rule_id):
+    """
+    Deletes a rule.
+    Returns True if it existed.
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute("DELETE FROM ip_rules WHERE id = %s", (rule_id,))
+        return cursor.rowcount > 0
+
+def get_frequent_failed_ips(window_minutes, threshold):
+    """
+    Lists the IPs with at least 'threshold' failed attempts in the last
+    'window_minutes'. Only the recent partitions of failed_attempts are read.
+    Returns a list of (ip_address, count) tuples.
+    """
+    query = """
+        SELECT ip_address, COUNT(*)
+        FROM failed_attempts
+        WHERE attempted_at >= CURRENT_TIMESTAMP - make_interval(mins => %s) AND ip_address IS NOT NULL
+        GROUP BY ip_address
+        HAVING COUNT(*) >= %s
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(query, (window_minutes, threshold))
+        return cursor.fetchall()
+
+def add_auto_blocks(networks, reason, block_minutes):
+    """
+    Adds block rules expiring after 'block_minutes' for networks without a
+    rule, or renews their expired auto block. Other rules (admin allows and
+    blocks, or auto blocks added by another process) are kept.
+    Returns the number of rules added or renewed.
+    """
+    if not networks:
+        return 0
+    query = """
+        INSERT INTO ip_rules (network, action, reason, source, expires_at)
+        VALUES %s
+        ON CONFLICT (network) DO UPDATE SET
+            reason = EXCLUDED.reason, created_at = CURRENT_TIMESTAMP, expires_at = EXCLUDED.expires_at
+        WHERE ip_rules.source = 'auto' AND ip_rules.expires_at <= CURRENT_TIMESTAMP
+    """
+    rows = [(network, 'block', reason, 'auto', block_minutes) for network in networks]
+    with get_db_cursor(commit=True) as cursor:
+        execute_values(cursor, query, rows, template="(%s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(mins => %s))", page_size=len(rows))
+        return cursor.rowcount
@@ -0,0 +1,55 @@
+from config.settings import Config
+from services import metrics
+from utils.ttl_cache import TTLCache
+
+# Validation records (license and bound machine) keyed by license key.
+# Entries are invalidated explicitly by the model functions that change a license
+# or its binding; LICENSE_CACHE_TTL bounds how long other worker processes can
+# serve a record changed elsewhere.
+_records = TTLCache(Config.LICENSE_CACHE_SIZE, Config.LICENSE_CACHE_TTL)
+# Reverse index so that writes keyed by license id can invalidate the record
+_keys_by_id = TTLCache(Config.LICENSE_CACHE_SIZE, Config.LICENSE_CACHE_TTL)
+
+def enabled():
+    return Config.LICENSE_CACHE_SIZE > 0
+
+def get(license_key):
+    """Returns the cached validation record for a license key, or None."""
+    if not enabled():
+        return None
+    return _records.get(license_key)
+
+def get_by_license_id(license_id):
+    """Returns the cached validation record for a license id, or None."""
+    if not enabled():
+        return None
+    license_key = _keys_by_id.get(license_id)
+    return _records.get(license_key) if license_key else None
+
+def put(license_key, record):
+    """Caches a validation record. Records must be treated as read-only by callers."""
+    if not enabled():
+        return
+    _records.set(license_key, record)
+    _keys_by_id.set(record['license']['id'], license_key)
+
+def invalidate_key(license_key):
+    """Drops the cached record of a license key."""
+    record = _records.pop(license_key)
+    if record:
+        _keys_by_id.pop(record['license']['id'])
+
+def invalidate_license_id(license_id):
+    """Drops the cached record of a license id."""
+    license_key = _keys_by_id.pop(license_id)
+    if license_key:
+        _records.pop(license_key)
+
+def clear():
+    _records.clear()
+    _keys_by_id.clear()
+
+def stats():
+    return _records.stats()
+
+metrics.register_provider('license_cache', stats)
@@ -1,4 +1,7 @@
+from psycopg2.extras import execute_values
 from config.database import get_db_cursor
+from config import prepared_statements
+from models import license_cache
 
 def create_license(app_id, license_key, license_type, duration_days=None, status="active"):
     """
@@ -25,18 +28,44 @@ def create_license(app_id, license_key, license_type, duration_days=None, status
             }
         return None
 
+def create_licenses(app_id, license_keys, license_type, duration_days=None, status="active"):
+    """
+    Creates many licenses of the same kind with a single multi-row insert.
+    Keys that already exist are skipped rather than failing the whole insert.
+
+    Returns:
+        list: (id, license_key, created_at) tuples of the created licenses.
+    """
+    if not license_keys:
+        return []
+
+    query = """
+        INSERT INTO licenses (app_id, license_key, type, duration_days, status)
+        VALUES %s
+        ON CONFLICT (license_key) DO NOTHING
+        RETURNING id, license_key, created_at;
+    """
+    rows = [(app_id, license_key, license_type, duration_days, status) for license_key in license_keys]
+    with get_db_cursor(commit=True) as cursor:
+        return execute_values(cursor, query, rows, page_size=len(rows), fetch=True)
+
+_LICENSE_BY_KEY = prepared_statements.register('license_by_key', """
+    SELECT id, app_id, license_key, type, duration_days, status, created_at
+    FROM licenses
+    WHERE license_key = %s
+""")
+
 def get_license_by_key(license_key):
     """
     Retrieves a license by its key.
     Returns a dictionary or None if not found.
     """
-    query = """
-        SELECT id, app_id, license_key, type, duration_days, status, created_at
-        FROM licenses
-        WHERE license_key = %s
-    """
+    cached = license_cache.get(license_key)
+    if cached:
+        return dict(cached['license'])
+
     with get_db_cursor() as cursor:
-        cursor.execute(query, (license_key,))
+        _LICENSE_BY_KEY.execute(cursor, (license_key,))
         row = cursor.fetchone()
         if row:
             return {
@@ -50,15 +79,92 @@ def get_license_by_key(license_key):
             }
         return None
 
+_UPDATE_LICENSE_STATUS = prepared_statements.register('update_license_status', "UPDATE licenses SET status = %s WHERE id = %s")
+
 def update_license_status(license_id, status):
     """
     Updates the status of a license.
     Returns True if successful, False otherwise.
     """
-    query = "UPDATE licenses SET status = %s WHERE id = %s"
     with get_db_cursor(commit=True) as cursor:
-        cursor.execute(query, (status, license_id))
-        return cursor.rowcount > 0
+        _UPDATE_LICENSE_STATUS.execute(cursor, (status, license_id))
+        updated = cursor.rowcount > 0
+    license_cache.invalidate_license_id(license_id)
+    return updated
+
+def revoke_license_by_key(license_key):
+    """
+    Revokes a license by its key.
+    Returns the revoked license id, or None if no such license exists.
+    """
+    query = "UPDATE licenses SET status = 'revoked' WHERE license_key = %s RETURNING id"
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(query, (license_key,))
+        row = cursor.fetchone()
+    license_cache.invalidate_key(license_key)
+    return row[0] if row else None
+
+def get_revoked_license_ids():
+    """
+    Lists the IDs of every license that no longer validates (revoked or expired).
+    Returns a list of integers.
+    """
+    query = "SELECT id FROM licenses WHERE status NOT IN ('active', 'used')"
+    with get_db_cursor() as cursor:
+        cursor.execute(query)
+        return [row[0] for row in cursor.fetchall()]
+
+def count_licenses():
+    """
+    Counts all licenses.
+    Returns an integer.
+    """
+    with get_db_cursor(readonly=True) as cursor:
+        cursor.execute("SELECT COUNT(*) FROM licenses")
+        return cursor.fetchone()[0]
+
+def get_license_keys_after(last_id, limit):
+    """
+    Lists the keys of the licenses created after a license ID, in ID order.
+    Walking the table with the last returned ID reads it one page at a time.
+
+    Returns:
+        list: (id, license_key) tuples, at most 'limit' of them.
+    """
+    query = "SELECT id, license_key FROM licenses WHERE id > %s ORDER BY id LIMIT %s"
+    with get_db_cursor() as cursor:
+        cursor.execute(query, (last_id, limit))
+        return cursor.fetchall()
+
+def get_license_keys_in_ranges(ranges):
+    """
+    Lists the keys of the licenses whose ID falls in one of the given ranges.
+
+    Args:
+        ranges (list): (low, high) tuples of license IDs, bounds included.
+
+    Returns:
+        list: (id, license_key) tuples, in ID order.
+    """
+    query = """
+        SELECT l.id, l.license_key
+        FROM unnest(%s::integer[], %s::integer[]) AS r(low, high)
+        JOIN licenses l ON l.id BETWEEN r.low AND r.high
+        ORDER BY l.id
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(query, ([low for low, _ in ranges], [high for _, high in ranges]))
+        return cursor.fetchall()
+
+def get_transaction_horizon():
+    """
+    Returns the (xmin, xmax) transaction IDs of a snapshot taken now: every
+    transaction below xmin has finished, every one running started below xmax.
+    """
+    query = "SELECT txid_snapshot_xmin(s), txid_snapshot_xmax(s) FROM txid_current_snapshot() AS s"
+    with get_db_cursor() as cursor:
+        cursor.execute(query)
+        return cursor.fetchone()
 
 def get_licenses_by_app_id(app_id):
     """
@@ -101,6 +207,7 @@ def validate_and_consume_license(license_key, app_secret):
         WHERE l.license_key = %s AND a.app_secret = %s
     """
 
+    license_data = None
     with get_db_cursor(commit=True) as cursor:
         cursor.execute(query, (license_key, app_secret))
         row = cursor.fetchone()
@@ -122,6 +229,181 @@ def validate_and_consume_license(license_key, app_secret):
                 cursor.execute(update_query, (license_data['id'],))
                 license_data['status'] = 'used'
 
-            return license_data
+    if license_data:
+        license_cache.invalidate_key(license_key)
+    return license_data
+
+_LICENSE_FOR_VALIDATION = prepared_statements.register('license_for_validation', """
+    SELECT
+        l.id, l.app_id, l.license_key, l.type, l.duration_days, l.status, l.created_at,
+        m.id, m.hwid, m.activated_at
+    FROM licenses l
+    LEFT JOIN machines m ON m.license_id = l.id
+    WHERE l.license_key = %s
+    ORDER BY m.id
+    LIMIT 1
+""")
 
+def get_license_for_validation(license_key):
+    """
+    Retrieves a license together with its bound machine in a single query.
+    Returns a dictionary with 'license' and 'machine' keys, or None if not found.
+    'machine' is None when no HWID has been bound to the license yet.
+
+    Records are served from the license cache when possible and must not be modified.
+    The query always runs on the primary: a replica behind a revocation or an
+    activation would put the previous status back in the cache.
+    """
+    cached = license_cache.get(license_key)
+    if cached:
+        return cached
+
+    with get_db_cursor() as cursor:
+        _LICENSE_FOR_VALIDATION.execute(cursor, (license_key,))
+        row = cursor.fetchone()
+        if row:
+            record = validation_record_from_row(row)
+            license_cache.put(license_key, record)
+            return record
         return None
+
+def validation_record_from_row(row):
+    """
+    Builds a validation record from a licenses LEFT JOIN machines row
+    (l.id, l.app_id, l.license_key, l.type, l.duration_days, l.status, l.created_at,
+    m.id, m.hwid, m.activated_at).
+    """
+    machine = None
+    if row[7] is not None:
+        machine = {
+            'id': row[7],
+            'license_id': row[0],
+            'hwid': row[8],
+            'activated_at': row[9]
+        }
+    return {
+        'license': {
+            'id': row[0],
+            'app_id': row[1],
+            'license_key': row[2],
+            'type': row[3],
+            'duration_days': row[4],
+            'status': row[5],
+            'created_at': row[6]
+        },
+        'machine': machine
+    }
+
+_LICENSES_FOR_VALIDATION = prepared_statements.register('licenses_for_validation', """
+    SELECT DISTINCT ON (l.id)
+        l.id, l.app_id, l.license_key, l.type, l.duration_days, l.status, l.created_at,
+        m.id, m.hwid, m.activated_at
+    FROM licenses l
+    LEFT JOIN machines m ON m.license_id = l.id
+    WHERE l.license_key = ANY(%s)
+    ORDER BY l.id, m.id
+""")
+
+def get_licenses_for_validation(license_keys):
+    """
+    Set-based variant of get_license_for_validation for many keys at once.
+    Keys found in the license cache are not queried; the others are fetched in a single query.
+    Returns a dictionary mapping each found license key to its record.
+    """
+    records = {}
+    missing = []
+    for license_key in set(license_keys):
+        cached = license_cache.get(license_key)
+        if cached:
+            records[license_key] = cached
+        else:
+            missing.append(license_key)
+
+    if not missing:
+        return records
+
+    with get_db_cursor() as cursor:
+        _LICENSES_FOR_VALIDATION.execute(cursor, (missing,))
+        for row in cursor.fetchall():
+            record = validation_record_from_row(row)
+            license_cache.put(row[2], record)
+            records[row[2]] = record
+    return records
+
+_ACTIVATE_LICENSE = prepared_statements.register('activate_license', """
+    WITH claimed AS (
+        UPDATE licenses SET status = 'used'
+        WHERE id = %s AND status = 'active'
+        RETURNING id
+    )
+    INSERT INTO machines (license_id, hwid)
+    SELECT id, %s FROM claimed
+    RETURNING id;
+""")
+
+def activate_license(license_id, hwid):
+    """
+    Activates an 'active' license in a single transaction: marks it 'used'
+    and binds the HWID.
+    Returns the bound machine id, or None if the license was no longer
+    'active' (e.g. a concurrent request activated it first).
+    """
+    # A single statement keeps the whole activation to one round trip.
+    # The status guard makes concurrent first activations race-safe.
+    with get_db_cursor(commit=True) as cursor:
+        _ACTIVATE_LICENSE.execute(cursor, (license_id, hwid))
+        row = cursor.fetchone()
+    # Invalidate on both outcomes: a lost race means the cached record is stale too
+    license_cache.invalidate_license_id(license_id)
+    return row[0] if row else None
+
+def activate_licenses(bindings):
+    """
+    Set-based variant of activate_license: activates many 'active' licenses
+    in a single statement.
+
+    Args:
+        bindings (list): (license_id, hwid) tuples.
+
+    Returns:
+        set: The IDs of the licenses that were activated. Licenses that were
+        no longer 'active' are left out.
+    """
+    if not bindings:
+        return set()
+
+    query = """
+        WITH input (license_id, hwid) AS (VALUES %s),
+        claimed AS (
+            UPDATE licenses l SET status = 'used'
+            FROM input i
+            WHERE l.id = i.license_id AND l.status = 'active'
+            RETURNING l.id, i.hwid
+        )
+        INSERT INTO machines (license_id, hwid)
+        SELECT id, hwid FROM claimed
+        RETURNING license_id;
+    """
+    with get_db_cursor(commit=True) as cursor:
+        rows = execute_values(cursor, query, bindings, template="(%s::integer, %s)",
+                              page_size=len(bindings), fetch=True)
+    for license_id, _ in bindings:
+        license_cache.invalidate_license_id(license_id)
+    return {row[0] for row in rows}
+
+_MARK_LICENSES_USED = prepared_statements.register('mark_licenses_used', "UPDATE licenses SET status = 'used' WHERE id = ANY(%s)")
+
+def mark_licenses_used(license_ids):
+    """
+    Sets the status of many licenses to 'used' in a single statement.
+    Returns the number of updated licenses.
+    """
+    if not license_ids:
+        return 0
+
+    with get_db_cursor(commit=True) as cursor:
+        _MARK_LICENSES_USED.execute(cursor, (list(license_ids),))
+        updated = cursor.rowcount
+    for license_id in license_ids:
+        license_cache.invalidate_license_id(license_id)
+    return updated
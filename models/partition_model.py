@@ -0,0 +1,137 @@
+import re
+from datetime import date
+from config.database import get_db_cursor
+from config.settings import Config
+
+# Telemetry tables partitioned by month on their timestamp column (see
+# migrations/v004_partition_telemetry.py). Partitions are named
+# <table>_<YYYY>_<MM> and hold [first day of the month, first day of the next).
+PARTITIONED_TABLES = {
+    'activations': 'activated_at',
+    'failed_attempts': 'attempted_at'
+}
+
+# Rows of a partition, by app, as (app_id, count): what its app_stats counter holds for them
+_APP_COUNTS = {
+    'activations': "SELECT l.app_id, COUNT(*) FROM {table} t JOIN licenses l ON l.id = t.license_id GROUP BY l.app_id ORDER BY l.app_id",
+    'failed_attempts': "SELECT app_id, COUNT(*) FROM {table} WHERE app_id IS NOT NULL GROUP BY app_id ORDER BY app_id"
+}
+
+def month_start(value):
+    """Returns the first day of the month of a date or datetime."""
+    return date(value.year, value.month, 1)
+
+def add_months(month, months):
+    """Returns the first day of the month 'months' after (or before, if negative) 'month'."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table, month):
+    return f"{table}_{month.year:04d}_{month.month:02d}"
+
+def create_partition_statement(table, month):
+    """Returns the statement creating the partition of 'table' for 'month', unless it exists."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+def list_partitions(table):
+    """
+    Lists the monthly partitions of a table.
+    Returns a list of months (first day, as dates), oldest first.
+    """
+    query = """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(query, (table,))
+        return _months(table, [row[0] for row in cursor.fetchall()], '')
+
+def list_detached(table):
+    """
+    Lists the partitions detached by detach_partition and not yet retired
+    (left by an interrupted maintenance run).
+    Returns a list of months, oldest first.
+    """
+    query = """
+        SELECT relname FROM pg_class
+        WHERE relkind = 'r' AND relname LIKE %s AND pg_catalog.pg_table_is_visible(oid)
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(query, (f"{table}\\_%\\_detached",))
+        return _months(table, [row[0] for row in cursor.fetchall()], '_detached')
+
+def create_partition(table, month):
+    """
+    Creates the partition of a table for a month, unless it exists.
+    Returns True if it was created.
+    """
+    name = partition_name(table, month)
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NULL", (name,))
+        if not cursor.fetchone()[0]:
+            return False
+        cursor.execute("SET LOCAL lock_timeout = %s", (Config.MIGRATION_LOCK_TIMEOUT,))
+        cursor.execute(create_partition_statement(table, month))
+        return True
+
+def detach_partition(table, month):
+    """
+    Detaches the partition of a month from its table, and renames it
+    <partition>_detached until retire_detached has run on it.
+
+    Detaching locks the whole table, so the transaction only detaches: it is
+    short, and gives up after MIGRATION_LOCK_TIMEOUT rather than queue
+    telemetry writes behind it.
+    """
+    name = partition_name(table, month)
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute("SET LOCAL lock_timeout = %s", (Config.MIGRATION_LOCK_TIMEOUT,))
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+        cursor.execute(f"ALTER TABLE {name} RENAME TO {name}_detached")
+
+def retire_detached(table, month, archive=False):
+    """
+    Removes the rows of a detached partition from the app_stats counters, then
+    drops it or, with 'archive', keeps it as the standalone table
+    <table>_archive_<YYYY>_<MM> (e.g. for pg_dump to cold storage).
+    Both happen in one transaction, so a retired partition is never counted
+    out twice.
+
+    The statement-level triggers do not fire for a dropped or detached
+    partition; counts changed meanwhile by license deletes are corrected by
+    scripts/reconcile_app_stats.py.
+
+    Returns:
+        int: The number of rows the partition held.
+    """
+    name = f"{partition_name(table, month)}_detached"
+    with get_db_cursor(commit=True) as cursor:
+        # Counting a whole month can outlast the pool's statement_timeout
+        cursor.execute("SET LOCAL statement_timeout = 0")
+        cursor.execute(_APP_COUNTS[table].format(table=name))
+        counts = cursor.fetchall()
+        # Rows are locked in app order, as the triggers do
+        for app_id, count in counts:
+            cursor.execute(
+                f"UPDATE app_stats SET {table} = {table} - %s, updated_at = CURRENT_TIMESTAMP WHERE app_id = %s",
+                (count, app_id)
+            )
+        if archive:
+            cursor.execute(f"ALTER TABLE {name} RENAME TO {table}_archive_{month.year:04d}_{month.month:02d}")
+        else:
+            cursor.execute(f"DROP TABLE {name}")
+        return sum(count for _, count in counts)
+
+def _months(table, names, suffix):
+    pattern = re.compile(rf"^{re.escape(table)}_(\d{{4}})_(\d{{2}}){re.escape(suffix)}$")
+    months = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
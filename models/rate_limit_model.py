@@ -0,0 +1,31 @@
+from config.database import get_db_cursor
+
+def acquire(key, rate, burst):
+    """
+    Takes a token from a shared bucket (see security/rate_limiter.py), in one
+    round trip: rate_limit_acquire refills and updates the bucket row under
+    its row lock (see migrations/v005_rate_limit_buckets.py).
+
+    Args:
+        key (str): The bucket key, e.g. 'ip:203.0.113.7'.
+        rate (float): Tokens gained per second.
+        burst (float): The bucket capacity.
+
+    Returns:
+        float: 0 if a token was taken, otherwise the seconds until one is available.
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute("SELECT rate_limit_acquire(%s, %s, %s)", (key, rate, burst))
+        return cursor.fetchone()[0]
+
+def delete_idle(idle_seconds):
+    """
+    Deletes the buckets untouched for 'idle_seconds', which are full again.
+    Returns the number of deleted buckets.
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "DELETE FROM rate_limit_buckets WHERE updated_at < clock_timestamp() - make_interval(secs => %s)",
+            (idle_seconds,)
+        )
+        return cursor.rowcount
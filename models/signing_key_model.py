@@ -0,0 +1,62 @@
+from config.database import get_db_cursor
+
+def get_publishable_keys(app_id, grace_minutes):
+    """
+    Retrieves the signing keys of an app that are active or were retired
+    less than grace_minutes ago, oldest first.
+    Returns a list of dictionaries.
+    """
+    query = """
+        SELECT id, app_id, kid, algorithm, private_key, created_at, retired_at
+        FROM app_signing_keys
+        WHERE app_id = %s
+          AND (retired_at IS NULL OR retired_at > NOW() - make_interval(mins => %s))
+        ORDER BY id
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(query, (app_id, grace_minutes))
+        return [_key_from_row(row) for row in cursor.fetchall()]
+
+def create_key(app_id, kid, algorithm, private_key):
+    """
+    Stores a new active signing key for an app.
+    Returns the created key as a dictionary, or None if the app already has
+    an active key (e.g. created concurrently by another worker).
+    """
+    query = """
+        INSERT INTO app_signing_keys (app_id, kid, algorithm, private_key)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (app_id) WHERE retired_at IS NULL DO NOTHING
+        RETURNING id, app_id, kid, algorithm, private_key, created_at, retired_at;
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(query, (app_id, kid, algorithm, private_key))
+        row = cursor.fetchone()
+        return _key_from_row(row) if row else None
+
+def rotate_key(app_id, kid, algorithm, private_key):
+    """
+    Retires the active signing key of an app and stores a new one, in one transaction.
+    Returns the created key as a dictionary.
+    """
+    retire_query = "UPDATE app_signing_keys SET retired_at = NOW() WHERE app_id = %s AND retired_at IS NULL"
+    insert_query = """
+        INSERT INTO app_signing_keys (app_id, kid, algorithm, private_key)
+        VALUES (%s, %s, %s, %s)
+        RETURNING id, app_id, kid, algorithm, private_key, created_at, retired_at;
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(retire_query, (app_id,))
+        cursor.execute(insert_query, (app_id, kid, algorithm, private_key))
+        return _key_from_row(cursor.fetchone())
+
+def _key_from_row(row):
+    return {
+        'id': row[0],
+        'app_id': row[1],
+        'kid': row[2],
+        'algorithm': row[3],
+        'private_key': row[4],
+        'created_at': row[5],
+        'retired_at': row[6]
+    }
@@ -1,40 +1,116 @@
-from config.database import get_db_cursor
+from psycopg2.extras import execute_values
+from config.database import get_db_cursor, get_db_server_cursor
+from config import prepared_statements
+
+_LOG_ACTIVATION = prepared_statements.register('log_activation', """
+    INSERT INTO activations (license_id, ip_address, mac_address, user_agent, country, city)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    RETURNING id;
+""")
 
 def log_activation(license_id, ip_address, mac_address, user_agent, country, city):
     """
     Logs a successful activation.
     Returns the created activation record id.
     """
-    query = """
-        INSERT INTO activations (license_id, ip_address, mac_address, user_agent, country, city)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING id;
-    """
     with get_db_cursor(commit=True) as cursor:
-        cursor.execute(query, (license_id, ip_address, mac_address, user_agent, country, city))
+        _LOG_ACTIVATION.execute(cursor, (license_id, ip_address, mac_address, user_agent, country, city))
         row = cursor.fetchone()
         return row[0] if row else None
 
+_LOG_FAILED_ATTEMPT = prepared_statements.register('log_failed_attempt', """
+    INSERT INTO failed_attempts (app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING id;
+""")
+
 def log_failed_attempt(app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason):
     """
     Logs a failed activation attempt.
     Returns the created attempt record id.
     """
-    query = """
-        INSERT INTO failed_attempts (app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING id;
-    """
     with get_db_cursor(commit=True) as cursor:
-        cursor.execute(query, (app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason))
+        _LOG_FAILED_ATTEMPT.execute(cursor, (app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason))
         row = cursor.fetchone()
         return row[0] if row else None
 
-def get_activations(app_id=None):
+def insert_telemetry_batch(activations, failed_attempts):
+    """
+    Inserts a batch of activations and failed attempts with multi-row INSERTs,
+    in a single transaction.
+
+    Args:
+        activations (list): (license_id, ip_address, mac_address, user_agent, country, city) tuples.
+        failed_attempts (list): (app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason) tuples.
+    """
+    with get_db_cursor(commit=True) as cursor:
+        if activations:
+            execute_values(cursor, """
+                INSERT INTO activations (license_id, ip_address, mac_address, user_agent, country, city)
+                VALUES %s
+            """, activations, page_size=len(activations))
+        if failed_attempts:
+            execute_values(cursor, """
+                INSERT INTO failed_attempts (app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason)
+                VALUES %s
+            """, failed_attempts, page_size=len(failed_attempts))
+
+def apply_geolocation(ip_address, country, city):
+    """
+    Fills in the location of every activation and failed attempt from this IP
+    that is still pending (logged with a NULL country), found through the
+    partial indexes of migration v007.
+    Returns the number of updated rows.
     """
-    Lists activation history with license and app details.
-    If app_id is provided, filters by app.
-    Returns a list of dictionaries.
+    activations_query = """
+        UPDATE activations SET country = %s, city = %s
+        WHERE ip_address = %s AND country IS NULL
+    """
+    attempts_query = """
+        UPDATE failed_attempts SET country = %s, city = %s
+        WHERE ip_address = %s AND country IS NULL
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(activations_query, (country, city, ip_address))
+        updated = cursor.rowcount
+        cursor.execute(attempts_query, (country, city, ip_address))
+        return updated + cursor.rowcount
+
+def get_pending_geolocation_ips(limit):
+    """
+    Lists IPs with activations or failed attempts still pending a location,
+    read from the partial indexes of migration v007.
+    Returns a list of at most 'limit' IP addresses.
+    """
+    query = """
+        (SELECT DISTINCT ip_address FROM activations WHERE country IS NULL AND ip_address IS NOT NULL LIMIT %s)
+        UNION
+        (SELECT DISTINCT ip_address FROM failed_attempts WHERE country IS NULL AND ip_address IS NOT NULL LIMIT %s)
+        LIMIT %s
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(query, (limit, limit, limit))
+        return [row[0] for row in cursor.fetchall()]
+
+def get_activations(app_id=None, since=None, limit=None, before=None, after=None):
+    """
+    Lists activation history with license and app details, newest first.
+
+    Pages are read with keyset pagination on (activated_at, id): a page starts
+    from the key of the last row of the previous one, so any page costs an
+    index range scan of 'limit' rows, however deep it is. The table is
+    partitioned by month (see models/partition_model.py); time bounds and page
+    keys prune the partitions a query cannot reach.
+
+    Args:
+        app_id (int, optional): Only the activations of this app's licenses.
+        since (datetime, optional): Only activations at or after this time.
+        limit (int, optional): The maximum number of activations.
+        before (tuple, optional): An (activated_at, id) key: the activations after it in the list (older).
+        after (tuple, optional): An (activated_at, id) key: the 'limit' activations just before it in the list (newer).
+
+    Returns:
+        list: Dictionaries, newest first.
     """
     query = """
         SELECT
@@ -45,16 +121,14 @@ def get_activations(app_id=None):
         JOIN licenses l ON a.license_id = l.id
         JOIN apps ap ON l.app_id = ap.id
     """
-    params = []
-    if app_id:
-        query += " WHERE ap.id = %s"
-        params.append(app_id)
+    conditions, params = _time_filters('ap.id', 'a.activated_at', app_id, since, None)
+    query += conditions + _keyset_clause('a.activated_at', 'a.id', conditions, params, limit, before, after)
 
-    query += " ORDER BY a.activated_at DESC"
-
-    with get_db_cursor() as cursor:
+    with get_db_cursor(readonly=True) as cursor:
         cursor.execute(query, tuple(params))
         rows = cursor.fetchall()
+        if after:
+            rows.reverse()
         activations = []
         for row in rows:
             activations.append({
@@ -72,11 +146,20 @@ def get_activations(app_id=None):
             })
         return activations
 
-def get_failed_attempts(app_id=None):
+def get_failed_attempts(app_id=None, since=None, limit=None, before=None, after=None):
     """
-    Lists failed attempts with app details.
-    If app_id is provided, filters by app.
-    Returns a list of dictionaries.
+    Lists failed attempts with app details, newest first.
+    Pages are read with keyset pagination on (attempted_at, id), see get_activations.
+
+    Args:
+        app_id (int, optional): Only the attempts on this app.
+        since (datetime, optional): Only attempts at or after this time.
+        limit (int, optional): The maximum number of attempts.
+        before (tuple, optional): An (attempted_at, id) key: the attempts after it in the list (older).
+        after (tuple, optional): An (attempted_at, id) key: the 'limit' attempts just before it in the list (newer).
+
+    Returns:
+        list: Dictionaries, newest first.
     """
     query = """
         SELECT
@@ -85,16 +168,14 @@ def get_failed_attempts(app_id=None):
         FROM failed_attempts f
         JOIN apps ap ON f.app_id = ap.id
     """
-    params = []
-    if app_id:
-        query += " WHERE ap.id = %s"
-        params.append(app_id)
-
-    query += " ORDER BY f.attempted_at DESC"
+    conditions, params = _time_filters('f.app_id', 'f.attempted_at', app_id, since, None)
+    query += conditions + _keyset_clause('f.attempted_at', 'f.id', conditions, params, limit, before, after)
 
-    with get_db_cursor() as cursor:
+    with get_db_cursor(readonly=True) as cursor:
         cursor.execute(query, tuple(params))
         rows = cursor.fetchall()
+        if after:
+            rows.reverse()
         attempts = []
         for row in rows:
             attempts.append({
@@ -111,3 +192,110 @@ def get_failed_attempts(app_id=None):
                 'app_name': row[10]
             })
         return attempts
+
+def _keyset_clause(time_column, id_column, conditions, params, limit, before, after):
+    """
+    Builds the seek condition, ORDER BY and LIMIT of a newest first list, and
+    appends their parameters to 'params'. With 'after', rows come oldest first
+    (the closest ones to the key) and must be reversed by the caller.
+    """
+    clause = ""
+    keyword = " AND " if conditions else " WHERE "
+    # The row comparison seeks the index; the redundant bound on the time
+    # column alone lets the planner prune the monthly partitions past the key
+    if before:
+        clause += f"{keyword}({time_column}, {id_column}) < (%s, %s) AND {time_column} <= %s"
+        params.extend((before[0], before[1], before[0]))
+    elif after:
+        clause += f"{keyword}({time_column}, {id_column}) > (%s, %s) AND {time_column} >= %s"
+        params.extend((after[0], after[1], after[0]))
+
+    direction = "ASC" if after and not before else "DESC"
+    clause += f" ORDER BY {time_column} {direction}, {id_column} {direction}"
+    if limit:
+        clause += " LIMIT %s"
+        params.append(limit)
+    return clause
+
+# Columns of the rows yielded by iter_activations and iter_failed_attempts
+ACTIVATION_EXPORT_COLUMNS = [
+    'id', 'license_id', 'license_key', 'license_type', 'app_id', 'app_name',
+    'ip_address', 'mac_address', 'user_agent', 'country', 'city', 'activated_at'
+]
+FAILED_ATTEMPT_EXPORT_COLUMNS = [
+    'id', 'app_id', 'app_name', 'attempted_key', 'ip_address', 'mac_address',
+    'user_agent', 'country', 'city', 'reason', 'attempted_at'
+]
+
+def iter_activations(app_id=None, since=None, until=None, chunk_size=2000):
+    """
+    Streams the activation history through a server-side cursor, so memory use
+    does not depend on the size of the table. Rows come in ID order.
+
+    Args:
+        app_id (int, optional): Only the activations of this app's licenses.
+        since (datetime, optional): Only activations at or after this time.
+        until (datetime, optional): Only activations before this time.
+        chunk_size (int, optional): Rows per chunk, and per transfer from the server.
+
+    Yields:
+        list: Tuples of ACTIVATION_EXPORT_COLUMNS values.
+    """
+    query = """
+        SELECT
+            a.id, a.license_id, l.license_key, l.type, ap.id, ap.name,
+            a.ip_address, a.mac_address, a.user_agent, a.country, a.city, a.activated_at
+        FROM activations a
+        JOIN licenses l ON a.license_id = l.id
+        JOIN apps ap ON l.app_id = ap.id
+    """
+    conditions, params = _time_filters('ap.id', 'a.activated_at', app_id, since, until)
+    yield from _iter_export('activations_export', query + conditions + " ORDER BY a.id", tuple(params), chunk_size)
+
+def iter_failed_attempts(app_id=None, since=None, until=None, chunk_size=2000):
+    """
+    Streams the failed attempts through a server-side cursor, so memory use
+    does not depend on the size of the table. Rows come in ID order.
+
+    Args:
+        app_id (int, optional): Only the attempts on this app.
+        since (datetime, optional): Only attempts at or after this time.
+        until (datetime, optional): Only attempts before this time.
+        chunk_size (int, optional): Rows per chunk, and per transfer from the server.
+
+    Yields:
+        list: Tuples of FAILED_ATTEMPT_EXPORT_COLUMNS values.
+    """
+    query = """
+        SELECT
+            f.id, f.app_id, ap.name, f.attempted_key, f.ip_address, f.mac_address,
+            f.user_agent, f.country, f.city, f.reason, f.attempted_at
+        FROM failed_attempts f
+        JOIN apps ap ON f.app_id = ap.id
+    """
+    conditions, params = _time_filters('f.app_id', 'f.attempted_at', app_id, since, until)
+    yield from _iter_export('failed_attempts_export', query + conditions + " ORDER BY f.id", tuple(params), chunk_size)
+
+def _time_filters(app_column, time_column, app_id, since, until):
+    """Builds the WHERE clause of a listing or export query, and the list of its parameters."""
+    conditions = []
+    params = []
+    if app_id:
+        conditions.append(f"{app_column} = %s")
+        params.append(app_id)
+    if since:
+        conditions.append(f"{time_column} >= %s")
+        params.append(since)
+    if until:
+        conditions.append(f"{time_column} < %s")
+        params.append(until)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+def _iter_export(cursor_name, query, params, chunk_size):
+    with get_db_server_cursor(cursor_name, itersize=chunk_size, readonly=True) as cursor:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
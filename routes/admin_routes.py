@@ -1,10 +1,22 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
+from config.settings import Config
 from security.auth_middleware import require_admin_auth
-from services.app_service import register_app
-from services.license_service import create_new_license
+from services.app_service import register_app, rotate_app_secret
+from services.license_service import create_new_license, generate_licenses_bulk, revoke_license
+from services import ip_filter
 from models.app_model import list_apps
-from models.tracking_model import get_activations, get_failed_attempts
+from models.ip_rule_model import list_rules
+from models.tracking_model import (
+    ACTIVATION_EXPORT_COLUMNS, FAILED_ATTEMPT_EXPORT_COLUMNS, get_activations, get_failed_attempts,
+    iter_activations, iter_failed_attempts
+)
+from services.metrics import collect as collect_metrics
+from services.signing_keys import get_jwks
+from services.stats_service import get_dashboard_stats
 from utils.snippet_builder import generate_client_snippet
+from utils.csv_stream import stream_csv
+from utils.ndjson_stream import stream_ndjson
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -16,19 +28,16 @@ def before_request():
 @admin_bp.route('/dashboard')
 def dashboard():
     apps = list_apps()
-    stats = {
-        'total_apps': len(apps),
-        'total_licenses': 'N/A', # Placeholder as we don't have a global count yet
-        'active_licenses': 'N/A'
-    }
-    recent_activations = get_activations()
-    return render_template('dashboard.html', stats=stats, recent_apps=apps[:5], recent_activations=recent_activations[:5])
+    stats = get_dashboard_stats(len(apps))
+    recent_activations = get_activations(limit=5)
+    return render_template('dashboard.html', stats=stats, recent_apps=apps[:5], recent_activations=recent_activations)
 
 @admin_bp.route('/snippet/<app_id>')
 def get_snippet(app_id):
     # Construct API URL from request.host_url, ensuring no trailing slash
     api_url = request.host_url.rstrip('/')
-    snippet = generate_client_snippet(app_id, api_url)
+    # The app's public keys are embedded, as the client's offline trust anchor
+    snippet = generate_client_snippet(app_id, api_url, get_jwks(app_id))
     return jsonify({'snippet': snippet})
 
 @admin_bp.route('/apps')
@@ -49,6 +58,17 @@ def new_app():
         flash('App name is required')
     return redirect(url_for('admin.apps'))
 
+@admin_bp.route('/apps/<int:app_id>/rotate', methods=['POST'])
+def rotate_app(app_id):
+    try:
+        rotate_app_secret(app_id)
+        flash('App secret rotated successfully')
+    except ValueError as e:
+        flash(str(e))
+    except Exception as e:
+        flash(f'Error rotating app secret: {str(e)}')
+    return redirect(url_for('admin.apps'))
+
 @admin_bp.route('/licenses/generate', methods=['POST'])
 def generate_license():
     app_id = request.form.get('app_id')
@@ -75,16 +95,253 @@ def generate_license():
 
     return redirect(url_for('admin.apps'))
 
+@admin_bp.route('/licenses/generate/bulk', methods=['POST'])
+def generate_licenses_bulk_route():
+    """
+    Generates a batch of licenses and streams the new keys back as a CSV download.
+    """
+    app_id = request.form.get('app_id')
+    license_type = request.form.get('type')
+    duration_days_str = request.form.get('duration_days')
+    count_str = request.form.get('count')
+
+    if not app_id or not license_type or not count_str:
+        flash('Missing required fields')
+        return redirect(url_for('admin.apps'))
+
+    try:
+        duration_days = None
+        if duration_days_str and duration_days_str.strip():
+            duration_days = int(duration_days_str)
+        count = int(count_str)
+
+        # Validates everything up front; licenses are created while the response streams
+        chunks = generate_licenses_bulk(app_id, license_type, duration_days, count)
+
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('admin.apps'))
+
+    def rows():
+        generated = 0
+        try:
+            for chunk in chunks:
+                generated += len(chunk)
+                yield [(license_id, license_key, created_at.isoformat()) for license_id, license_key, created_at in chunk]
+        except GeneratorExit:
+            # The client went away: finish the batch so it is not left half created;
+            # the keys are still listed on the app's licenses page
+            try:
+                for chunk in chunks:
+                    generated += len(chunk)
+            except Exception as e:
+                print(f"Error generating licenses: {e}")
+            print(f"Bulk license download aborted by the client after creating {generated} of {count} licenses")
+            raise
+        except Exception as e:
+            # Headers are already sent: end the file with a row that marks it as short
+            print(f"Error generating licenses: {e}")
+            yield [(f"# ERROR: generated {generated} of {count}",)]
+
+    filename = f"licenses-app{app_id}-{license_type}-{count}.csv"
+    return Response(
+        stream_with_context(stream_csv(['license_id', 'license_key', 'created_at'], rows())),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@admin_bp.route('/licenses/revoke', methods=['POST'])
+def revoke_license_route():
+    license_key = request.form.get('license_key')
+
+    try:
+        revoke_license(license_key)
+        flash(f'License revoked: {license_key.strip()}')
+    except ValueError as e:
+        flash(str(e))
+    except Exception as e:
+        flash('An error occurred while revoking license')
+        print(f"Error revoking license: {e}")
+
+    return redirect(url_for('admin.apps'))
+
+@admin_bp.route('/ip-rules')
+def ip_rules():
+    return render_template('ip_rules.html', rules=list_rules())
+
+@admin_bp.route('/ip-rules', methods=['POST'])
+def save_ip_rule():
+    try:
+        network = ip_filter.save_rule(
+            request.form.get('network'), request.form.get('action', 'block'), request.form.get('reason')
+        )
+        flash(f'IP rule saved: {network}')
+    except ValueError as e:
+        flash(str(e))
+    except Exception as e:
+        flash('An error occurred while saving the IP rule')
+        print(f"Error saving IP rule: {e}")
+    return redirect(url_for('admin.ip_rules'))
+
+@admin_bp.route('/ip-rules/<int:rule_id>/delete', methods=['POST'])
+def delete_ip_rule(rule_id):
+    try:
+        ip_filter.delete_rule(rule_id)
+        flash('IP rule deleted')
+    except ValueError as e:
+        flash(str(e))
+    except Exception as e:
+        flash('An error occurred while deleting the IP rule')
+        print(f"Error deleting IP rule: {e}")
+    return redirect(url_for('admin.ip_rules'))
+
+@admin_bp.route('/attempts/ban', methods=['POST'])
+def ban_ip():
+    # Ban button of the security log: blocks the single IP of an attempt
+    try:
+        network = ip_filter.save_rule(request.form.get('ip_address'), 'block', request.form.get('reason'))
+        flash(f'IP banned: {network}')
+    except ValueError as e:
+        flash(str(e))
+    except Exception as e:
+        flash('An error occurred while banning the IP')
+        print(f"Error banning IP: {e}")
+    return redirect(url_for('admin.attempts', app_id=request.form.get('app_id') or None))
+
 @admin_bp.route('/users')
 def users():
-    activations = get_activations()
-    return render_template('users.html', activations=activations)
+    filters = _list_filters()
+    activations, pagination = _keyset_page(get_activations, 'activated_at', filters)
+    return render_template('users.html', activations=activations, pagination=pagination, filters=filters)
 
 @admin_bp.route('/attempts')
 def attempts():
-    attempts_list = get_failed_attempts()
-    return render_template('attempts.html', attempts=attempts_list)
+    filters = _list_filters()
+    attempts_list, pagination = _keyset_page(get_failed_attempts, 'attempted_at', filters)
+    return render_template('attempts.html', attempts=attempts_list, pagination=pagination, filters=filters)
+
+def _list_filters():
+    """
+    Reads the filters of an admin list from the query string: 'app_id', and
+    'period' ('week' for the last 7 days). Invalid values are ignored.
+    """
+    app_id = request.args.get('app_id', '')
+    period = request.args.get('period')
+    return {
+        'app_id': int(app_id) if app_id.isdigit() else None,
+        'period': period if period == 'week' else None
+    }
+
+def _keyset_page(fetch, time_field, filters):
+    """
+    Reads one page of a newest first list with keyset pagination.
+
+    The 'before' query parameter holds the key of the last row of the previous
+    page (older rows follow), 'after' the key of the first row of the next page
+    (newer rows precede). Keys are '<ISO time>_<id>' strings.
+
+    Returns:
+        tuple: The rows, and a dictionary with the 'older' and 'newer' page keys
+        (None when there is no such page).
+    """
+    limit = Config.ADMIN_PAGE_SIZE
+    try:
+        before = _decode_page_key(request.args.get('before'))
+        after = None if before else _decode_page_key(request.args.get('after'))
+    except ValueError:
+        flash('Invalid page')
+        before = after = None
+
+    since = None
+    if filters['period'] == 'week':
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=7)
+
+    # One extra row tells whether there is a page beyond this one
+    rows = fetch(app_id=filters['app_id'], since=since, limit=limit + 1, before=before, after=after)
+    if after:
+        has_newer, has_older = len(rows) > limit, True
+        rows = rows[-limit:]
+    else:
+        has_newer, has_older = before is not None, len(rows) > limit
+        rows = rows[:limit]
+
+    return rows, {
+        'older': _encode_page_key(rows[-1], time_field) if has_older and rows else None,
+        'newer': _encode_page_key(rows[0], time_field) if has_newer and rows else None
+    }
+
+def _encode_page_key(row, time_field):
+    return f"{row[time_field].isoformat()}_{row['id']}"
+
+def _decode_page_key(value):
+    """Returns the (time, id) key of a page key string, or None. Raises ValueError if malformed."""
+    if not value:
+        return None
+    time_value, _, row_id = value.rpartition('_')
+    return datetime.fromisoformat(time_value), int(row_id)
+
+@admin_bp.route('/activations/export')
+def export_activations():
+    """
+    Streams the activation history as a CSV or NDJSON download.
+    See _export_response for the query parameters.
+    """
+    return _export_response('activations', iter_activations, ACTIVATION_EXPORT_COLUMNS, 'admin.users')
+
+@admin_bp.route('/attempts/export')
+def export_attempts():
+    """
+    Streams the failed attempts as a CSV or NDJSON download.
+    See _export_response for the query parameters.
+    """
+    return _export_response('failed-attempts', iter_failed_attempts, FAILED_ATTEMPT_EXPORT_COLUMNS, 'admin.attempts')
+
+def _export_response(name, iter_rows, columns, page):
+    """
+    Builds a streamed export response. Rows are read through a server-side
+    cursor EXPORT_CHUNK_SIZE at a time and written out as they arrive.
+
+    Query parameters: 'format' ('csv', the default, or 'ndjson'), 'app_id',
+    and 'since' / 'until' (ISO 8601 dates or times, 'until' excluded).
+    """
+    export_format = request.args.get('format', 'csv')
+    try:
+        if export_format not in ('csv', 'ndjson'):
+            raise ValueError(f"Unknown export format: {export_format}")
+        app_id = int(request.args['app_id']) if request.args.get('app_id') else None
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+        until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+    except ValueError as e:
+        flash(f'Invalid export request: {e}')
+        return redirect(url_for(page))
+
+    chunks = iter_rows(app_id, since, until, Config.EXPORT_CHUNK_SIZE)
+
+    def rows():
+        try:
+            for chunk in chunks:
+                yield [tuple(value.isoformat() if isinstance(value, datetime) else value for value in row) for row in chunk]
+        except Exception as e:
+            # Headers are already sent: the download ends early
+            print(f"Error exporting {name}: {e}")
+
+    if export_format == 'ndjson':
+        body, mimetype = stream_ndjson(columns, rows()), 'application/x-ndjson'
+    else:
+        body, mimetype = stream_csv(columns, rows()), 'text/csv'
+
+    filename = f"{name}{f'-app{app_id}' if app_id else ''}.{export_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
 
 @admin_bp.route('/settings')
 def settings():
     return render_template('settings.html')
+
+@admin_bp.route('/metrics')
+def metrics():
+    # Runtime counters (caches, queues) of this worker process
+    return jsonify(collect_metrics())
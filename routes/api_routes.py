@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
-from services.validation_service import validate_license_request
-from models.app_model import get_app_by_id
-from security.jwt_handler import generate_token
+from config.settings import Config
+from security import client_address, rate_limiter
+from services import ip_filter
+from services.validation_service import validate_license_request, validate_license_batch, refresh_license_request
+from services.signing_keys import sign_token, get_jwks
 
 api_bp = Blueprint('api', __name__)
 
@@ -12,42 +14,29 @@ def validate():
     Expects JSON payload with 'license_key', 'hwid', and optionally 'app_id'.
     """
     data = request.get_json()
-    if not data:
+    if not data or not isinstance(data, dict):
         return jsonify({'error': 'Invalid JSON'}), 400
 
-    # Extract client info
-    x_forwarded_for = request.headers.get('X-Forwarded-For')
-    if x_forwarded_for:
-        client_ip = x_forwarded_for.split(',')[0].strip()
-    else:
-        client_ip = request.remote_addr
+    client_ip, headers = _client_info()
 
-    # Extract headers
-    headers = {
-        'User-Agent': request.headers.get('User-Agent')
-    }
+    # Blocked networks and clients over the rate limits are turned away before
+    # any lookup or telemetry
+    if ip_filter.is_blocked(client_ip):
+        return jsonify({'error': 'Access denied'}), 403
+    retry_after = rate_limiter.admit(client_ip, data.get('app_id'), data.get('license_key'))
+    if retry_after:
+        return _too_many_requests(retry_after)
 
     try:
         # Validate license
         # Returns a payload suitable for JWT
         jwt_payload = validate_license_request(data, headers, client_ip)
 
-        # Get app_id from the result to fetch the secret
-        app_id = jwt_payload.get('app_id')
-        if not app_id:
-             # Should not happen if validation succeeds
-             return jsonify({'error': 'Internal server error: App ID missing'}), 500
-
-        # Get app secret for signing the JWT
-        app = get_app_by_id(app_id)
-        if not app:
+        # Sign the JWT with the app's key (see /api/v1/apps/<id>/jwks)
+        token = sign_token(jwt_payload)
+        if not token:
              return jsonify({'error': 'App not found'}), 404
 
-        secret = app['app_secret']
-
-        # Generate token
-        token = generate_token(jwt_payload, secret)
-
         return jsonify({'token': token})
 
     except ValueError as e:
@@ -62,3 +51,113 @@ def validate():
 @api_bp.route('/api/v1/license/validate', methods=['POST'])
 def validate_alias():
     return validate()
+
+@api_bp.route('/api/v1/validate/batch', methods=['POST'])
+def validate_batch():
+    """
+    Validates up to VALIDATE_BATCH_MAX_ITEMS license keys in one request.
+    Expects JSON payload {'items': [{'license_key', 'hwid', 'app_id'}, ...]}.
+    Returns {'results': [...]} with a 'token' or an 'error' per item, in order.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Invalid JSON: expected a non-empty items list'}), 400
+    if len(items) > Config.VALIDATE_BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Too many items (max {Config.VALIDATE_BATCH_MAX_ITEMS})'}), 413
+
+    client_ip, headers = _client_info()
+    if ip_filter.is_blocked(client_ip):
+        return jsonify({'error': 'Access denied'}), 403
+    # Each item counts against its app and key buckets, as a /validate call would
+    buckets = [(item.get('app_id'), item.get('license_key')) if isinstance(item, dict) else (None, None) for item in items]
+    retry_after = rate_limiter.admit_batch(client_ip, buckets)
+    if retry_after:
+        return _too_many_requests(retry_after)
+
+    try:
+        results = []
+        for outcome in validate_license_batch(items, headers, client_ip):
+            if 'error' in outcome:
+                results.append({'error': outcome['error']})
+                continue
+
+            token = sign_token(outcome['payload'])
+            if not token:
+                results.append({'error': 'App not found'})
+                continue
+            results.append({'token': token})
+
+        return jsonify({'results': results})
+
+    except Exception as e:
+        print(f"Error validating license batch: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/api/v1/refresh', methods=['POST'])
+def refresh():
+    """
+    Re-issues a token from a still valid one, without a full validation.
+    Expects JSON payload with 'token' and 'hwid'.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        return jsonify({'error': 'Invalid JSON'}), 400
+
+    client_ip, _ = _client_info()
+    if ip_filter.is_blocked(client_ip):
+        return jsonify({'error': 'Access denied'}), 403
+    retry_after = rate_limiter.admit(client_ip, None, None)
+    if retry_after:
+        return _too_many_requests(retry_after)
+
+    try:
+        jwt_payload = refresh_license_request(data)
+
+        token = sign_token(jwt_payload)
+        if not token:
+             return jsonify({'error': 'App not found'}), 404
+
+        return jsonify({'token': token})
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 403
+    except Exception as e:
+        print(f"Error refreshing token: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/api/v1/apps/<int:app_id>/jwks', methods=['GET'])
+def jwks(app_id):
+    """
+    Publishes the public keys that verify the tokens of an app, as a JWK Set.
+    Clients match the 'kid' header of a token against it to verify tokens locally.
+    """
+    try:
+        document = get_jwks(app_id)
+        if document is None:
+            return jsonify({'error': 'App not found'}), 404
+
+        response = jsonify(document)
+        response.headers['Cache-Control'] = 'public, max-age=300'
+        return response
+
+    except Exception as e:
+        print(f"Error serving JWKS: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+def _too_many_requests(retry_after):
+    response = jsonify({'error': 'Too many requests'})
+    response.headers['Retry-After'] = rate_limiter.retry_after_header(retry_after)
+    return response, 429
+
+def _client_info():
+    """
+    Extracts the client IP and the headers recorded in telemetry from the current request.
+    X-Forwarded-For is only trusted as far as TRUSTED_PROXY_HOPS proxies wrote it.
+    """
+    client_ip = client_address.client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))
+
+    headers = {
+        'User-Agent': request.headers.get('User-Agent')
+    }
+    return client_ip, headers
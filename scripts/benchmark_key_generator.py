@@ -0,0 +1,49 @@
+import sys
+import os
+import argparse
+import secrets
+import time
+
+# Add the project root directory to the Python path to allow imports from algorithms
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms.key_generator import CHARACTERS, generate_license_keys
+
+def per_key_baseline(count):
+    """
+    The previous generator: 16 secrets.choice calls per key, no deduplication.
+    """
+    return ["-".join("".join(secrets.choice(CHARACTERS) for _ in range(4)) for _ in range(4)) for _ in range(count)]
+
+def measure(generate, count, repeat):
+    """
+    Returns the best keys/sec rate of 'repeat' runs generating 'count' keys.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        generate(count)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best if best else float('inf')
+
+def run(counts, repeat, skip_baseline_above):
+    print(f"{'keys':>10} {'per-key (keys/s)':>20} {'batch (keys/s)':>20} {'speedup':>9}")
+    for count in counts:
+        # Small batches are repeated enough to be measurable
+        runs = max(repeat, 1000 // count) if count < 1000 else repeat
+        batch = measure(generate_license_keys, count, runs)
+        if count <= skip_baseline_above:
+            baseline = measure(per_key_baseline, count, runs)
+            print(f"{count:>10} {baseline:>20,.0f} {batch:>20,.0f} {batch / baseline:>8.1f}x")
+        else:
+            print(f"{count:>10} {'(skipped)':>20} {batch:>20,.0f} {'':>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark license key generation, per key vs batched.")
+    parser.add_argument('--counts', type=int, nargs='+', default=[1, 1000, 1000000], help="Batch sizes to measure")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (the best one is kept)")
+    parser.add_argument('--skip-baseline-above', type=int, default=1000000,
+                        help="Do not run the slow per-key baseline for larger batches")
+    args = parser.parse_args()
+    run(args.counts, args.repeat, args.skip_baseline_above)
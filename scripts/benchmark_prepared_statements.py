@@ -0,0 +1,106 @@
+import sys
+import os
+import argparse
+import time
+
+# Add the project root directory to the Python path to allow imports from config and models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import get_db_connection, Database
+from config.settings import Config
+from models import app_model, license_model, machine_model
+
+# The read queries of the validation path. Writes (activation) are left out:
+# the benchmark must not change the data it runs against.
+STATEMENTS = {
+    'license_for_validation': license_model._LICENSE_FOR_VALIDATION,
+    'licenses_for_validation': license_model._LICENSES_FOR_VALIDATION,
+    'app_by_id': app_model._APP_BY_ID,
+    'machine_by_license_id': machine_model._MACHINE_BY_LICENSE_ID,
+}
+
+def sample(cursor, count, batch_size):
+    """Returns the parameter tuples of each statement, from 'count' existing licenses."""
+    cursor.execute("SELECT id, app_id, license_key FROM licenses ORDER BY id DESC LIMIT %s", (count,))
+    rows = cursor.fetchall()
+    if not rows:
+        raise SystemExit("No licenses to benchmark with: generate some first (scripts/generate_licenses.py).")
+    keys = [row[2] for row in rows]
+    return {
+        'license_for_validation': [(key,) for key in keys],
+        'licenses_for_validation': [(keys[i:i + batch_size],) for i in range(0, len(keys), batch_size)],
+        'app_by_id': [(row[1],) for row in rows],
+        'machine_by_license_id': [(row[0],) for row in rows],
+    }
+
+def run_plain(cursor, statement, params_list):
+    for params in params_list:
+        cursor.execute(statement.query, params)
+        cursor.fetchall()
+
+def run_prepared(cursor, statement, params_list):
+    for params in params_list:
+        statement.execute(cursor, params)
+        cursor.fetchall()
+
+def measure(conn, run, statement, params_list, repeat):
+    """Returns the best time per execution in milliseconds of 'repeat' runs."""
+    best = None
+    with conn.cursor() as cursor:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run(cursor, statement, params_list)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+    conn.rollback()
+    return 1000 * best / len(params_list)
+
+def planning_ms(conn, statement, params_list, prepared):
+    """
+    Returns the average server planning time in milliseconds, from EXPLAIN ANALYZE.
+    A prepared statement is planned anew for its first executions, then
+    reuses a generic plan when the server finds it no worse.
+    """
+    total = 0.0
+    with conn.cursor() as cursor:
+        for params in params_list:
+            if prepared:
+                cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + statement.execute_query, params)
+            else:
+                cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + statement.query, params)
+            total += cursor.fetchone()[0][0]['Planning Time']
+    conn.rollback()
+    return total / len(params_list)
+
+def run(count, batch_size, repeat):
+    if not Config.DB_PREPARED_STATEMENTS:
+        raise SystemExit("DB_PREPARED_STATEMENTS is off: both columns would measure plain queries.")
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("DEALLOCATE ALL")
+            conn.prepared.clear()
+            samples = sample(cursor, count, batch_size)
+        conn.rollback()
+
+        print(f"{'statement':<25} {'plain (ms)':>11} {'prepared (ms)':>14} {'speedup':>8} "
+              f"{'planning plain (ms)':>20} {'planning prepared (ms)':>23}")
+        for name, statement in STATEMENTS.items():
+            params_list = samples[name]
+            # Statements are prepared during the first run; the best run is the steady state
+            prepared = measure(conn, run_prepared, statement, params_list, repeat)
+            plain = measure(conn, run_plain, statement, params_list, repeat)
+            plan_plain = planning_ms(conn, statement, params_list, prepared=False)
+            plan_prepared = planning_ms(conn, statement, params_list, prepared=True)
+            print(f"{name:<25} {plain:>11.3f} {prepared:>14.3f} {plain / prepared:>7.2f}x "
+                  f"{plan_plain:>20.3f} {plan_prepared:>23.3f}")
+    Database.close_pool()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the validation path read queries, plain vs prepared statements (read-only)."
+    )
+    parser.add_argument('--count', type=int, default=2000, help="Licenses to look up per run")
+    parser.add_argument('--batch-size', type=int, default=50, help="Keys per batch validation lookup")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (the best one is kept)")
+    args = parser.parse_args()
+    run(args.count, args.batch_size, args.repeat)
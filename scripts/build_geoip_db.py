@@ -0,0 +1,48 @@
+import sys
+import os
+import csv
+import argparse
+import ipaddress
+
+# Add the project root directory to the Python path to allow imports from algorithms
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms.ip_range_table import write_table
+
+def read_ranges(csv_path):
+    """
+    Yields (start_ip, end_ip, country, city) tuples from a CSV range dump.
+
+    Each row is either 'start_ip,end_ip,country,city' or 'network,country,city'
+    (CIDR notation). A header row, if present, is skipped.
+    """
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for line_number, row in enumerate(csv.reader(f), start=1):
+            if not row or row[0].startswith('#'):
+                continue
+            try:
+                if len(row) >= 4:
+                    ipaddress.ip_address(row[0].strip())
+                    yield row[0], row[1], row[2], row[3]
+                else:
+                    network = ipaddress.ip_network(row[0].strip(), strict=False)
+                    yield str(network[0]), str(network[-1]), row[1], row[2] if len(row) > 2 else ''
+            except (ValueError, IndexError):
+                if line_number == 1:
+                    continue  # Header row
+                raise ValueError(f"Invalid row at line {line_number}: {row}")
+
+def build_geoip_db(csv_path, output_path):
+    """
+    Converts a CSV range dump into the binary format used by the local GeoIP resolver.
+    """
+    print(f"Building GeoIP database from {csv_path}...")
+    v4_count, v6_count = write_table(output_path, read_ranges(csv_path))
+    print(f"Wrote {v4_count} IPv4 and {v6_count} IPv6 ranges to {output_path}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the KeyPilot GeoIP range database.")
+    parser.add_argument('csv_path', help="CSV dump: start_ip,end_ip,country,city or network,country,city")
+    parser.add_argument('output_path', help="Binary database to write (set GEOIP_DATABASE_PATH to it)")
+    args = parser.parse_args()
+    build_geoip_db(args.csv_path, args.output_path)
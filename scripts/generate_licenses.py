@@ -0,0 +1,48 @@
+import sys
+import os
+import argparse
+
+# Add the project root directory to the Python path to allow imports from services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.license_service import generate_licenses_bulk
+from utils.csv_stream import stream_csv
+
+def generate_licenses(app_id, license_type, duration_days, count, output):
+    """
+    Generates a batch of licenses and writes the new keys as CSV to 'output',
+    chunk by chunk as they are committed.
+    Returns the number of licenses created.
+    """
+    created = 0
+
+    def rows():
+        nonlocal created
+        for chunk in generate_licenses_bulk(app_id, license_type, duration_days, count):
+            created += len(chunk)
+            print(f"{created}/{count} licenses created...", file=sys.stderr)
+            yield [(license_id, license_key, created_at.isoformat()) for license_id, license_key, created_at in chunk]
+
+    for text in stream_csv(['license_id', 'license_key', 'created_at'], rows()):
+        output.write(text)
+        output.flush()
+    return created
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate KeyPilot licenses in bulk and export the keys as CSV.")
+    parser.add_argument('app_id', type=int, help="ID of the application")
+    parser.add_argument('type', choices=['trial', 'lifetime'], help="License type")
+    parser.add_argument('count', type=int, help="Number of licenses to create")
+    parser.add_argument('--duration-days', type=int, help="Duration in days (trial licenses)")
+    parser.add_argument('--output', help="CSV file to write (default: standard output)")
+    args = parser.parse_args()
+
+    try:
+        if args.output:
+            with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                generate_licenses(args.app_id, args.type, args.duration_days, args.count, f)
+        else:
+            generate_licenses(args.app_id, args.type, args.duration_days, args.count, sys.stdout)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,17 @@
+import sys
+import os
+
+# Add the project root directory to the Python path to allow imports from services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.partition_maintenance import maintain
+
+if __name__ == "__main__":
+    # Meant to run daily from cron: creates the coming monthly partitions of
+    # activations and failed_attempts, and retires the expired ones
+    try:
+        result = maintain()
+        print(f"Partitions maintained: {len(result['created'])} created, {len(result['retired'])} retired.")
+    except Exception as e:
+        print(f"Error maintaining partitions: {e}")
+        sys.exit(1)
@@ -0,0 +1,17 @@
+import sys
+import os
+
+# Add the project root directory to the Python path to allow imports from services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.stats_service import reconcile
+
+if __name__ == "__main__":
+    # Meant to run periodically (e.g. nightly from cron), and once after init_db
+    # on a database that already holds licenses
+    try:
+        corrected = reconcile()
+        print(f"App stats reconciled, {len(corrected)} apps corrected.")
+    except Exception as e:
+        print(f"Error reconciling app stats: {e}")
+        sys.exit(1)
@@ -0,0 +1,37 @@
+from config.settings import Config
+
+# Set once the missing TRUSTED_PROXY_HOPS warning was printed
+_warned = False
+
+def client_ip(peer_ip, x_forwarded_for, trusted_hops=None):
+    """
+    Returns the IP of the client behind TRUSTED_PROXY_HOPS reverse proxies.
+
+    Each proxy appends the address it received the request from to
+    X-Forwarded-For, so only the last 'trusted_hops' entries were written by
+    our proxies; anything before them is whatever the client sent. Without
+    trusted proxies the header is ignored and the peer address is the client,
+    the same as werkzeug's ProxyFix(x_for=trusted_hops).
+
+    Args:
+        peer_ip (str): The address of the TCP peer (remote_addr, scope['client']).
+        x_forwarded_for (str): The X-Forwarded-For header, or None.
+        trusted_hops (int, optional): Defaults to Config.TRUSTED_PROXY_HOPS.
+
+    Returns:
+        str: The client IP, or peer_ip if the header has fewer entries than trusted hops.
+    """
+    global _warned
+    trusted_hops = Config.TRUSTED_PROXY_HOPS if trusted_hops is None else trusted_hops
+    if not x_forwarded_for:
+        return peer_ip
+    if trusted_hops <= 0:
+        if not _warned:
+            _warned = True
+            print(f"Warning: X-Forwarded-For received with TRUSTED_PROXY_HOPS=0; {peer_ip} is taken as the client IP "
+                  "for rate limits, the IP filter and telemetry. Behind a reverse proxy, set TRUSTED_PROXY_HOPS.")
+        return peer_ip
+    forwarded = [entry.strip() for entry in x_forwarded_for.split(',')]
+    if len(forwarded) < trusted_hops or not forwarded[-trusted_hops]:
+        return peer_ip
+    return forwarded[-trusted_hops]
@@ -1,8 +1,14 @@
 import jwt
 import datetime
 from datetime import timedelta, timezone
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
 
-def generate_token(payload, secret, algorithm='HS256', expiration_minutes=60):
+# Asymmetric algorithms supported for per-app signing keys
+SIGNING_ALGORITHMS = ('EdDSA', 'ES256')
+
+def generate_token(payload, secret, algorithm='HS256', expiration_minutes=60, headers=None):
     """
     Generates a JWT token signed with the provided secret.
 
@@ -11,6 +17,7 @@ def generate_token(payload, secret, algorithm='HS256', expiration_minutes=60):
         secret (str): The secret key to sign the token.
         algorithm (str, optional): The algorithm to use for signing. Defaults to 'HS256'.
         expiration_minutes (int, optional): The number of minutes until the token expires. Defaults to 60.
+        headers (dict, optional): Additional JWT headers, e.g. the 'kid' of the signing key.
 
     Returns:
         str: The generated JWT token.
@@ -25,7 +32,7 @@ def generate_token(payload, secret, algorithm='HS256', expiration_minutes=60):
         # Add issued at time
         token_payload['iat'] = datetime.datetime.now(timezone.utc)
 
-        encoded_token = jwt.encode(token_payload, secret, algorithm=algorithm)
+        encoded_token = jwt.encode(token_payload, secret, algorithm=algorithm, headers=headers)
         return encoded_token
     except Exception as e:
         print(f"Error generating token: {e}")
@@ -56,3 +63,65 @@ def validate_token(token, secret, algorithms=['HS256']):
     except Exception as e:
         print(f"Error validating token: {e}")
         return None
+
+def read_unverified(token):
+    """
+    Reads the header and payload of a JWT token WITHOUT verifying it, to pick the
+    key it has to be verified with.
+
+    Returns:
+        tuple: (header, payload) dictionaries.
+        None: If the token is malformed.
+    """
+    try:
+        return jwt.get_unverified_header(token), jwt.decode(token, options={'verify_signature': False})
+    except jwt.InvalidTokenError:
+        return None
+
+def generate_signing_key(algorithm):
+    """
+    Generates a private key for an asymmetric signing algorithm.
+
+    Args:
+        algorithm (str): 'EdDSA' (Ed25519) or 'ES256' (ECDSA P-256).
+
+    Returns:
+        str: The private key, PEM encoded (PKCS8).
+
+    Raises:
+        ValueError: If the algorithm is not supported.
+    """
+    if algorithm == 'EdDSA':
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    elif algorithm == 'ES256':
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise ValueError(f"Unsupported signing algorithm: {algorithm}")
+
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    ).decode('ascii')
+
+def load_signing_key(private_key_pem):
+    """
+    Loads a PEM encoded private key generated by generate_signing_key.
+    """
+    return serialization.load_pem_private_key(private_key_pem.encode('ascii'), password=None)
+
+def public_jwk(private_key, kid, algorithm):
+    """
+    Returns the public half of a signing key as a JSON Web Key (RFC 7517) dictionary.
+
+    Args:
+        private_key: A private key object, as returned by load_signing_key.
+        kid (str): The key ID, matching the 'kid' header of the tokens it signs.
+        algorithm (str): 'EdDSA' or 'ES256'.
+    """
+    if algorithm == 'EdDSA':
+        jwk = OKPAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    else:
+        jwk = ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update({'kid': kid, 'alg': algorithm, 'use': 'sig'})
+    return jwk
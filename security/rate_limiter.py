@@ -0,0 +1,242 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from config.settings import Config
+from models import rate_limit_model
+from services import metrics
+
+class TokenBucketLimiter:
+    """
+    Token buckets by key (an IP, an app, a license key), held in process memory.
+
+    A bucket holds up to 'burst' tokens and gains 'rate' tokens per second; each
+    admitted request takes one. Buckets are refilled lazily when used, and kept
+    in least recently used order: a bucket untouched for burst / rate seconds
+    is full again, the same as no bucket, so it is evicted from the front of
+    the order by the next acquire. Each bucket is evicted at most once per
+    creation, which keeps acquire O(1) amortized and memory proportional to
+    the keys seen within that window, capped at max_buckets.
+    """
+    def __init__(self, rate, burst, max_buckets=None):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_buckets = max_buckets or Config.RATE_LIMIT_MAX_BUCKETS
+        self.idle_seconds = self.burst / self.rate
+        self._buckets = OrderedDict()  # key -> [tokens, last update (monotonic)]
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def acquire(self, key, now=None):
+        """
+        Takes a token from the bucket of a key.
+
+        Returns:
+            float: 0 if the request is admitted, otherwise the seconds until a token is available.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._evict(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _evict(self, now):
+        while self._buckets:
+            key, (_, updated) = next(iter(self._buckets.items()))
+            # Past max_buckets, the least recently used bucket goes even if not
+            # full yet: memory stays bounded under a flood of spoofed keys
+            if now - updated < self.idle_seconds and len(self._buckets) < self.max_buckets:
+                return
+            del self._buckets[key]
+            self.evicted += 1
+
+class AdmissionControl:
+    """
+    Rate limits of the validation endpoint, checked before any I/O: token
+    buckets per client IP, per app_id and per license key, each skipped when
+    its rate is 0. A request is turned away by the first bucket that is empty,
+    and does not take tokens from the next ones. A batch takes one token from
+    its IP bucket and one from the app and key buckets of each item.
+
+    With shared=True, requests admitted locally are also counted against the
+    same buckets in PostgreSQL (models/rate_limit_model.py), so the limits hold
+    across every worker process. The local buckets still reject floods
+    without a query, since no worker may exceed the global limit on its own.
+    """
+    SCOPES = ('ip', 'app', 'key')
+
+    def __init__(self, limits=None, shared=None):
+        self.limits = limits or {
+            'ip': (Config.RATE_LIMIT_IP_RATE, Config.RATE_LIMIT_IP_BURST),
+            'app': (Config.RATE_LIMIT_APP_RATE, Config.RATE_LIMIT_APP_BURST),
+            'key': (Config.RATE_LIMIT_KEY_RATE, Config.RATE_LIMIT_KEY_BURST)
+        }
+        self.shared = Config.RATE_LIMIT_SHARED if shared is None else shared
+        self._limiters = {
+            scope: TokenBucketLimiter(rate, burst)
+            for scope, (rate, burst) in self.limits.items() if rate > 0
+        }
+        self.admitted = 0
+        self.rejected = dict.fromkeys(self.SCOPES, 0)
+        self.shared_errors = 0
+        self._last_cleanup = time.monotonic()
+
+    def check(self, client_ip, app_id, license_key):
+        """
+        Checks a request against the local buckets.
+
+        Returns:
+            float: 0 if the request is admitted, otherwise the seconds the client should wait.
+        """
+        return self._check_local(self._keys(client_ip, app_id, license_key))
+
+    def check_batch(self, client_ip, items):
+        """
+        Checks a batch request against the local buckets.
+
+        Args:
+            client_ip (str): The client IP.
+            items (list): (app_id, license_key) tuples, one per item.
+
+        Returns:
+            float: 0 if the batch is admitted, otherwise the seconds the client should wait.
+        """
+        return self._check_local(self._batch_keys(client_ip, items))
+
+    def check_shared(self, client_ip, app_id, license_key):
+        """
+        Checks a request admitted by check() against the shared buckets (a
+        query per bucket). Without shared mode, or if the database cannot be
+        reached, requests are admitted.
+
+        Returns:
+            float: 0 if the request is admitted, otherwise the seconds the client should wait.
+        """
+        return self._check_shared(self._keys(client_ip, app_id, license_key))
+
+    def check_shared_batch(self, client_ip, items):
+        """
+        Checks a batch admitted by check_batch() against the shared buckets,
+        taking one token per distinct bucket (a query each): repeats within
+        the batch are already counted by the local buckets.
+        """
+        return self._check_shared(list(dict.fromkeys(self._batch_keys(client_ip, items))))
+
+    def admit(self, client_ip, app_id, license_key):
+        """Checks a request against the local buckets, then the shared ones. Returns check()'s value."""
+        return self.check(client_ip, app_id, license_key) or self.check_shared(client_ip, app_id, license_key)
+
+    def admit_batch(self, client_ip, items):
+        """Checks a batch against the local buckets, then the shared ones. Returns check_batch()'s value."""
+        return self.check_batch(client_ip, items) or self.check_shared_batch(client_ip, items)
+
+    def stats(self):
+        """Returns the admission counters as a dictionary."""
+        return {
+            'admitted': self.admitted,
+            'rejected': dict(self.rejected),
+            'buckets': {scope: len(limiter) for scope, limiter in self._limiters.items()},
+            'evicted': sum(limiter.evicted for limiter in self._limiters.values()),
+            'shared': self.shared,
+            'shared_errors': self.shared_errors
+        }
+
+    def _check_local(self, keys):
+        for scope, key in keys:
+            retry_after = self._limiters[scope].acquire(key)
+            if retry_after:
+                self.rejected[scope] += 1
+                return retry_after
+        if not self.shared:
+            self.admitted += 1
+        return 0.0
+
+    def _check_shared(self, keys):
+        if not self.shared:
+            return 0.0
+        try:
+            self._cleanup()
+            for scope, key in keys:
+                rate, burst = self.limits[scope]
+                retry_after = rate_limit_model.acquire(f"{scope}:{key}", rate, burst)
+                if retry_after:
+                    self.rejected[scope] += 1
+                    return retry_after
+        except Exception as e:
+            self.shared_errors += 1
+            print(f"Error checking shared rate limits: {e}")
+        self.admitted += 1
+        return 0.0
+
+    def _batch_keys(self, client_ip, items):
+        keys = self._keys(client_ip, None, None)
+        for app_id, license_key in items:
+            keys.extend(self._keys(None, app_id, license_key))
+        return keys
+
+    def _keys(self, client_ip, app_id, license_key):
+        values = {
+            'ip': client_ip,
+            'app': str(app_id) if app_id else None,
+            'key': license_key.strip().upper() if isinstance(license_key, str) and license_key.strip() else None
+        }
+        return [(scope, values[scope]) for scope in self.SCOPES if scope in self._limiters and values[scope]]
+
+    def _cleanup(self):
+        # Shared buckets idle long enough to be full again are deleted, at most
+        # once per RATE_LIMIT_SHARED_CLEANUP_INTERVAL per process
+        now = time.monotonic()
+        if now - self._last_cleanup < Config.RATE_LIMIT_SHARED_CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        idle_seconds = max(burst / rate for rate, burst in self.limits.values() if rate > 0)
+        rate_limit_model.delete_idle(idle_seconds)
+
+def retry_after_header(retry_after):
+    """Returns the Retry-After header value (whole seconds, at least 1) for a wait in seconds."""
+    return str(max(1, math.ceil(retry_after)))
+
+_admission = None
+_admission_lock = threading.Lock()
+
+def get_admission_control():
+    """Returns the process-wide admission control, creating it on first use."""
+    global _admission
+    if _admission is None:
+        with _admission_lock:
+            if _admission is None:
+                _admission = AdmissionControl()
+                metrics.register_provider('rate_limiter', _admission.stats)
+    return _admission
+
+def admit(client_ip, app_id, license_key):
+    """
+    Checks a validation request against the rate limits.
+    Returns 0 if it is admitted, otherwise the seconds the client should wait.
+    """
+    if not Config.RATE_LIMIT_ENABLED:
+        return 0.0
+    return get_admission_control().admit(client_ip, app_id, license_key)
+
+def admit_batch(client_ip, items):
+    """
+    Checks a batch validation request, given as (app_id, license_key) tuples,
+    against the rate limits.
+    Returns 0 if it is admitted, otherwise the seconds the client should wait.
+    """
+    if not Config.RATE_LIMIT_ENABLED:
+        return 0.0
+    return get_admission_control().admit_batch(client_ip, items)
@@ -0,0 +1,88 @@
+from config.settings import Config
+from models import app_model
+from services import metrics
+from utils.ttl_cache import TTLCache
+
+# App records (id, name, app_secret) keyed by app id, filled lazily or by preload().
+# Creating or rotating an app invalidates its entry in this process; APP_REGISTRY_TTL
+# bounds how long other worker processes keep signing with a rotated secret.
+_apps = TTLCache(Config.APP_REGISTRY_SIZE, Config.APP_REGISTRY_TTL)
+_UNKNOWN_APP = object()
+
+def get_app(app_id):
+    """
+    Returns the app record for an app id, or None if no such app exists.
+    Unknown ids are remembered for a short time so that bogus ids sent by
+    clients do not each cost a query.
+    """
+    found, app = lookup(app_id)
+    if found:
+        return app
+
+    key = _normalize_id(app_id)
+    app = app_model.get_app_by_id(key)
+    remember(key, app)
+    return app
+
+def lookup(app_id):
+    """
+    Looks an app id up in the registry only, without querying the database.
+    Returns (True, app) if the id is known, app being None for an id known not
+    to exist, or (False, None) if the app has to be fetched.
+    """
+    key = _normalize_id(app_id)
+    if key is None:
+        return True, None
+
+    app = _apps.get(key)
+    if app is _UNKNOWN_APP:
+        return True, None
+    if app is not None:
+        return True, app
+    return False, None
+
+def remember(app_id, app):
+    """Caches an app record fetched by the caller, or None for an id that does not exist."""
+    key = _normalize_id(app_id)
+    if key is None:
+        return
+    if app is None:
+        _apps.set(key, _UNKNOWN_APP, ttl=Config.APP_REGISTRY_NEGATIVE_TTL)
+    else:
+        _apps.set(key, app)
+
+def get_app_secret(app_id):
+    """Returns the signing secret of an app, or None if no such app exists."""
+    app = get_app(app_id)
+    return app['app_secret'] if app else None
+
+def preload():
+    """
+    Fills the registry with every app in one query.
+    Returns the number of apps loaded.
+    """
+    apps = app_model.list_apps()
+    for app in apps:
+        _apps.set(app['id'], app)
+    return len(apps)
+
+def invalidate(app_id):
+    """Drops the cached record of an app, e.g. after it was created or its secret rotated."""
+    key = _normalize_id(app_id)
+    if key is not None:
+        _apps.pop(key)
+
+def clear():
+    _apps.clear()
+
+def stats():
+    return _apps.stats()
+
+def _normalize_id(app_id):
+    # Client payloads carry app ids as strings or integers
+    try:
+        return int(app_id)
+    except (TypeError, ValueError):
+        return None
+
+metrics.register_provider('app_registry', stats)
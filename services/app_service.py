@@ -1,11 +1,15 @@
 import os
+from config.settings import Config
+from algorithms import key_generator
 from models import app_model
+from services import app_registry, signing_keys
 
 def register_app(name):
     """
     Registers a new application.
     Generates a secure random app_secret using os.urandom.
-    Calls app_model to store the application.
+    Calls app_model to store the application and, when tokens are signed
+    with per-app keys, creates its first signing key.
     """
     if not name:
         raise ValueError("App name cannot be empty")
@@ -13,4 +17,40 @@ def register_app(name):
     # Generate a 32-byte (64 character hex) secret
     app_secret = os.urandom(32).hex()
 
-    return app_model.create_app(name, app_secret)
+    # New apps get the configured key format; existing apps keep theirs
+    app = app_model.create_app(name, app_secret, _new_app_key_format())
+    if app:
+        # Drop any "unknown app" entry cached for this id
+        app_registry.invalidate(app['id'])
+        if signing_keys.uses_app_keys():
+            signing_keys.create_first_key(app['id'])
+    return app
+
+def _new_app_key_format():
+    """
+    Returns the key format of new apps: LICENSE_KEY_FORMAT, or format 1 if it
+    asks for checksum keys without a LICENSE_KEY_CHECKSUM_SECRET to key them.
+    """
+    if Config.LICENSE_KEY_FORMAT == key_generator.KEY_FORMAT_CHECKSUM and not Config.LICENSE_KEY_CHECKSUM_SECRET:
+        print("LICENSE_KEY_CHECKSUM_SECRET is not set: new apps get format 1 license keys.")
+        return key_generator.KEY_FORMAT_PLAIN
+    return Config.LICENSE_KEY_FORMAT
+
+def rotate_app_secret(app_id):
+    """
+    Replaces the secret of an application with a new random one and, when
+    tokens are signed with per-app keys, rotates its signing key.
+    Tokens signed with the previous secret stop verifying; tokens signed with
+    the retired key keep verifying for SIGNING_KEY_GRACE_MINUTES.
+
+    Raises:
+        ValueError: If the app does not exist.
+    """
+    app = app_model.update_app_secret(app_id, os.urandom(32).hex())
+    if not app:
+        raise ValueError("App not found")
+
+    app_registry.invalidate(app_id)
+    if signing_keys.uses_app_keys():
+        signing_keys.rotate(app['id'])
+    return app
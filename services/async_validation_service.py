@@ -0,0 +1,173 @@
+import asyncio
+from config.settings import Config
+from models import async_app_model, async_license_model, async_signing_key_model
+from algorithms import hwid_parser
+from security import jwt_handler
+from services import app_registry, geolocation, license_filter, signing_keys, telemetry_writer
+from services.validation_service import (
+    ACTION_ACTIVATE, ACTION_MARK_USED, LicenseValidationError, check_license_key_format, evaluate_license, evaluate_refresh,
+    _build_jwt_payload
+)
+
+async def get_app(app_id):
+    """
+    Returns the app record for an app id, or None if no such app exists.
+    Served from the app registry, which is filled on a miss.
+    """
+    found, app = app_registry.lookup(app_id)
+    if found:
+        return app
+    app = await async_app_model.get_app_by_id(int(app_id))
+    app_registry.remember(app_id, app)
+    return app
+
+async def sign_token(payload):
+    """
+    Async variant of signing_keys.sign_token.
+    Returns the token, or None if the app does not exist.
+    """
+    app = await get_app(payload['app_id'])
+    if not app:
+        return None
+    if not signing_keys.uses_app_keys():
+        return jwt_handler.generate_token(payload, app['app_secret'], expiration_minutes=Config.TOKEN_EXPIRATION_MINUTES)
+    return signing_keys.sign_with_keyset(payload, await get_keyset(app['id'], create=True))
+
+async def verify_token(token):
+    """Async variant of signing_keys.verify_token."""
+    unverified = jwt_handler.read_unverified(token)
+    if not unverified:
+        return None
+    header, claims = unverified
+
+    app = await get_app(claims.get('app_id'))
+    if not app:
+        return None
+    keyset = await get_keyset(app['id']) if signing_keys.uses_app_keys() else None
+    return signing_keys.verify_with_keyset(token, header, app, keyset)
+
+async def get_jwks(app_id):
+    """Async variant of signing_keys.get_jwks."""
+    app = await get_app(app_id)
+    if not app:
+        return None
+    if not signing_keys.uses_app_keys():
+        return {'keys': []}
+    return (await get_keyset(app['id']))['jwks']
+
+async def get_keyset(app_id, create=False):
+    """Async variant of signing_keys.get_keyset, sharing its cache."""
+    keyset = signing_keys.lookup(app_id)
+    if keyset is not None and (keyset['active'] is not None or not create):
+        return keyset
+
+    keys = await async_signing_key_model.get_publishable_keys(app_id, Config.SIGNING_KEY_GRACE_MINUTES)
+    if create and not any(key['retired_at'] is None for key in keys):
+        await async_signing_key_model.create_key(app_id, *signing_keys.new_key())
+        keys = await async_signing_key_model.get_publishable_keys(app_id, Config.SIGNING_KEY_GRACE_MINUTES)
+
+    keyset = signing_keys.build_keyset(keys)
+    signing_keys.remember(app_id, keyset)
+    return keyset
+
+async def validate_license_request(payload, request_headers, client_ip):
+    """
+    Async variant of validation_service.validate_license_request, with the same
+    rules (evaluate_license) and the same buffered telemetry.
+
+    The license lookup and the lookup of the claimed app run concurrently on
+    the asyncpg pool, so that the app is in the registry by the time the
+    token is signed. Geolocation never blocks the event loop: it is resolved
+    inline from the local GeoIP database or deferred to the enrichment pipeline.
+
+    Args:
+        payload (dict): The JSON payload from the client (containing 'license_key', 'hwid', 'app_id').
+        request_headers (dict): The request headers (containing 'User-Agent').
+        client_ip (str): The client's IP address.
+
+    Returns:
+        dict: A payload dictionary for JWT generation if validation succeeds.
+
+    Raises:
+        ValueError: If validation fails (invalid key, expired, hwid mismatch, etc).
+    """
+    license_key = payload.get('license_key')
+    hwid = payload.get('hwid')
+    app_id = payload.get('app_id')
+    user_agent = request_headers.get('User-Agent', 'Unknown')
+
+    if not license_key or not hwid:
+        raise ValueError("Missing license_key or hwid.")
+
+    # Made-up keys are turned away before any query, lookup or telemetry
+    check_license_key_format(license_key, app_id)
+
+    location = geolocation.resolve_inline(client_ip)
+    country, city = location if location else (None, None)
+
+    # Normalize HWID
+    normalized_hwid = hwid_parser.parse_hwid(hwid)
+    if not normalized_hwid:
+        raise ValueError("Invalid HWID format.")
+
+    app_lookup = asyncio.ensure_future(get_app(app_id)) if app_id else None
+    try:
+        record = None
+        if license_filter.might_exist(license_key):
+            record = await async_license_model.get_license_for_validation(license_key)
+        app = await app_lookup if app_lookup else None
+    finally:
+        if app_lookup and not app_lookup.done():
+            app_lookup.cancel()
+
+    if not record:
+        # Log failed attempt if app_id is provided and refers to an existing app
+        if app:
+            telemetry_writer.record_failed_attempt(
+                app_id, license_key, client_ip, normalized_hwid, user_agent, country, city, "license_not_found"
+            )
+        raise ValueError("License not found.")
+
+    license_data = record['license']
+
+    try:
+        action = evaluate_license(license_data, record['machine'], normalized_hwid, app_id)
+
+        if action == ACTION_ACTIVATE:
+            machine_id = await async_license_model.activate_license(license_data['id'], normalized_hwid)
+            if machine_id is not None:
+                telemetry_writer.record_activation(
+                    license_data['id'], client_ip, normalized_hwid, user_agent, country, city
+                )
+            else:
+                # A concurrent request activated the license first: re-check against its binding
+                record = await async_license_model.get_license_for_validation(license_key)
+                if not record:
+                    raise ValueError("License not found.")
+                license_data = record['license']
+                action = evaluate_license(license_data, record['machine'], normalized_hwid, app_id)
+                if action == ACTION_ACTIVATE:
+                    raise ValueError("License activation conflict. Please retry.")
+
+        if action == ACTION_MARK_USED:
+            await async_license_model.update_license_status(license_data['id'], 'used')
+
+    except LicenseValidationError as e:
+        telemetry_writer.record_failed_attempt(
+            license_data['app_id'], license_key, client_ip, normalized_hwid, user_agent, country, city, e.reason
+        )
+        raise
+
+    return _build_jwt_payload(license_data, normalized_hwid)
+
+async def refresh_license_request(payload):
+    """
+    Async variant of validation_service.refresh_license_request.
+    Only the app and its keys may need a query, on a registry miss.
+    """
+    token = payload.get('token')
+    hwid = payload.get('hwid')
+    if not token or not hwid:
+        raise ValueError("Missing token or hwid.")
+
+    return evaluate_refresh(await verify_token(token), hwid)
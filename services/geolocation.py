@@ -0,0 +1,306 @@
+import ipaddress
+import queue
+import threading
+import time
+import requests
+from config.settings import Config
+from models import tracking_model
+from algorithms.ip_range_table import IpRangeTable
+from services import metrics
+from utils.ttl_cache import TTLCache
+
+UNKNOWN = 'Unknown'
+
+_MISSING = object()
+_NEGATIVE = object()
+
+class IpApiResolver:
+    """
+    Resolves an IP address to (country, city) through an ip-api.com compatible HTTP service.
+    The base URL is configurable so tests can point it at a local stub server.
+    """
+    is_local = False
+
+    def __init__(self, base_url=None, timeout=None):
+        self.base_url = (base_url or Config.GEOLOCATION_URL).rstrip('/')
+        self.timeout = timeout if timeout is not None else Config.GEOLOCATION_TIMEOUT
+
+    def resolve(self, ip_address):
+        """
+        Returns a (country, city) tuple, or None if the IP could not be resolved.
+        """
+        try:
+            response = requests.get(f"{self.base_url}/{ip_address}", timeout=self.timeout)
+            if response.status_code == 200:
+                data = response.json()
+                if data.get('status') == 'success':
+                    return data.get('country', UNKNOWN), data.get('city', UNKNOWN)
+        except Exception:
+            # Fail gracefully if geolocation service is down or rate limited
+            pass
+        return None
+
+class LocalGeoIPResolver:
+    """
+    Resolves an IP address to (country, city) from the memory-mapped range
+    database built by scripts/build_geoip_db.py. Lookups take microseconds,
+    so they can run on the request path.
+    """
+    is_local = True
+
+    def __init__(self, path=None):
+        self.table = IpRangeTable(path or Config.GEOIP_DATABASE_PATH)
+
+    def resolve(self, ip_address):
+        """
+        Returns a (country, city) tuple, or None if no range contains the IP.
+        """
+        return self.table.lookup(ip_address)
+
+class CachingResolver:
+    """
+    Wraps a resolver with a bounded TTL/LRU cache.
+
+    Results are cached by exact IP and, optionally, by /24 (IPv4) or /48 (IPv6)
+    prefix, so neighbouring addresses of the same network share one lookup.
+    Failed lookups are cached by exact IP for a short negative TTL, so an
+    outage of the backend does not cost a timeout on every lookup.
+    """
+    def __init__(self, resolver, maxsize=None, ttl=None, negative_ttl=None, prefix_keys=None):
+        self.resolver = resolver
+        self.cache = TTLCache(maxsize or Config.GEOLOCATION_CACHE_SIZE, ttl or Config.GEOLOCATION_CACHE_TTL)
+        self.negative_ttl = negative_ttl if negative_ttl is not None else Config.GEOLOCATION_NEGATIVE_TTL
+        self.prefix_keys = Config.GEOLOCATION_CACHE_PREFIXES if prefix_keys is None else prefix_keys
+        self.is_local = getattr(resolver, 'is_local', False)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def resolve(self, ip_address):
+        """
+        Returns a (country, city) tuple, or None if the IP could not be resolved.
+        """
+        location = self.cache.get(ip_address, _MISSING)
+        if location is _NEGATIVE:
+            self._count('negative_hits')
+            return None
+        if location is not _MISSING:
+            self._count('hits')
+            return location
+
+        prefix = _prefix_key(ip_address) if self.prefix_keys else None
+        if prefix:
+            location = self.cache.get(prefix, _MISSING)
+            if location is not _MISSING:
+                self._count('prefix_hits')
+                self.cache.set(ip_address, location)
+                return location
+
+        self._count('misses')
+        location = self.resolver.resolve(ip_address)
+        if location is None:
+            self.cache.set(ip_address, _NEGATIVE, ttl=self.negative_ttl)
+            return None
+
+        self.cache.set(ip_address, location)
+        if prefix:
+            self.cache.set(prefix, location)
+        return location
+
+    def stats(self):
+        """Returns resolver-level counters along with the underlying cache counters."""
+        with self._lock:
+            lookups = self.hits + self.prefix_hits + self.negative_hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'prefix_hits': self.prefix_hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'hit_ratio': round((lookups - self.misses) / lookups, 4) if lookups else None
+            }
+        stats['cache'] = self.cache.stats()
+        return stats
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+def _prefix_key(ip_address):
+    """Returns the /24 (IPv4) or /48 (IPv6) network of an IP as a cache key, or None."""
+    try:
+        ip = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return None
+    prefix_length = 24 if ip.version == 4 else 48
+    return str(ipaddress.ip_network(f"{ip}/{prefix_length}", strict=False))
+
+class GeoEnrichmentPipeline:
+    """
+    Background worker pool that fills in country/city for telemetry rows
+    written with a pending (NULL) location.
+
+    Work is keyed by IP address: a single lookup enriches every pending
+    activation and failed attempt from that IP, and an IP waiting in the
+    queue is not queued twice. An IP is queued again as soon as a worker
+    takes it, so rows logged during its lookup get their own pass.
+
+    Rows whose IP was dropped on a full queue, or whose enrichment failed,
+    are picked up by a sweep of the pending rows every sweep_interval seconds.
+    """
+    def __init__(self, resolver, workers=None, queue_size=None, sweep_interval=None):
+        self.resolver = resolver
+        self.workers = workers or Config.GEOLOCATION_WORKERS
+        self.sweep_interval = Config.GEOLOCATION_SWEEP_INTERVAL if sweep_interval is None else sweep_interval
+        self._queue = queue.Queue(maxsize=queue_size or Config.GEOLOCATION_QUEUE_SIZE)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.dropped = 0
+        self.swept = 0
+
+    def start(self):
+        """Start the worker threads if they are not running yet."""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"geo-enrichment-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if self.sweep_interval > 0:
+                threading.Thread(target=self._sweep_loop, name="geo-enrichment-sweep", daemon=True).start()
+
+    def submit(self, ip_address):
+        """
+        Queues an IP address for enrichment. Never blocks.
+        Returns False if the IP was dropped because the queue is full.
+        """
+        if not ip_address:
+            return False
+        self.start()
+        with self._lock:
+            if ip_address in self._pending:
+                return True
+            self._pending.add(ip_address)
+        try:
+            self._queue.put_nowait(ip_address)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._pending.discard(ip_address)
+                self.dropped += 1
+            return False
+
+    def sweep(self):
+        """
+        Queues the IPs of rows still pending a location, as far as the queue has room.
+        Returns the number of IPs queued.
+        """
+        room = self._queue.maxsize - self._queue.qsize()
+        if room <= 0:
+            return 0
+        queued = 0
+        for ip_address in tracking_model.get_pending_geolocation_ips(min(room, Config.GEOLOCATION_SWEEP_BATCH)):
+            with self._lock:
+                if ip_address in self._pending:
+                    continue
+                self._pending.add(ip_address)
+            try:
+                self._queue.put_nowait(ip_address)
+            except queue.Full:
+                with self._lock:
+                    self._pending.discard(ip_address)
+                break
+            queued += 1
+        with self._lock:
+            self.swept += queued
+        return queued
+
+    def join(self):
+        """Block until every queued IP has been processed."""
+        self._queue.join()
+
+    def stats(self):
+        """Returns the pipeline counters, and the resolver cache counters if it has any."""
+        stats = {
+            'queued': self._queue.qsize(),
+            'dropped': self.dropped,
+            'swept': self.swept,
+            'workers': len(self._threads)
+        }
+        if hasattr(self.resolver, 'stats'):
+            stats['resolver'] = self.resolver.stats()
+        return stats
+
+    def _run(self):
+        while True:
+            ip_address = self._queue.get()
+            # Rows of this IP committed from now on may miss the update below:
+            # let a new submit queue the IP again
+            with self._lock:
+                self._pending.discard(ip_address)
+            try:
+                self._enrich(ip_address)
+            except Exception as e:
+                print(f"Error enriching geolocation for {ip_address}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error sweeping pending geolocation: {e}")
+
+    def _enrich(self, ip_address):
+        location = self.resolver.resolve(ip_address)
+        country, city = location if location else (UNKNOWN, UNKNOWN)
+        tracking_model.apply_geolocation(ip_address, country, city)
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def _default_resolver():
+    """
+    Uses the local GeoIP database when one is configured, ip-api.com otherwise,
+    behind the geolocation cache.
+    """
+    if Config.GEOIP_DATABASE_PATH:
+        resolver = LocalGeoIPResolver()
+    else:
+        resolver = IpApiResolver()
+    if Config.GEOLOCATION_CACHE_SIZE > 0:
+        resolver = CachingResolver(resolver)
+    return resolver
+
+def get_pipeline():
+    """Returns the process-wide enrichment pipeline, creating it on first use."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = GeoEnrichmentPipeline(_default_resolver())
+                metrics.register_provider('geolocation', _pipeline.stats)
+    return _pipeline
+
+def set_resolver(resolver):
+    """Replaces the resolver used by the process-wide pipeline."""
+    get_pipeline().resolver = resolver
+
+def resolve_inline(ip_address):
+    """
+    Resolves an IP on the request path when the configured resolver is local.
+    Returns (country, city), or None when the lookup has to be deferred to the pipeline.
+    """
+    resolver = get_pipeline().resolver
+    if not getattr(resolver, 'is_local', False):
+        return None
+    return resolver.resolve(ip_address) or (UNKNOWN, UNKNOWN)
+
+def enqueue(ip_address):
+    """Schedules background geolocation of every pending row logged for this IP."""
+    return get_pipeline().submit(ip_address)
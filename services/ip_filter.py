@@ -0,0 +1,222 @@
+import ipaddress
+import threading
+import time
+from config.settings import Config
+from models import ip_rule_model
+from algorithms.radix_trie import CidrTrie
+from services import metrics
+
+class IpFilter:
+    """
+    Block and allow lists of client networks, answering "this IP is blocked"
+    from memory, before any lookup, geolocation or telemetry.
+
+    The rules of the ip_rules table are loaded into a radix trie of CIDR
+    networks, and the most specific network containing an IP decides: an allow
+    rule inside a blocked network exempts it. The trie is rebuilt from the
+    table every refresh_interval seconds by a background thread, so rules
+    changed by other worker processes or expired are picked up; rules changed
+    in this process are applied by load().
+
+    With autoblock_threshold set, the same thread also promotes, every
+    IP_AUTOBLOCK_INTERVAL seconds, the IPs with that many failed attempts in
+    the last autoblock_window minutes to block rules expiring after
+    autoblock_minutes (IPs of allowed networks and of proxy_networks, the
+    reverse proxies in front of the API, excepted).
+    """
+    def __init__(self, refresh_interval=None, autoblock_threshold=None, autoblock_window=None, autoblock_minutes=None,
+                 proxy_networks=None):
+        self.refresh_interval = refresh_interval or Config.IP_RULES_REFRESH_INTERVAL
+        self.autoblock_threshold = Config.IP_AUTOBLOCK_THRESHOLD if autoblock_threshold is None else autoblock_threshold
+        self.autoblock_window = autoblock_window or Config.IP_AUTOBLOCK_WINDOW_MINUTES
+        self.autoblock_minutes = autoblock_minutes or Config.IP_AUTOBLOCK_MINUTES
+        self.proxy_networks = [
+            ipaddress.ip_network(network, strict=False)
+            for network in (Config.TRUSTED_PROXY_NETWORKS if proxy_networks is None else proxy_networks)
+        ]
+        self._trie = None
+        self._last_promotion = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.loaded = False
+        self.loads = 0
+        self.last_load_seconds = None
+        self.blocked = 0
+        self.autoblocked = 0
+
+    def load(self):
+        """
+        Rebuilds the trie from the rules in the database and swaps it in.
+        Returns the number of rules loaded.
+        """
+        started = time.monotonic()
+        trie = CidrTrie()
+        for network, action in ip_rule_model.list_active_rules():
+            trie.insert(network, action)
+        with self._lock:
+            self._trie = trie
+            self.loaded = True
+            self.loads += 1
+            self.last_load_seconds = round(time.monotonic() - started, 4)
+        return len(trie)
+
+    def is_blocked(self, client_ip):
+        """True if the most specific rule matching the IP blocks it. False if none does, or before the first load."""
+        trie = self._trie
+        if trie is None or not client_ip or trie.lookup(client_ip) != 'block':
+            return False
+        self.blocked += 1
+        return True
+
+    def promote(self):
+        """
+        Adds expiring block rules for the IPs with autoblock_threshold failed
+        attempts in the last autoblock_window minutes, and reloads the trie
+        if any was added.
+        Returns the number of rules added.
+        """
+        self._last_promotion = time.monotonic()
+        trie = self._trie
+        networks = []
+        for ip_address, _ in ip_rule_model.get_frequent_failed_ips(self.autoblock_window, self.autoblock_threshold):
+            try:
+                address = ipaddress.ip_address(ip_address)
+            except ValueError:
+                continue
+            # Skip IPs already blocked, and those of allowed networks
+            if trie is not None and trie.lookup(address) is not None:
+                continue
+            # A proxy's address stands for all the clients behind it
+            if any(address in network for network in self.proxy_networks):
+                continue
+            networks.append(str(ipaddress.ip_network(address)))
+
+        reason = f"{self.autoblock_threshold}+ failed attempts in {self.autoblock_window} min"
+        added = ip_rule_model.add_auto_blocks(networks, reason, self.autoblock_minutes)
+        if added:
+            print(f"IP filter: {added} IPs blocked after repeated failed attempts.")
+            self.autoblocked += added
+            self.load()
+        return added
+
+    def start(self):
+        """Start the reload thread if it is not running yet."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ip-filter", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the reload thread."""
+        self._stop.set()
+        with self._lock:
+            self._thread = None
+
+    def stats(self):
+        """Returns the filter counters as a dictionary."""
+        trie = self._trie
+        return {
+            'loaded': self.loaded,
+            'rules': len(trie) if trie else 0,
+            'blocked': self.blocked,
+            'autoblocked': self.autoblocked,
+            'loads': self.loads,
+            'last_load_seconds': self.last_load_seconds
+        }
+
+    def _run(self):
+        while not self._stop.wait(0 if not self.loaded else self.refresh_interval):
+            try:
+                if self.autoblock_threshold > 0 and (
+                    self._last_promotion is None
+                    or time.monotonic() - self._last_promotion >= Config.IP_AUTOBLOCK_INTERVAL
+                ):
+                    self.promote()
+                self.load()
+            except Exception as e:
+                print(f"Error reloading IP filter: {e}")
+                # Retry after the regular interval rather than in a tight loop
+                if self._stop.wait(self.refresh_interval):
+                    return
+
+_ip_filter = None
+_ip_filter_lock = threading.Lock()
+
+def get_ip_filter():
+    """Returns the process-wide IP filter, creating it on first use."""
+    global _ip_filter
+    if _ip_filter is None:
+        with _ip_filter_lock:
+            if _ip_filter is None:
+                _ip_filter = IpFilter()
+                metrics.register_provider('ip_filter', _ip_filter.stats)
+    return _ip_filter
+
+def load():
+    """
+    Loads the IP rules and starts reloading them in the background.
+    Returns the number of rules, or None if the filter is disabled.
+    """
+    if not Config.IP_FILTER_ENABLED:
+        return None
+    ip_filter = get_ip_filter()
+    if ip_filter.autoblock_threshold > 0 and Config.TRUSTED_PROXY_HOPS == 0:
+        print("Warning: IP autoblock is on with TRUSTED_PROXY_HOPS=0; clients are keyed on their peer address, "
+              "so behind a reverse proxy the proxy itself would be blocked. Set TRUSTED_PROXY_HOPS.")
+    try:
+        count = ip_filter.load()
+    finally:
+        ip_filter.start()
+    return count
+
+def reload():
+    """Applies rules changed in this process, if the filter is loaded."""
+    if _ip_filter is not None and _ip_filter.loaded:
+        _ip_filter.load()
+
+def save_rule(network, action, reason=None):
+    """
+    Creates or replaces the admin rule of a network, and applies it to this
+    process at once (other processes pick it up on their next reload).
+
+    Args:
+        network (str): A CIDR network or a single IP address; host bits are ignored.
+        action (str): 'allow' or 'block'.
+        reason (str, optional): Why the rule exists.
+
+    Returns:
+        str: The normalized network.
+
+    Raises:
+        ValueError: If the network or the action is invalid.
+    """
+    if action not in ip_rule_model.ACTIONS:
+        raise ValueError(f"Invalid action: {action}")
+    try:
+        network = str(ipaddress.ip_network((network or '').strip(), strict=False))
+    except ValueError:
+        raise ValueError(f"Invalid IP address or network: {network}")
+    ip_rule_model.save_rule(network, action, (reason or '').strip() or None)
+    reload()
+    return network
+
+def delete_rule(rule_id):
+    """
+    Deletes a rule, and applies the change to this process at once.
+    Raises ValueError if the rule does not exist.
+    """
+    if not ip_rule_model.delete_rule(rule_id):
+        raise ValueError("Rule not found.")
+    reload()
+
+def is_blocked(client_ip):
+    """
+    True if a block rule covers the IP. Always False while the filter is
+    disabled or not loaded: validation never waits for the rules.
+    """
+    if _ip_filter is None:
+        return False
+    return _ip_filter.is_blocked(client_ip)
@@ -0,0 +1,271 @@
+import bisect
+import threading
+import time
+from config.settings import Config
+from models import license_model
+from algorithms.bloom_filter import BloomFilter
+from services import metrics
+
+# Keys read per query when loading the filter
+_PAGE_SIZE = 50000
+
+class LicenseFilter:
+    """
+    Bloom filter of every license key, answering "this key does not exist"
+    without a query.
+
+    The filter is built from the licenses table, then kept up to date by a
+    background thread reading the licenses created since the last ID seen
+    (every sync_interval seconds), so keys created by other worker processes
+    are picked up. Keys created in this process are added immediately through
+    add(). Licenses are never renamed, so the filter never has to forget a key.
+    A key created by another process is reported missing until the next sync,
+    which is why sync_interval is short.
+
+    IDs are drawn before commit, so a license can become visible after
+    licenses with higher IDs (e.g. two bulk generation chunks committing out
+    of order). The IDs skipped while reading are kept as gaps and read again
+    on each sync, until every transaction that was running when they were
+    found has finished: only then can no license appear in them anymore.
+
+    The filter is sized for twice the number of keys (at least min_capacity).
+    Once it holds more keys than it was sized for, it is rebuilt at twice the
+    size, keeping the false positive rate close to fp_rate.
+    """
+    def __init__(self, fp_rate=None, min_capacity=None, sync_interval=None):
+        self.fp_rate = fp_rate or Config.LICENSE_FILTER_FALSE_POSITIVE_RATE
+        self.min_capacity = min_capacity or Config.LICENSE_FILTER_MIN_CAPACITY
+        self.sync_interval = sync_interval or Config.LICENSE_FILTER_SYNC_INTERVAL
+        self._filter = None
+        self._last_id = 0
+        self._gaps = []  # (low, high, xmax): skipped ID ranges, until transactions below xmax finish
+        self._rebuilding = None  # Keys added in this process while a rebuild is running
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.loaded = False
+        self.loads = 0
+        self.last_load_seconds = None
+        self.last_sync = None
+        self.rejected = 0
+
+    def load(self, capacity=None):
+        """
+        Builds the filter from the database, sized for 'capacity' keys (by default
+        twice the current number of licenses), and swaps it in.
+        Returns the number of keys in the filter.
+        """
+        with self._sync_lock:
+            with self._lock:
+                self._rebuilding = []
+            try:
+                started = time.monotonic()
+                if capacity is None:
+                    capacity = 2 * license_model.count_licenses()
+                bloom = BloomFilter(max(capacity, self.min_capacity), self.fp_rate)
+                last_id, _, gaps = self._read_keys(bloom, 0)
+                gaps = self._stamp(gaps)
+                with self._lock:
+                    # Keep keys created in this process while the table was being read
+                    bloom.update(self._rebuilding)
+                    self._filter = bloom
+                    self._last_id = last_id
+                    self._gaps = gaps
+                    self.loaded = True
+                    self.loads += 1
+                    self.last_load_seconds = round(time.monotonic() - started, 4)
+                    self.last_sync = time.time()
+            finally:
+                with self._lock:
+                    self._rebuilding = None
+        return len(bloom)
+
+    def sync(self):
+        """
+        Adds the keys of the licenses created since the last sync, or committed
+        since in the ID gaps left by earlier syncs, and rebuilds the filter for
+        twice its keys if it is over capacity.
+        Returns the number of keys added.
+        """
+        if not self.loaded:
+            return self.load()
+
+        with self._sync_lock:
+            bloom = self._filter
+            last_id, added, gaps = self._read_keys(bloom, self._last_id)
+            if gaps or self._gaps:
+                xmin, xmax = license_model.get_transaction_horizon()
+                added += self._read_gaps(bloom, xmin)
+                self._gaps.extend((low, high, xmax) for low, high in gaps)
+            with self._lock:
+                self._last_id = last_id
+                self.last_sync = time.time()
+
+        if len(bloom) > bloom.capacity:
+            self.load(2 * len(bloom))
+        return added
+
+    def might_exist(self, license_key):
+        """
+        False if no license has this key. True if one probably does, or if the
+        filter is not loaded yet.
+        """
+        bloom = self._filter
+        if bloom is None or license_key in bloom:
+            return True
+        self.rejected += 1
+        return False
+
+    def add(self, license_keys):
+        """Adds the keys of licenses created in this process to the filter."""
+        license_keys = list(license_keys)
+        with self._lock:
+            if self._filter is not None:
+                self._filter.update(license_keys)
+            if self._rebuilding is not None:
+                self._rebuilding.extend(license_keys)
+
+    def start(self):
+        """Start the sync thread if it is not running yet."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="license-filter", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the sync thread."""
+        self._stop.set()
+        with self._lock:
+            self._thread = None
+
+    def stats(self):
+        """Returns the filter counters and memory footprint as a dictionary."""
+        bloom = self._filter
+        return {
+            'loaded': self.loaded,
+            'keys': len(bloom) if bloom else 0,
+            'capacity': bloom.capacity if bloom else 0,
+            'size_bytes': bloom.size_bytes if bloom else 0,
+            'hash_functions': bloom.hash_count if bloom else 0,
+            'target_false_positive_rate': self.fp_rate,
+            'estimated_false_positive_rate': round(bloom.estimated_fp_rate(), 6) if bloom else None,
+            'rejected': self.rejected,
+            'pending_id_gaps': len(self._gaps),
+            'loads': self.loads,
+            'last_load_seconds': self.last_load_seconds,
+            'last_sync_age_seconds': round(time.time() - self.last_sync, 1) if self.last_sync else None
+        }
+
+    def _read_keys(self, bloom, last_id):
+        """
+        Adds the keys of the licenses with an ID above last_id to a filter, one page at a time.
+        Returns the highest ID read, the number of keys added and the (low, high)
+        ranges of the IDs skipped below it.
+        """
+        added = 0
+        gaps = []
+        while True:
+            rows = license_model.get_license_keys_after(last_id, _PAGE_SIZE)
+            if rows:
+                with self._lock:
+                    bloom.update(row[1] for row in rows)
+                gaps.extend(_missing_ranges(last_id + 1, rows[-1][0], [row[0] for row in rows]))
+                last_id = rows[-1][0]
+                added += len(rows)
+            if len(rows) < _PAGE_SIZE:
+                return last_id, added, gaps
+
+    def _read_gaps(self, bloom, xmin):
+        """
+        Adds the keys of the licenses committed in the known ID gaps, then
+        narrows the gaps to the IDs still missing. Gaps whose transactions have
+        all finished before xmin are read one last time and dropped.
+        Returns the number of keys added.
+        """
+        if not self._gaps:
+            return 0
+        rows = license_model.get_license_keys_in_ranges([(low, high) for low, high, _ in self._gaps])
+        if rows:
+            with self._lock:
+                bloom.update(row[1] for row in rows)
+        ids = [row[0] for row in rows]
+        gaps = []
+        for low, high, xmax in self._gaps:
+            if xmax > xmin:
+                found = ids[bisect.bisect_left(ids, low):bisect.bisect_right(ids, high)]
+                gaps.extend((start, end, xmax) for start, end in _missing_ranges(low, high, found))
+        self._gaps = gaps
+        return len(rows)
+
+    def _stamp(self, gaps):
+        """Returns the gaps found by a read, with the xmax of a snapshot taken after it."""
+        if not gaps:
+            return []
+        _, xmax = license_model.get_transaction_horizon()
+        return [(low, high, xmax) for low, high in gaps]
+
+    def _run(self):
+        while not self._stop.wait(0 if not self.loaded else self.sync_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Error syncing license filter: {e}")
+                # Retry after the regular interval rather than in a tight loop
+                if self._stop.wait(self.sync_interval):
+                    return
+
+def _missing_ranges(low, high, ids):
+    """Returns the (low, high) ranges of the IDs from low to high that are not in the sorted 'ids'."""
+    ranges = []
+    for found in ids:
+        if found > low:
+            ranges.append((low, found - 1))
+        low = found + 1
+    if low <= high:
+        ranges.append((low, high))
+    return ranges
+
+_license_filter = None
+_license_filter_lock = threading.Lock()
+
+def get_license_filter():
+    """Returns the process-wide license filter, creating it on first use."""
+    global _license_filter
+    if _license_filter is None:
+        with _license_filter_lock:
+            if _license_filter is None:
+                _license_filter = LicenseFilter()
+                metrics.register_provider('license_filter', _license_filter.stats)
+    return _license_filter
+
+def load():
+    """
+    Builds the license filter and starts syncing it in the background.
+    Returns the number of keys in the filter, or None if the filter is disabled.
+    """
+    if not Config.LICENSE_FILTER_ENABLED:
+        return None
+    license_filter = get_license_filter()
+    try:
+        count = license_filter.load()
+    finally:
+        license_filter.start()
+    return count
+
+def might_exist(license_key):
+    """
+    False if no license has this key, in which case the lookup can be skipped.
+    Always True while the filter is disabled or not loaded, so that validation
+    falls back to querying the database.
+    """
+    if _license_filter is None:
+        return True
+    return _license_filter.might_exist(license_key)
+
+def add(license_keys):
+    """Records license keys created in this process."""
+    if _license_filter is not None:
+        _license_filter.add(license_keys)
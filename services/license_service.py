@@ -1,6 +1,11 @@
+from config.settings import Config
 from models import license_model
+from services import app_registry, license_filter, revocation_list
 from algorithms import key_generator
 
+# Collisions with existing keys are astronomically rare; a few redraws are plenty
+_MAX_KEY_ATTEMPTS = 10
+
 def create_new_license(app_id, license_type, duration_days=None):
     """
     Creates a new license for the given app.
@@ -13,6 +18,114 @@ def create_new_license(app_id, license_type, duration_days=None):
     Returns:
         dict: The created license.
 
+    Raises:
+        ValueError: If inputs are invalid.
+    """
+    duration_days = _check_license_kind(license_type, duration_days)
+
+    app = app_registry.get_app(app_id)
+    if not app:
+        raise ValueError("App not found")
+
+    # Generate a unique license key in the app's key format
+    license_key = key_generator.generate_license_key(*_key_format_args(app))
+
+    # Create the license in the database
+    license_data = license_model.create_license(app['id'], license_key, license_type, duration_days)
+    if license_data:
+        license_filter.add([license_data['license_key']])
+    return license_data
+
+def revoke_license(license_key):
+    """
+    Revokes a license so that it no longer validates.
+
+    Args:
+        license_key (str): The key of the license to revoke.
+
+    Returns:
+        int: The ID of the revoked license.
+
+    Raises:
+        ValueError: If the key is missing or unknown.
+    """
+    if not license_key or not license_key.strip():
+        raise ValueError("License key is required.")
+
+    license_id = license_model.revoke_license_by_key(license_key.strip())
+    if license_id is None:
+        raise ValueError("License not found.")
+
+    # Tokens of this license stop refreshing right away in this process
+    revocation_list.revoke(license_id)
+    return license_id
+
+def generate_licenses_bulk(app_id, license_type, duration_days, count):
+    """
+    Creates a batch of licenses for the given app.
+
+    The arguments are checked before anything is written. Licenses are then
+    created BULK_LICENSE_CHUNK_SIZE at a time, one multi-row insert and one
+    commit per chunk, so a batch of any size never sits in memory at once.
+
+    Args:
+        app_id (int): The ID of the application.
+        license_type (str): 'trial' or 'lifetime'.
+        duration_days (int, optional): Duration in days for trial licenses.
+        count (int): The number of licenses to create.
+
+    Returns:
+        generator: Yields lists of (id, license_key, created_at) tuples, one per
+        committed chunk.
+
+    Raises:
+        ValueError: If inputs are invalid.
+    """
+    duration_days = _check_license_kind(license_type, duration_days)
+
+    if not isinstance(count, int) or count <= 0:
+        raise ValueError("License count must be a positive number.")
+    if count > Config.BULK_LICENSE_MAX_COUNT:
+        raise ValueError(f"At most {Config.BULK_LICENSE_MAX_COUNT} licenses can be generated at once.")
+
+    app = app_registry.get_app(app_id)
+    if not app:
+        raise ValueError("App not found")
+
+    return _generate_chunks(app, license_type, duration_days, count)
+
+def _generate_chunks(app, license_type, duration_days, count):
+    remaining = count
+    while remaining > 0:
+        size = min(remaining, Config.BULK_LICENSE_CHUNK_SIZE)
+        yield _create_chunk(app, license_type, duration_days, size)
+        remaining -= size
+
+def _create_chunk(app, license_type, duration_days, size):
+    """
+    Creates exactly 'size' licenses, drawing new keys for those that collide with
+    existing ones. Returns the (id, license_key, created_at) tuples.
+    """
+    created = []
+    for _ in range(_MAX_KEY_ATTEMPTS):
+        # Keys are distinct within the batch, so a chunk never collides with itself
+        keys = key_generator.generate_license_keys(size - len(created), *_key_format_args(app))
+        rows = license_model.create_licenses(app['id'], keys, license_type, duration_days)
+        license_filter.add(row[1] for row in rows)
+        created.extend(rows)
+        if len(created) == size:
+            return created
+    raise RuntimeError("Could not generate unique license keys.")
+
+def _key_format_args(app):
+    # Apps created before key formats existed have plain (format 1) keys
+    return app.get('key_format', key_generator.KEY_FORMAT_PLAIN), Config.LICENSE_KEY_CHECKSUM_SECRET
+
+def _check_license_kind(license_type, duration_days):
+    """
+    Checks the type and duration of a license to create.
+    Returns the duration to store (None for lifetime licenses).
+
     Raises:
         ValueError: If inputs are invalid.
     """
@@ -30,8 +143,4 @@ def create_new_license(app_id, license_type, duration_days=None):
         # Let's pass None.
         duration_days = None
 
-    # Generate a unique license key
-    license_key = key_generator.generate_license_key()
-
-    # Create the license in the database
-    return license_model.create_license(app_id, license_key, license_type, duration_days)
+    return duration_days
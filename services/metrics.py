@@ -0,0 +1,28 @@
+import threading
+
+_providers = {}
+_lock = threading.Lock()
+
+def register_provider(name, provider):
+    """
+    Registers a callable returning a dictionary of metrics under the given name.
+    Registering the same name again replaces the previous provider.
+    """
+    with _lock:
+        _providers[name] = provider
+
+def collect():
+    """
+    Returns the current metrics of every registered provider, keyed by name.
+    A failing provider reports its error instead of breaking the whole snapshot.
+    """
+    with _lock:
+        providers = list(_providers.items())
+
+    snapshot = {}
+    for name, provider in providers:
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            snapshot[name] = {'error': str(e)}
+    return snapshot
@@ -0,0 +1,78 @@
+from datetime import date
+from config.settings import Config
+from models import partition_model
+from models.partition_model import add_months, month_start, partition_name
+
+def retention_policy():
+    """Returns the months kept besides the current one, by partitioned table (0 keeps every month)."""
+    return {
+        'activations': Config.ACTIVATIONS_RETENTION_MONTHS,
+        'failed_attempts': Config.FAILED_ATTEMPTS_RETENTION_MONTHS
+    }
+
+def maintain(today=None):
+    """
+    Creates the partitions of the coming TELEMETRY_PARTITIONS_AHEAD months,
+    and retires those older than the retention of their table: detached, taken
+    out of the app_stats counters, then dropped, or kept as archive tables with
+    TELEMETRY_ARCHIVE_EXPIRED.
+
+    Partitions left detached by an interrupted run are retired first. Inserts
+    outside every partition fail, so this must run well within the months
+    created ahead (e.g. daily from cron); ensure_upcoming() also runs at app
+    startup and when a telemetry insert finds no partition.
+
+    Args:
+        today (date, optional): The current date, for tests.
+
+    Returns:
+        dict: 'created' and 'retired' partition names.
+    """
+    this_month = month_start(today or date.today())
+    created = []
+    retired = []
+    for table, retention in retention_policy().items():
+        for month in partition_model.list_detached(table):
+            retired.append(_retire(table, month))
+
+        created.extend(_create_upcoming(table, this_month))
+
+        if retention <= 0:
+            continue
+        oldest_kept = add_months(this_month, -retention)
+        for month in partition_model.list_partitions(table):
+            if month < oldest_kept:
+                partition_model.detach_partition(table, month)
+                retired.append(_retire(table, month))
+    return {'created': created, 'retired': retired}
+
+def ensure_upcoming(today=None):
+    """
+    Creates the partitions of the current and the coming
+    TELEMETRY_PARTITIONS_AHEAD months that do not exist yet.
+
+    Args:
+        today (date, optional): The current date, for tests.
+
+    Returns:
+        list: The names of the created partitions.
+    """
+    this_month = month_start(today or date.today())
+    created = []
+    for table in retention_policy():
+        created.extend(_create_upcoming(table, this_month))
+    return created
+
+def _create_upcoming(table, this_month):
+    created = []
+    for ahead in range(Config.TELEMETRY_PARTITIONS_AHEAD + 1):
+        month = add_months(this_month, ahead)
+        if partition_model.create_partition(table, month):
+            created.append(partition_name(table, month))
+    return created
+
+def _retire(table, month):
+    rows = partition_model.retire_detached(table, month, archive=Config.TELEMETRY_ARCHIVE_EXPIRED)
+    action = "archived" if Config.TELEMETRY_ARCHIVE_EXPIRED else "dropped"
+    print(f"Partition {partition_name(table, month)} {action} ({rows} rows).")
+    return partition_name(table, month)
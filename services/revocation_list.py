@@ -0,0 +1,121 @@
+import threading
+import time
+from config.settings import Config
+from models import license_model
+from services import metrics
+
+class RevocationList:
+    """
+    In-memory set of the IDs of licenses that no longer validate.
+
+    The set is loaded from licenses.status and reloaded every refresh_interval
+    seconds by a background thread, so revocations made by other worker
+    processes are picked up. Revocations made in this process are applied
+    immediately through revoke().
+    """
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval or Config.REVOCATION_REFRESH_INTERVAL
+        self._revoked = frozenset()
+        self._local = set()  # Revoked in this process since the last load started
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.loaded = False
+        self.loads = 0
+        self.last_load_seconds = None
+
+    def load(self):
+        """
+        Reloads the set from the database.
+        Returns the number of revoked licenses.
+        """
+        with self._lock:
+            self._local.clear()
+        started = time.monotonic()
+        revoked = set(license_model.get_revoked_license_ids())
+        with self._lock:
+            # Keep revocations applied while the query was running
+            revoked.update(self._local)
+            self._revoked = frozenset(revoked)
+            self.loaded = True
+            self.loads += 1
+            self.last_load_seconds = round(time.monotonic() - started, 4)
+        return len(revoked)
+
+    def is_revoked(self, license_id):
+        """True if the license was revoked or has expired."""
+        return license_id in self._revoked
+
+    def revoke(self, license_id):
+        """Adds a license revoked in this process to the set."""
+        with self._lock:
+            self._local.add(license_id)
+            self._revoked = self._revoked | {license_id}
+
+    def start(self):
+        """Start the reload thread if it is not running yet."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="revocation-list", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the reload thread."""
+        self._stop.set()
+        with self._lock:
+            self._thread = None
+
+    def stats(self):
+        """Returns the set counters as a dictionary."""
+        return {
+            'revoked': len(self._revoked),
+            'loaded': self.loaded,
+            'loads': self.loads,
+            'last_load_seconds': self.last_load_seconds
+        }
+
+    def _run(self):
+        while not self._stop.wait(0 if not self.loaded else self.refresh_interval):
+            try:
+                self.load()
+            except Exception as e:
+                print(f"Error loading revocation list: {e}")
+                # Retry after the regular interval rather than in a tight loop
+                if self._stop.wait(self.refresh_interval):
+                    return
+
+_revocations = None
+_revocations_lock = threading.Lock()
+
+def get_revocation_list():
+    """Returns the process-wide revocation list, creating it on first use."""
+    global _revocations
+    if _revocations is None:
+        with _revocations_lock:
+            if _revocations is None:
+                _revocations = RevocationList()
+                metrics.register_provider('revocations', _revocations.stats)
+    return _revocations
+
+def load():
+    """Loads the revocation list and starts reloading it in the background."""
+    revocations = get_revocation_list()
+    try:
+        count = revocations.load()
+    finally:
+        revocations.start()
+    return count
+
+def is_revoked(license_id):
+    """True if the license was revoked or has expired."""
+    revocations = get_revocation_list()
+    if not revocations.loaded:
+        # Not loaded yet (e.g. the startup load failed): load inline rather than answer blindly
+        load()
+    return revocations.is_revoked(license_id)
+
+def revoke(license_id):
+    """Records a license revoked in this process."""
+    get_revocation_list().revoke(license_id)
@@ -0,0 +1,163 @@
+import secrets
+from config.settings import Config
+from models import signing_key_model
+from security import jwt_handler
+from services import app_registry, metrics
+from utils.ttl_cache import TTLCache
+
+# Keysets keyed by app id: the loaded active private key and the public JWKS.
+# Rotating a key invalidates the entry in this process; other worker processes
+# keep signing with the retired key for up to APP_REGISTRY_TTL, which is fine
+# since retired keys stay published for SIGNING_KEY_GRACE_MINUTES.
+_keysets = TTLCache(Config.APP_REGISTRY_SIZE, Config.APP_REGISTRY_TTL)
+
+def uses_app_keys():
+    """True when tokens are signed with per-app asymmetric keys rather than the app secret."""
+    return Config.TOKEN_SIGNING_ALGORITHM != 'HS256'
+
+def new_key():
+    """
+    Generates a key of the configured algorithm.
+    Returns a (kid, algorithm, private_key_pem) tuple.
+    """
+    algorithm = Config.TOKEN_SIGNING_ALGORITHM
+    return secrets.token_hex(8), algorithm, jwt_handler.generate_signing_key(algorithm)
+
+def build_keyset(keys):
+    """
+    Builds a keyset from signing key rows (see signing_key_model.get_publishable_keys).
+    Returns a dictionary with the 'active' key (kid, algorithm, loaded private key),
+    None if no key is active, the 'jwks' document publishing every key and the
+    public 'verification_keys' by kid.
+    """
+    active = None
+    jwks = []
+    verification_keys = {}
+    for key in keys:
+        private_key = jwt_handler.load_signing_key(key['private_key'])
+        jwks.append(jwt_handler.public_jwk(private_key, key['kid'], key['algorithm']))
+        verification_keys[key['kid']] = {'algorithm': key['algorithm'], 'public_key': private_key.public_key()}
+        if key['retired_at'] is None:
+            active = {'kid': key['kid'], 'algorithm': key['algorithm'], 'private_key': private_key}
+    return {'active': active, 'jwks': {'keys': jwks}, 'verification_keys': verification_keys}
+
+def lookup(app_id):
+    """Returns the cached keyset of an app, or None. Does not query the database."""
+    return _keysets.get(app_id)
+
+def remember(app_id, keyset):
+    """Caches a keyset built by the caller."""
+    _keysets.set(app_id, keyset)
+
+def get_keyset(app_id, create=False):
+    """
+    Returns the keyset of an existing app. Its 'active' key is None if the app
+    has no signing key yet, unless 'create' is set: then the first key is created.
+    Only signing creates keys, so reads such as the public JWKS never write.
+    """
+    keyset = lookup(app_id)
+    if keyset is not None and (keyset['active'] is not None or not create):
+        return keyset
+
+    keys = signing_key_model.get_publishable_keys(app_id, Config.SIGNING_KEY_GRACE_MINUTES)
+    if create and not any(key['retired_at'] is None for key in keys):
+        # A concurrent creation wins the unique index; either way the reload sees one active key
+        signing_key_model.create_key(app_id, *new_key())
+        keys = signing_key_model.get_publishable_keys(app_id, Config.SIGNING_KEY_GRACE_MINUTES)
+
+    keyset = build_keyset(keys)
+    remember(app_id, keyset)
+    return keyset
+
+def sign_with_keyset(payload, keyset):
+    """Signs a JWT payload with the active key of a keyset, with its 'kid' in the header."""
+    active = keyset['active']
+    return jwt_handler.generate_token(
+        payload, active['private_key'], algorithm=active['algorithm'],
+        expiration_minutes=Config.TOKEN_EXPIRATION_MINUTES, headers={'kid': active['kid']}
+    )
+
+def sign_token(payload):
+    """
+    Signs a validation JWT payload for the app it belongs to.
+    Returns the token, or None if the app does not exist.
+    """
+    app = app_registry.get_app(payload['app_id'])
+    if not app:
+        return None
+    if not uses_app_keys():
+        return jwt_handler.generate_token(payload, app['app_secret'], expiration_minutes=Config.TOKEN_EXPIRATION_MINUTES)
+    return sign_with_keyset(payload, get_keyset(app['id'], create=True))
+
+def verify_token(token):
+    """
+    Verifies a token issued by sign_token: signature and expiration.
+    Returns the decoded payload, or None if the token is invalid or expired.
+    """
+    unverified = jwt_handler.read_unverified(token)
+    if not unverified:
+        return None
+    header, claims = unverified
+
+    app = app_registry.get_app(claims.get('app_id'))
+    if not app:
+        return None
+    if not uses_app_keys():
+        return verify_with_keyset(token, header, app, None)
+
+    # A key rotated by another worker is only known here once the cached keyset
+    # expires; until then its tokens fail verification and clients fall back to
+    # a full validation. Unknown kids deliberately do not trigger a reload.
+    return verify_with_keyset(token, header, app, get_keyset(app['id']))
+
+def verify_with_keyset(token, header, app, keyset):
+    """
+    Verifies a token against the app secret (keyset None) or the key of a keyset matching its 'kid'.
+    Returns the decoded payload, or None if the token is invalid or expired.
+    """
+    if keyset is None:
+        if header.get('alg') != 'HS256':
+            return None
+        return jwt_handler.validate_token(token, app['app_secret'])
+
+    key = keyset['verification_keys'].get(header.get('kid'))
+    if key is None or header.get('alg') != key['algorithm']:
+        return None
+    return jwt_handler.validate_token(token, key['public_key'], algorithms=[key['algorithm']])
+
+def get_jwks(app_id):
+    """
+    Returns the JWKS document of an app, or None if the app does not exist.
+    The key set is empty when tokens are signed with the app secret or the app
+    has no signing key yet.
+    """
+    app = app_registry.get_app(app_id)
+    if not app:
+        return None
+    if not uses_app_keys():
+        return {'keys': []}
+    return get_keyset(app['id'])['jwks']
+
+def create_first_key(app_id):
+    """
+    Creates the first signing key of a new app. Does nothing if it already has an active key.
+    """
+    signing_key_model.create_key(app_id, *new_key())
+    invalidate(app_id)
+
+def rotate(app_id):
+    """
+    Retires the active signing key of an app and creates a new one.
+    Tokens signed with the retired key keep verifying for SIGNING_KEY_GRACE_MINUTES.
+    """
+    signing_key_model.rotate_key(app_id, *new_key())
+    invalidate(app_id)
+
+def invalidate(app_id):
+    """Drops the cached keyset of an app."""
+    _keysets.pop(app_id)
+
+def clear():
+    _keysets.clear()
+
+metrics.register_provider('signing_keys', _keysets.stats)
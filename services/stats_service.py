@@ -0,0 +1,38 @@
+from models import app_stats_model
+
+def get_dashboard_stats(total_apps):
+    """
+    Returns the dashboard counters, read from the per-app counters of app_stats
+    rather than counted from the tables.
+
+    Args:
+        total_apps (int): The number of apps, already known to the caller.
+
+    Returns:
+        dict: 'total_apps', 'total_licenses', 'active_licenses' (licenses that
+        still validate: active or used) and 'failed_attempts'.
+    """
+    totals = app_stats_model.get_totals()
+    return {
+        'total_apps': total_apps,
+        'total_licenses': totals['licenses'],
+        'active_licenses': totals['licenses_active'] + totals['licenses_used'],
+        'failed_attempts': totals['failed_attempts']
+    }
+
+def reconcile():
+    """
+    Recounts the counters of every app and corrects those that drifted (e.g.
+    after manual edits, or rows removed without firing the triggers).
+    Apps are reconciled one at a time, each holding only its own row lock.
+
+    Returns:
+        dict: The corrected counters by app ID, as returned by app_stats_model.reconcile_app.
+    """
+    corrected = {}
+    for app_id in app_stats_model.list_app_ids():
+        drift = app_stats_model.reconcile_app(app_id)
+        if drift:
+            print(f"App {app_id}: corrected counters {drift}")
+            corrected[app_id] = drift
+    return corrected
@@ -0,0 +1,200 @@
+import atexit
+import threading
+import time
+from collections import deque
+from psycopg2 import errors
+from config.settings import Config
+from models import tracking_model
+from services import geolocation, metrics, partition_maintenance
+
+DROP_OLDEST = 'oldest'
+DROP_NEWEST = 'newest'
+
+class TelemetryWriter:
+    """
+    Write-behind buffer for activations and failed attempts.
+
+    Events are appended in memory and flushed in bulk by a background thread,
+    when the buffer reaches batch_size or every flush_interval seconds, and
+    once more on shutdown. The buffer holds at most max_buffer events; beyond
+    that the drop policy discards the oldest or the newest event and counts it.
+    """
+    def __init__(self, batch_size=None, flush_interval=None, max_buffer=None, drop_policy=None):
+        self.batch_size = batch_size or Config.TELEMETRY_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.TELEMETRY_FLUSH_INTERVAL
+        self.max_buffer = max_buffer or Config.TELEMETRY_MAX_BUFFER
+        self.drop_policy = drop_policy or Config.TELEMETRY_DROP_POLICY
+        if self.drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Invalid telemetry drop policy: {self.drop_policy}")
+
+        self._activations = deque()
+        self._attempts = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_seconds = None
+
+    def record_activation(self, license_id, ip_address, mac_address, user_agent, country, city):
+        """Buffers a successful activation. Never blocks on the database."""
+        self._append(self._activations, (license_id, ip_address, mac_address, user_agent, country, city))
+
+    def record_failed_attempt(self, app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason):
+        """Buffers a failed activation attempt. Never blocks on the database."""
+        self._append(self._attempts, (app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason))
+
+    def start(self):
+        """Start the flush thread if it is not running yet."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """Stop the flush thread and write whatever is still buffered."""
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """
+        Writes every buffered event in one transaction.
+        Returns the number of events written.
+        """
+        with self._flush_lock:
+            with self._cond:
+                activations = list(self._activations)
+                attempts = list(self._attempts)
+                self._activations.clear()
+                self._attempts.clear()
+            if not activations and not attempts:
+                return 0
+
+            started = time.monotonic()
+            try:
+                self._insert_batch(activations, attempts)
+                written = len(activations) + len(attempts)
+            except Exception as e:
+                # One bad row (e.g. an unknown app_id) fails the whole batch: retry row by row
+                print(f"Error flushing telemetry batch, retrying row by row: {e}")
+                written = self._write_individually(activations, attempts)
+
+            with self._cond:
+                self.written += written
+                self.failed += len(activations) + len(attempts) - written
+                self.flushes += 1
+                self.last_flush_seconds = round(time.monotonic() - started, 4)
+
+            self._schedule_geolocation(activations, attempts)
+            return written
+
+    def stats(self):
+        """Returns the buffer counters as a dictionary."""
+        with self._cond:
+            return {
+                'buffered': len(self._activations) + len(self._attempts),
+                'max_buffer': self.max_buffer,
+                'recorded': self.recorded,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'flushes': self.flushes,
+                'last_flush_seconds': self.last_flush_seconds
+            }
+
+    def _append(self, buffer, event):
+        self.start()
+        with self._cond:
+            self.recorded += 1
+            if len(self._activations) + len(self._attempts) >= self.max_buffer:
+                self.dropped += 1
+                if self.drop_policy == DROP_NEWEST:
+                    return
+                # Drop the oldest event of the busiest buffer
+                (self._attempts if len(self._attempts) >= len(self._activations) else self._activations).popleft()
+            buffer.append(event)
+            if len(self._activations) + len(self._attempts) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._activations) + len(self._attempts) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error in telemetry writer: {e}")
+
+    def _insert_batch(self, activations, attempts):
+        try:
+            tracking_model.insert_telemetry_batch(activations, attempts)
+        except errors.CheckViolation as e:
+            if 'no partition' not in str(e):
+                raise
+            # The partition maintenance job has not run for too long: create the
+            # missing months rather than lose every row until it does
+            print(f"Telemetry insert found no partition, creating upcoming partitions: {e}")
+            partition_maintenance.ensure_upcoming()
+            tracking_model.insert_telemetry_batch(activations, attempts)
+
+    def _write_individually(self, activations, attempts):
+        written = 0
+        for row in activations:
+            try:
+                tracking_model.log_activation(*row)
+                written += 1
+            except Exception:
+                pass
+        for row in attempts:
+            try:
+                tracking_model.log_failed_attempt(*row)
+                written += 1
+            except Exception:
+                pass
+        return written
+
+    def _schedule_geolocation(self, activations, attempts):
+        # Rows written with a pending location (NULL country) get enriched in the background
+        pending_ips = {row[1] for row in activations if row[4] is None}
+        pending_ips.update(row[2] for row in attempts if row[5] is None)
+        for ip_address in pending_ips:
+            geolocation.enqueue(ip_address)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """Returns the process-wide telemetry writer, creating it on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = TelemetryWriter()
+                metrics.register_provider('telemetry', _writer.stats)
+                atexit.register(_writer.stop)
+    return _writer
+
+def record_activation(license_id, ip_address, mac_address, user_agent, country, city):
+    """Buffers a successful activation for the next bulk flush."""
+    get_writer().record_activation(license_id, ip_address, mac_address, user_agent, country, city)
+
+def record_failed_attempt(app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason):
+    """Buffers a failed activation attempt for the next bulk flush."""
+    get_writer().record_failed_attempt(app_id, attempted_key, ip_address, mac_address, user_agent, country, city, reason)
@@ -1,12 +1,31 @@
-from models import license_model, machine_model, tracking_model, app_model
-from algorithms import hwid_parser
+from config.settings import Config
+from models import license_model
+from algorithms import hwid_parser, key_generator
+from services import app_registry, geolocation, license_filter, revocation_list, signing_keys, telemetry_writer
 from datetime import datetime, timezone, timedelta
-import requests
-import json
+
+# Outcomes of evaluate_license for a license that passed every rule
+ACTION_GRANT = 'grant'          # Already bound to this HWID, nothing to write
+ACTION_ACTIVATE = 'activate'    # First activation: bind the HWID and mark as used
+ACTION_MARK_USED = 'mark_used'  # Bound to this HWID but still flagged 'active'
+
+class LicenseValidationError(ValueError):
+    """
+    Raised when a license fails a validation rule.
+    'reason' is the code recorded in failed_attempts.
+    """
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
 
 def validate_license_request(payload, request_headers, client_ip):
     """
-    Validates a license request with telemetry and geolocation.
+    Validates a license request with telemetry.
+    Geolocation of the logged rows happens in the background.
+
+    The license and its bound machine are fetched in a single query, and a
+    first activation is applied in a single transaction. Activations and
+    failed attempts are buffered, not written inline.
 
     Args:
         payload (dict): The JSON payload from the client (containing 'license_key', 'hwid', 'app_id').
@@ -27,47 +46,292 @@ def validate_license_request(payload, request_headers, client_ip):
     if not license_key or not hwid:
         raise ValueError("Missing license_key or hwid.")
 
-    # Geolocation
-    country = 'Unknown'
-    city = 'Unknown'
-    try:
-        response = requests.get(f"http://ip-api.com/json/{client_ip}", timeout=2)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('status') == 'success':
-                country = data.get('country', 'Unknown')
-                city = data.get('city', 'Unknown')
-    except Exception:
-        # Fail gracefully if geolocation service is down or rate limited
-        pass
+    # Made-up keys are turned away before any query, lookup or telemetry
+    check_license_key_format(license_key, app_id)
+
+    # With a local GeoIP database the location is resolved inline. Otherwise telemetry
+    # is written with a pending location (NULL country/city) that the geolocation
+    # pipeline fills in off the request path.
+    # Telemetry itself is buffered and written in bulk by the telemetry writer.
+    location = geolocation.resolve_inline(client_ip)
+    country, city = location if location else (None, None)
 
     # Normalize HWID
     normalized_hwid = hwid_parser.parse_hwid(hwid)
     if not normalized_hwid:
         raise ValueError("Invalid HWID format.")
 
-    # Retrieve license
-    license_data = license_model.get_license_by_key(license_key)
-
-    if not license_data:
-        # Log failed attempt if app_id is provided
-        if app_id:
-             try:
-                 tracking_model.log_failed_attempt(
-                     app_id, license_key, client_ip, normalized_hwid, user_agent, country, city, "license_not_found"
-                 )
-             except Exception:
-                 pass
+    # Retrieve license and bound machine in one round trip, unless the key
+    # filter already knows that no license has this key
+    record = license_model.get_license_for_validation(license_key) if license_filter.might_exist(license_key) else None
+
+    if not record:
+        # Log failed attempt if app_id is provided and refers to an existing app
+        if app_id and app_registry.get_app(app_id):
+            telemetry_writer.record_failed_attempt(
+                app_id, license_key, client_ip, normalized_hwid, user_agent, country, city, "license_not_found"
+            )
         raise ValueError("License not found.")
 
-    # Verify App ID
-    if app_id and str(license_data['app_id']) != str(app_id):
-        tracking_model.log_failed_attempt(
-            license_data['app_id'], license_key, client_ip, normalized_hwid, user_agent, country, city, "app_mismatch"
+    license_data = record['license']
+
+    try:
+        action = evaluate_license(license_data, record['machine'], normalized_hwid, app_id)
+
+        if action == ACTION_ACTIVATE:
+            machine_id = license_model.activate_license(license_data['id'], normalized_hwid)
+            if machine_id is not None:
+                telemetry_writer.record_activation(
+                    license_data['id'], client_ip, normalized_hwid, user_agent, country, city
+                )
+            else:
+                # A concurrent request activated the license first: re-check against its binding
+                record = license_model.get_license_for_validation(license_key)
+                if not record:
+                    raise ValueError("License not found.")
+                license_data = record['license']
+                action = evaluate_license(license_data, record['machine'], normalized_hwid, app_id)
+                if action == ACTION_ACTIVATE:
+                    raise ValueError("License activation conflict. Please retry.")
+
+        if action == ACTION_MARK_USED:
+            license_model.update_license_status(license_data['id'], 'used')
+
+    except LicenseValidationError as e:
+        telemetry_writer.record_failed_attempt(
+            license_data['app_id'], license_key, client_ip, normalized_hwid, user_agent, country, city, e.reason
         )
-        raise ValueError("License does not belong to this application.")
+        raise
+
+    return _build_jwt_payload(license_data, normalized_hwid)
+
+def validate_license_batch(items, request_headers, client_ip):
+    """
+    Validates many license requests at once, with the same rules and telemetry
+    as validate_license_request.
+
+    Licenses are fetched with one set-based query and first activations are
+    applied with one set-based statement, whatever the number of items.
+
+    Args:
+        items (list): Payload dictionaries (containing 'license_key', 'hwid', 'app_id').
+        request_headers (dict): The request headers (containing 'User-Agent').
+        client_ip (str): The client's IP address.
+
+    Returns:
+        list: One dictionary per item, in order: {'payload': <JWT payload>} on
+        success or {'error': <message>} on failure.
+    """
+    user_agent = request_headers.get('User-Agent', 'Unknown')
+    location = geolocation.resolve_inline(client_ip)
+    country, city = location if location else (None, None)
+
+    results = [None] * len(items)
+    pending = []  # (index, license_key, normalized_hwid, app_id)
+    for index, item in enumerate(items):
+        license_key = item.get('license_key') if isinstance(item, dict) else None
+        hwid = item.get('hwid') if isinstance(item, dict) else None
+        if not license_key or not hwid:
+            results[index] = {'error': "Missing license_key or hwid."}
+            continue
+        try:
+            check_license_key_format(license_key, item.get('app_id'))
+        except ValueError as e:
+            results[index] = {'error': str(e)}
+            continue
+        normalized_hwid = hwid_parser.parse_hwid(hwid)
+        if not normalized_hwid:
+            results[index] = {'error': "Invalid HWID format."}
+            continue
+        pending.append((index, license_key, normalized_hwid, item.get('app_id')))
+
+    records = license_model.get_licenses_for_validation([p[1] for p in pending if license_filter.might_exist(p[1])])
+
+    # Evaluate every item in order against an in-memory view of the licenses,
+    # so that later items for the same license see earlier activations.
+    state = {key: (record['license'], record['machine']) for key, record in records.items()}
+    activations = {}  # license_id -> (license_key, normalized_hwid)
+    mark_used = set()
+    granted = []      # (index, license_key, normalized_hwid, app_id)
+
+    for index, license_key, normalized_hwid, app_id in pending:
+        if license_key not in state:
+            if app_id and app_registry.get_app(app_id):
+                telemetry_writer.record_failed_attempt(
+                    app_id, license_key, client_ip, normalized_hwid, user_agent, country, city, "license_not_found"
+                )
+            results[index] = {'error': "License not found."}
+            continue
+
+        license_data, machine = state[license_key]
+        try:
+            action = evaluate_license(license_data, machine, normalized_hwid, app_id)
+        except LicenseValidationError as e:
+            telemetry_writer.record_failed_attempt(
+                license_data['app_id'], license_key, client_ip, normalized_hwid, user_agent, country, city, e.reason
+            )
+            results[index] = {'error': str(e)}
+            continue
+
+        if action == ACTION_ACTIVATE:
+            activations[license_data['id']] = (license_key, normalized_hwid)
+            state[license_key] = (dict(license_data, status='used'), {'license_id': license_data['id'], 'hwid': normalized_hwid})
+        elif action == ACTION_MARK_USED:
+            mark_used.add(license_data['id'])
+        granted.append((index, license_key, normalized_hwid, app_id))
+
+    activated = _apply_activations(activations)
+    license_model.mark_licenses_used(mark_used)
+
+    for license_id in activated:
+        license_key, normalized_hwid = activations[license_id]
+        telemetry_writer.record_activation(license_id, client_ip, normalized_hwid, user_agent, country, city)
+
+    # Licenses activated concurrently by another request are re-checked against their actual binding
+    lost_keys = {activations[license_id][0] for license_id in activations if license_id not in activated}
+    fresh = license_model.get_licenses_for_validation(list(lost_keys)) if lost_keys else {}
+
+    for index, license_key, normalized_hwid, app_id in granted:
+        license_data, machine = state[license_key]
+        if license_key in lost_keys:
+            record = fresh.get(license_key)
+            if not record:
+                results[index] = {'error': "License not found."}
+                continue
+            license_data = record['license']
+            try:
+                if evaluate_license(license_data, record['machine'], normalized_hwid, app_id) == ACTION_ACTIVATE:
+                    results[index] = {'error': "License activation conflict. Please retry."}
+                    continue
+            except LicenseValidationError as e:
+                telemetry_writer.record_failed_attempt(
+                    license_data['app_id'], license_key, client_ip, normalized_hwid, user_agent, country, city, e.reason
+                )
+                results[index] = {'error': str(e)}
+                continue
+        results[index] = {'payload': _build_jwt_payload(license_data, normalized_hwid)}
+
+    return results
+
+def _apply_activations(activations):
+    """
+    Applies planned first activations (license_id -> (license_key, normalized_hwid))
+    in one statement. If the batch is rejected as a whole (e.g. a HWID already bound
+    to another license), falls back to one activation per license.
+    Returns the set of activated license IDs.
+    """
+    bindings = [(license_id, normalized_hwid) for license_id, (_, normalized_hwid) in activations.items()]
+    try:
+        return license_model.activate_licenses(bindings)
+    except Exception as e:
+        print(f"Error applying batch activations, retrying one by one: {e}")
+
+    activated = set()
+    for license_id, normalized_hwid in bindings:
+        try:
+            if license_model.activate_license(license_id, normalized_hwid) is not None:
+                activated.add(license_id)
+        except Exception:
+            pass
+    return activated
+
+def check_license_key_format(license_key, app_id=None):
+    """
+    Rejects license keys that cannot exist, without any I/O: keys that match no
+    key format, format 2 keys whose checksum is wrong, and keys of another format
+    than the claimed app's when that app is in the app registry.
+
+    Raises:
+        ValueError: If the key is malformed.
+    """
+    key_format = key_generator.key_format_of(license_key, Config.LICENSE_KEY_CHECKSUM_SECRET)
+    if key_format is None:
+        raise ValueError("Invalid license key format.")
+
+    if app_id:
+        _, app = app_registry.lookup(app_id)
+        if app and key_format != app.get('key_format', key_generator.KEY_FORMAT_PLAIN):
+            raise ValueError("Invalid license key format.")
+
+def refresh_license_request(payload):
+    """
+    Re-issues the payload of a token obtained from /api/v1/validate, without
+    querying the license or resolving the client location: the token signature
+    vouches for the license, and the in-memory revocation list for its status.
+
+    Args:
+        payload (dict): The JSON payload from the client (containing 'token', 'hwid').
+
+    Returns:
+        dict: A payload dictionary for JWT generation if the refresh succeeds.
+
+    Raises:
+        ValueError: If the token is invalid or expired, or the license no longer validates.
+    """
+    token = payload.get('token')
+    hwid = payload.get('hwid')
+    if not token or not hwid:
+        raise ValueError("Missing token or hwid.")
+
+    return evaluate_refresh(signing_keys.verify_token(token), hwid)
+
+def evaluate_refresh(claims, hwid):
+    """
+    Applies the refresh rules to the verified claims of a token.
+
+    Args:
+        claims (dict): The verified token payload, or None if verification failed.
+        hwid (str): The raw HWID of the requesting machine.
+
+    Returns:
+        dict: A payload dictionary for JWT generation.
+
+    Raises:
+        ValueError: If a rule fails.
+    """
+    if not claims or 'license_id' not in claims:
+        raise ValueError("Invalid or expired token.")
+
+    if claims.get('hwid') != hwid_parser.parse_hwid(hwid):
+        raise ValueError("HWID mismatch. License is bound to another machine.")
 
-    app_id = license_data['app_id']
+    if revocation_list.is_revoked(claims['license_id']):
+        raise ValueError("License is no longer valid.")
+
+    if claims.get('expires_at'):
+        expires_at = datetime.fromisoformat(claims['expires_at'])
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) > expires_at:
+            raise ValueError("La période d'essai de cette licence a expiré.")
+
+    return {
+        'license_id': claims['license_id'],
+        'app_id': claims['app_id'],
+        'type': claims.get('type'),
+        'expires_at': claims.get('expires_at'),
+        'hwid': claims['hwid']
+    }
+
+def evaluate_license(license_data, machine, normalized_hwid, app_id=None):
+    """
+    Applies the validation rules to a license and its bound machine, without any I/O.
+
+    Args:
+        license_data (dict): The license row.
+        machine (dict): The machine bound to the license, or None.
+        normalized_hwid (str): The hashed HWID of the requesting machine.
+        app_id (optional): The app ID claimed by the client.
+
+    Returns:
+        str: ACTION_GRANT, ACTION_ACTIVATE or ACTION_MARK_USED.
+
+    Raises:
+        LicenseValidationError: If a rule fails.
+    """
+    # Verify App ID
+    if app_id and str(license_data['app_id']) != str(app_id):
+        raise LicenseValidationError("License does not belong to this application.", "app_mismatch")
 
     # Check Expiration (for trial licenses)
     if license_data['type'] == 'trial':
@@ -78,49 +342,25 @@ def validate_license_request(payload, request_headers, client_ip):
         expiration_date = created_at + timedelta(days=license_data['duration_days'])
 
         if datetime.now(timezone.utc) > expiration_date:
-            tracking_model.log_failed_attempt(
-                app_id, license_key, client_ip, normalized_hwid, user_agent, country, city, "license_expired"
-            )
-            raise ValueError("La période d'essai de cette licence a expiré.")
+            raise LicenseValidationError("La période d'essai de cette licence a expiré.", "license_expired")
 
     # Check Status
     status = license_data['status']
 
     if status == 'active':
-        existing_machine = machine_model.get_machine_by_license_id(license_data['id'])
-
-        if existing_machine:
-            if existing_machine['hwid'] == normalized_hwid:
-                license_model.update_license_status(license_data['id'], 'used')
-                return _build_jwt_payload(license_data, normalized_hwid)
-            else:
-                tracking_model.log_failed_attempt(
-                    app_id, license_key, client_ip, normalized_hwid, user_agent, country, city, "hwid_mismatch"
-                )
-                raise ValueError("HWID mismatch. License is bound to another machine.")
-        else:
-            machine_model.add_machine(license_data['id'], normalized_hwid)
-            license_model.update_license_status(license_data['id'], 'used')
-            tracking_model.log_activation(
-                license_data['id'], client_ip, normalized_hwid, user_agent, country, city
-            )
-            return _build_jwt_payload(license_data, normalized_hwid)
+        if machine:
+            if machine['hwid'] == normalized_hwid:
+                return ACTION_MARK_USED
+            raise LicenseValidationError("HWID mismatch. License is bound to another machine.", "hwid_mismatch")
+        return ACTION_ACTIVATE
 
     elif status == 'used':
-        existing_machine = machine_model.get_machine_by_license_id(license_data['id'])
-        if existing_machine and existing_machine['hwid'] == normalized_hwid:
-             return _build_jwt_payload(license_data, normalized_hwid)
-        else:
-            tracking_model.log_failed_attempt(
-                app_id, license_key, client_ip, normalized_hwid, user_agent, country, city, "already_used_elsewhere"
-            )
-            raise ValueError("License is already used on another machine.")
+        if machine and machine['hwid'] == normalized_hwid:
+            return ACTION_GRANT
+        raise LicenseValidationError("License is already used on another machine.", "already_used_elsewhere")
 
     else:
-        tracking_model.log_failed_attempt(
-            app_id, license_key, client_ip, normalized_hwid, user_agent, country, city, f"license_{status}"
-        )
-        raise ValueError(f"License is {status}.")
+        raise LicenseValidationError(f"License is {status}.", f"license_{status}")
 
 def _build_jwt_payload(license_data, hwid):
     """
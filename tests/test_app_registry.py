@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import app_registry
+from services.app_service import register_app, rotate_app_secret
+
+class TestAppRegistry(unittest.TestCase):
+    def setUp(self):
+        app_registry.clear()
+        self.app = {'id': 1, 'name': 'App1', 'app_secret': 'secret-1', 'created_at': '2023-01-01'}
+
+    def tearDown(self):
+        app_registry.clear()
+
+    @patch('services.app_registry.app_model.get_app_by_id')
+    def test_lazy_fill(self, mock_get_app):
+        mock_get_app.return_value = self.app
+
+        self.assertEqual(app_registry.get_app_secret('1'), 'secret-1')
+        self.assertEqual(app_registry.get_app_secret(1), 'secret-1')
+        mock_get_app.assert_called_once_with(1)
+
+    @patch('services.app_registry.app_model.get_app_by_id')
+    def test_unknown_and_malformed_ids(self, mock_get_app):
+        mock_get_app.return_value = None
+
+        self.assertIsNone(app_registry.get_app(42))
+        self.assertIsNone(app_registry.get_app(42))
+        self.assertIsNone(app_registry.get_app('not-an-id'))
+        mock_get_app.assert_called_once_with(42)
+
+    @patch('services.app_registry.app_model.get_app_by_id')
+    @patch('services.app_registry.app_model.list_apps')
+    def test_preload(self, mock_list_apps, mock_get_app):
+        mock_list_apps.return_value = [self.app, {'id': 2, 'name': 'App2', 'app_secret': 'secret-2', 'created_at': '2023-01-02'}]
+
+        self.assertEqual(app_registry.preload(), 2)
+        self.assertEqual(app_registry.get_app_secret(2), 'secret-2')
+        mock_get_app.assert_not_called()
+
+    @patch('services.app_service.signing_keys.create_first_key')
+    @patch('services.app_service.signing_keys.rotate')
+    @patch('services.app_registry.app_model.get_app_by_id')
+    @patch('services.app_service.app_model.create_app')
+    @patch('services.app_service.app_model.update_app_secret')
+    def test_create_and_rotate_invalidate(self, mock_update_secret, mock_create_app, mock_get_app, mock_rotate_key, mock_first_key):
+        # An id first seen as unknown becomes visible once the app is created
+        mock_get_app.return_value = None
+        self.assertIsNone(app_registry.get_app(1))
+        mock_create_app.return_value = self.app
+        register_app('App1')
+        mock_get_app.return_value = self.app
+        self.assertEqual(app_registry.get_app_secret(1), 'secret-1')
+        mock_first_key.assert_called_once_with(1)
+
+        rotated = dict(self.app, app_secret='secret-rotated')
+        mock_update_secret.return_value = rotated
+        mock_get_app.return_value = rotated
+        rotate_app_secret(1)
+        self.assertEqual(app_registry.get_app_secret(1), 'secret-rotated')
+        mock_rotate_key.assert_called_once_with(1)
+
+    @patch('services.app_service.signing_keys.create_first_key')
+    @patch('services.app_service.Config')
+    @patch('services.app_service.app_model.create_app')
+    def test_checksum_format_needs_secret(self, mock_create_app, mock_config, mock_first_key):
+        mock_config.LICENSE_KEY_FORMAT = 2
+        mock_config.LICENSE_KEY_CHECKSUM_SECRET = ''
+        register_app('App1')
+        self.assertEqual(mock_create_app.call_args[0][2], 1)
+
+        mock_config.LICENSE_KEY_CHECKSUM_SECRET = 'secret'
+        register_app('App2')
+        self.assertEqual(mock_create_app.call_args[0][2], 2)
+
+    @patch('services.app_service.app_model.update_app_secret')
+    def test_rotate_unknown_app(self, mock_update_secret):
+        mock_update_secret.return_value = None
+        with self.assertRaises(ValueError):
+            rotate_app_secret(99)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import app_stats_model
+from migrations import v001_initial_schema
+from services import stats_service
+
+class TestReconcile(unittest.TestCase):
+    def _mock_cursor(self, mock_get_db_cursor, stored, actual):
+        cursor = MagicMock()
+        cursor.fetchone.side_effect = [stored, actual]
+        mock_get_db_cursor.return_value.__enter__.return_value = cursor
+        return cursor
+
+    @patch('models.app_stats_model.get_db_cursor')
+    def test_drift_is_corrected(self, mock_get_db_cursor):
+        stored = (10, 5, 5, 0, 0, 0, 10, 5, 100)
+        actual = (11, 5, 6, 0, 0, 0, 11, 6, 100)
+        cursor = self._mock_cursor(mock_get_db_cursor, stored, actual)
+
+        drift = app_stats_model.reconcile_app(3)
+
+        self.assertEqual(drift, {'licenses': (10, 11), 'licenses_used': (5, 6), 'licenses_lifetime': (10, 11), 'activations': (5, 6)})
+        # The row is locked before counting, then overwritten with the recount
+        queries = [c[0][0] for c in cursor.execute.call_args_list]
+        self.assertIn("FOR UPDATE", queries[1])
+        self.assertTrue(queries[3].startswith("UPDATE app_stats SET licenses = %s"))
+        self.assertEqual(cursor.execute.call_args_list[3][0][1], actual + (3,))
+
+    @patch('models.app_stats_model.get_db_cursor')
+    def test_no_drift_no_update(self, mock_get_db_cursor):
+        counters = (1, 1, 0, 0, 0, 1, 0, 0, 7)
+        cursor = self._mock_cursor(mock_get_db_cursor, counters, counters)
+
+        self.assertEqual(app_stats_model.reconcile_app(3), {})
+        self.assertEqual(cursor.execute.call_count, 3)
+
+    @patch('services.stats_service.app_stats_model.reconcile_app')
+    @patch('services.stats_service.app_stats_model.list_app_ids')
+    def test_reconcile_every_app(self, mock_list_app_ids, mock_reconcile_app):
+        mock_list_app_ids.return_value = [1, 2]
+        mock_reconcile_app.side_effect = [{}, {'activations': (5, 6)}]
+
+        self.assertEqual(stats_service.reconcile(), {2: {'activations': (5, 6)}})
+
+class TestDashboardStats(unittest.TestCase):
+    @patch('services.stats_service.app_stats_model.get_totals')
+    def test_active_licenses_include_used(self, mock_get_totals):
+        mock_get_totals.return_value = dict.fromkeys(app_stats_model.COUNTERS, 0)
+        mock_get_totals.return_value.update(licenses=10, licenses_active=3, licenses_used=4, failed_attempts=9)
+
+        self.assertEqual(stats_service.get_dashboard_stats(2), {
+            'total_apps': 2, 'total_licenses': 10, 'active_licenses': 7, 'failed_attempts': 9
+        })
+
+class TestAppStatsTriggers(unittest.TestCase):
+    def test_statement_level_triggers(self):
+        cursor = MagicMock()
+        v001_initial_schema._create_app_stats_triggers(cursor)
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        triggers = [s for s in statements if 'CREATE TRIGGER' in s]
+
+        # Inserts and deletes of the three tables, and license updates
+        self.assertEqual(len(triggers), 7)
+        self.assertTrue(all('FOR EACH STATEMENT' in s and 'REFERENCING' in s for s in triggers))
+
+        # Every counter maintained by a trigger function is one the model reads
+        functions = [s for s in statements if 'CREATE OR REPLACE FUNCTION' in s]
+        for name in app_stats_model.COUNTERS:
+            self.assertTrue(any(f"{name} = app_stats.{name} + EXCLUDED.{name}" in s for s in functions), name)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch, AsyncMock
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asgi
+from services import app_registry
+from services.async_validation_service import validate_license_request
+
+def _record(status, machine=None):
+    return {
+        'license': {
+            'id': 10,
+            'app_id': 1,
+            'license_key': 'TEST-KEY0-1234-ABCD',
+            'status': status,
+            'type': 'lifetime',
+            'created_at': '2023-01-01',
+            'duration_days': None
+        },
+        'machine': machine
+    }
+
+@patch('services.async_validation_service.telemetry_writer.record_failed_attempt')
+@patch('services.async_validation_service.telemetry_writer.record_activation')
+@patch('services.async_validation_service.async_app_model.get_app_by_id', new_callable=AsyncMock)
+@patch('services.async_validation_service.async_license_model.update_license_status', new_callable=AsyncMock)
+@patch('services.async_validation_service.async_license_model.activate_license', new_callable=AsyncMock)
+@patch('services.async_validation_service.async_license_model.get_license_for_validation', new_callable=AsyncMock)
+@patch('services.async_validation_service.hwid_parser.parse_hwid', return_value='normalized-hwid')
+class TestAsyncValidationService(unittest.TestCase):
+    def setUp(self):
+        app_registry.clear()
+        self.payload = {'license_key': 'TEST-KEY0-1234-ABCD', 'hwid': 'hwid-1234', 'app_id': 1}
+        self.headers = {'User-Agent': 'TestAgent'}
+        self.ip = '127.0.0.1'
+
+    def tearDown(self):
+        app_registry.clear()
+
+    def test_first_activation(self, mock_parse_hwid, mock_get_record, mock_activate, mock_update, mock_get_app, mock_record_act, mock_record_fail):
+        mock_get_record.return_value = _record('active')
+        mock_activate.return_value = 99
+        mock_get_app.return_value = {'id': 1, 'name': 'App', 'app_secret': 'secret'}
+
+        result = asyncio.run(validate_license_request(self.payload, self.headers, self.ip))
+
+        self.assertEqual(result['license_id'], 10)
+        mock_activate.assert_awaited_once_with(10, 'normalized-hwid')
+        mock_record_act.assert_called_once_with(10, self.ip, 'normalized-hwid', 'TestAgent', None, None)
+        mock_update.assert_not_awaited()
+        # The claimed app was looked up alongside the license and is now in the registry
+        self.assertEqual(app_registry.lookup(1), (True, mock_get_app.return_value))
+
+    def test_lost_activation_race_is_rechecked(self, mock_parse_hwid, mock_get_record, mock_activate, mock_update, mock_get_app, mock_record_act, mock_record_fail):
+        mock_get_record.side_effect = [_record('active'), _record('used', {'hwid': 'other-hwid'})]
+        mock_activate.return_value = None
+        mock_get_app.return_value = {'id': 1, 'name': 'App', 'app_secret': 'secret'}
+
+        with self.assertRaises(ValueError) as context:
+            asyncio.run(validate_license_request(self.payload, self.headers, self.ip))
+
+        self.assertEqual(str(context.exception), "License is already used on another machine.")
+        mock_record_act.assert_not_called()
+        self.assertEqual(mock_record_fail.call_args[0][7], 'already_used_elsewhere')
+
+    def test_unknown_license_of_unknown_app_is_not_logged(self, mock_parse_hwid, mock_get_record, mock_activate, mock_update, mock_get_app, mock_record_act, mock_record_fail):
+        mock_get_record.return_value = None
+        mock_get_app.return_value = None
+
+        with self.assertRaises(ValueError):
+            asyncio.run(validate_license_request(self.payload, self.headers, self.ip))
+
+        mock_record_fail.assert_not_called()
+        self.assertEqual(app_registry.lookup(1), (True, None))
+
+class TestAsgiApp(unittest.TestCase):
+    def _call(self, method, path, body=b'', headers=None):
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'headers': headers or [],
+            'client': ('203.0.113.7', 51000)
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(asgi.app(scope, receive, send))
+        return sent[0]['status'], json.loads(sent[1]['body'])
+
+    @patch('asgi.sign_token', new_callable=AsyncMock)
+    @patch('asgi.validate_license_request', new_callable=AsyncMock)
+    def test_validate_returns_token(self, mock_validate, mock_sign_token):
+        mock_validate.return_value = {'license_id': 10, 'app_id': 1, 'type': 'lifetime', 'expires_at': None, 'hwid': 'h'}
+        mock_sign_token.return_value = 'signed-token'
+
+        status, data = self._call('POST', '/api/v1/validate', b'{"license_key": "K", "hwid": "H"}',
+                                  [(b'user-agent', b'TestAgent'), (b'x-forwarded-for', b'198.51.100.1, 10.0.0.1')])
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data, {'token': 'signed-token'})
+        # Without trusted proxies, X-Forwarded-For is the client's word: the peer address is used
+        mock_validate.assert_awaited_once_with({'license_key': 'K', 'hwid': 'H'}, {'User-Agent': 'TestAgent'}, '203.0.113.7')
+
+    @patch('asgi.validate_license_request', new_callable=AsyncMock)
+    def test_validation_error_is_forbidden(self, mock_validate):
+        mock_validate.side_effect = ValueError("License is revoked.")
+
+        status, data = self._call('POST', '/api/v1/license/validate', b'{"license_key": "K", "hwid": "H"}')
+
+        self.assertEqual(status, 403)
+        self.assertEqual(data, {'error': 'License is revoked.'})
+
+    def test_invalid_requests(self):
+        self.assertEqual(self._call('POST', '/api/v1/validate', b'not json')[0], 400)
+        self.assertEqual(self._call('GET', '/api/v1/validate')[0], 405)
+        self.assertEqual(self._call('POST', '/admin')[0], 404)
+        self.assertEqual(self._call('POST', '/api/v1/validate', b'x' * (asgi.MAX_BODY_SIZE + 1))[0], 413)
+
+if __name__ == '__main__':
+    unittest.main()
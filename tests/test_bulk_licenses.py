@@ -0,0 +1,124 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from flask import Flask
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import Config
+from routes.admin_routes import admin_bp
+from services.license_service import generate_licenses_bulk
+
+CREATED_AT = datetime(2024, 1, 1, 12, 0)
+
+def _insert_all(app_id, keys, license_type, duration_days):
+    return [(i, key, CREATED_AT) for i, key in enumerate(keys)]
+
+@patch.object(Config, 'BULK_LICENSE_CHUNK_SIZE', 4)
+@patch('services.license_service.app_registry.get_app', return_value={'id': 1, 'name': 'App', 'app_secret': 's'})
+@patch('services.license_service.license_model.create_licenses')
+class TestBulkLicenseGeneration(unittest.TestCase):
+    def test_chunks_of_unique_keys(self, mock_create, mock_get_app):
+        mock_create.side_effect = _insert_all
+
+        chunks = list(generate_licenses_bulk('1', 'trial', 30, 10))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+        keys = [row[1] for chunk in chunks for row in chunk]
+        self.assertEqual(len(set(keys)), 10)
+        # One multi-row insert per chunk, for the normalized app id
+        self.assertEqual(mock_create.call_count, 3)
+        self.assertEqual(mock_create.call_args_list[0][0][0], 1)
+        self.assertEqual(mock_create.call_args_list[0][0][2:], ('trial', 30))
+
+    def test_conflicting_keys_are_redrawn(self, mock_create, mock_get_app):
+        # The first insert skips one key that already exists
+        mock_create.side_effect = [_insert_all(1, ['A', 'B', 'C'], 'lifetime', None), _insert_all(1, ['D'], 'lifetime', None)]
+
+        chunk = next(generate_licenses_bulk(1, 'lifetime', None, 4))
+
+        self.assertEqual(len(chunk), 4)
+        self.assertEqual(len(mock_create.call_args_list[0][0][1]), 4)
+        self.assertEqual(len(mock_create.call_args_list[1][0][1]), 1)
+
+    def test_invalid_requests_fail_before_any_insert(self, mock_create, mock_get_app):
+        for args in (('1', 'trial', None, 10), ('1', 'lifetime', None, 0), ('1', 'lifetime', None, Config.BULK_LICENSE_MAX_COUNT + 1)):
+            with self.assertRaises(ValueError):
+                generate_licenses_bulk(*args)
+
+        mock_get_app.return_value = None
+        with self.assertRaises(ValueError):
+            generate_licenses_bulk('99', 'lifetime', None, 10)
+        mock_create.assert_not_called()
+
+class TestBulkLicenseRoute(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__, template_folder='../templates')
+        self.app.secret_key = 'test_secret'
+        self.app.register_blueprint(admin_bp)
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['admin_id'] = 1
+
+    @patch('routes.admin_routes.generate_licenses_bulk')
+    def test_streams_csv(self, mock_generate):
+        mock_generate.return_value = iter([[(1, 'AAAA-AAAA-AAAA-AAAA', CREATED_AT)], [(2, 'BBBB-BBBB-BBBB-BBBB', CREATED_AT)]])
+
+        response = self.client.post('/licenses/generate/bulk', data={'app_id': '1', 'type': 'lifetime', 'count': '2'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        self.assertEqual(response.get_data(as_text=True).splitlines(), [
+            'license_id,license_key,created_at',
+            '1,AAAA-AAAA-AAAA-AAAA,2024-01-01T12:00:00',
+            '2,BBBB-BBBB-BBBB-BBBB,2024-01-01T12:00:00'
+        ])
+        mock_generate.assert_called_once_with('1', 'lifetime', None, 2)
+
+    @patch('routes.admin_routes.generate_licenses_bulk')
+    def test_failure_mid_stream_ends_with_error_row(self, mock_generate):
+        def chunks():
+            yield [(1, 'AAAA-AAAA-AAAA-AAAA', CREATED_AT)]
+            raise RuntimeError("connection lost")
+        mock_generate.return_value = chunks()
+
+        response = self.client.post('/licenses/generate/bulk', data={'app_id': '1', 'type': 'lifetime', 'count': '2'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(as_text=True).splitlines(), [
+            'license_id,license_key,created_at',
+            '1,AAAA-AAAA-AAAA-AAAA,2024-01-01T12:00:00',
+            '# ERROR: generated 1 of 2'
+        ])
+
+    @patch('routes.admin_routes.generate_licenses_bulk')
+    def test_client_disconnect_finishes_the_batch(self, mock_generate):
+        created = []
+        def chunks():
+            for i in range(3):
+                created.append(i)
+                yield [(i, 'AAAA-AAAA-AAAA-AAAA', CREATED_AT)]
+        mock_generate.return_value = chunks()
+
+        response = self.client.post('/licenses/generate/bulk', data={'app_id': '1', 'type': 'lifetime', 'count': '3'}, buffered=False)
+        body = iter(response.response)
+        next(body)
+        next(body)
+        response.close()
+
+        self.assertEqual(created, [0, 1, 2])
+
+    @patch('routes.admin_routes.generate_licenses_bulk')
+    def test_invalid_request_redirects(self, mock_generate):
+        mock_generate.side_effect = ValueError("App not found")
+
+        response = self.client.post('/licenses/generate/bulk', data={'app_id': '9', 'type': 'lifetime', 'count': '2'})
+
+        self.assertEqual(response.status_code, 302)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2 import extensions, pool
+from config.connection_pool import ConnectionPool, PoolTimeout
+from config.database import Database
+from config.prepared_statements import PreparingConnection
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.rollbacks = 0
+        self.info = MagicMock(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+        if self.broken:
+            cursor.execute.side_effect = Exception("server closed the connection unexpectedly")
+        return cursor
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.opened = []
+
+    def _connect(self):
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+    def _pool(self, **kwargs):
+        options = {'min_size': 1, 'max_size': 2, 'acquire_timeout': 0.05, 'max_lifetime': 3600,
+                   'max_idle': 300, 'health_check_after': 30, 'clock': self.clock}
+        options.update(kwargs)
+        return ConnectionPool(self._connect, **options)
+
+    def test_opens_min_size_and_reuses_last_released(self):
+        connection_pool = self._pool(min_size=1, max_size=3)
+        self.assertEqual(len(self.opened), 1)
+
+        first = connection_pool.acquire()
+        second = connection_pool.acquire()
+        connection_pool.release(first)
+        connection_pool.release(second)
+
+        self.assertIs(connection_pool.acquire(), second)
+        stats = connection_pool.stats()
+        self.assertEqual((stats['in_use'], stats['idle'], stats['opened']), (1, 1, 2))
+        self.assertEqual(stats['acquires'], 3)
+
+    def test_exhausted_pool_times_out(self):
+        connection_pool = self._pool(max_size=1, clock=time.monotonic)
+        connection_pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            connection_pool.acquire(timeout=0.01)
+        self.assertIsInstance(PoolTimeout(), pool.PoolError)
+        self.assertEqual(connection_pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_released_connection(self):
+        connection_pool = self._pool(max_size=1, acquire_timeout=5, clock=time.monotonic)
+        conn = connection_pool.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(connection_pool.acquire()))
+        waiter.start()
+        while connection_pool.stats()['waiting'] == 0:
+            threading.Event().wait(0.001)
+
+        connection_pool.release(conn)
+        waiter.join(2)
+
+        self.assertEqual(acquired, [conn])
+        stats = connection_pool.stats()
+        self.assertEqual((stats['waiting'], stats['waits']), (0, 1))
+        self.assertGreater(stats['acquire_ms_max'], 0)
+
+    def test_release_rolls_back_open_transaction(self):
+        connection_pool = self._pool()
+        conn = connection_pool.acquire()
+        conn.info.transaction_status = extensions.TRANSACTION_STATUS_INERROR
+
+        connection_pool.release(conn)
+
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertIs(connection_pool.acquire(), conn)
+
+    def test_release_unknown_connection(self):
+        with self.assertRaises(pool.PoolError):
+            self._pool().release(FakeConnection())
+
+    def test_health_check_replaces_broken_connection(self):
+        connection_pool = self._pool()
+        conn = connection_pool.acquire()
+        connection_pool.release(conn)
+        conn.broken = True
+
+        # Recently released: handed out without a check
+        self.assertIs(connection_pool.acquire(), conn)
+        connection_pool.release(conn)
+
+        self.clock.now += 31
+        replacement = connection_pool.acquire()
+
+        self.assertIsNot(replacement, conn)
+        self.assertTrue(conn.closed)
+        stats = connection_pool.stats()
+        self.assertEqual((stats['health_check_failures'], stats['recycled']), (1, 1))
+
+    def test_expired_connection_is_replaced(self):
+        connection_pool = self._pool(max_lifetime=600)
+        conn = connection_pool.acquire()
+        self.clock.now += 601
+
+        connection_pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(connection_pool.stats()['idle'], 0)
+        self.assertIsNot(connection_pool.acquire(), conn)
+
+    def test_idle_connections_beyond_min_size_are_closed(self):
+        connection_pool = self._pool(min_size=1, max_size=3, max_idle=300)
+        first, second, third = connection_pool.acquire(), connection_pool.acquire(), connection_pool.acquire()
+        connection_pool.release(first)
+        connection_pool.release(second)
+        self.clock.now += 301
+
+        connection_pool.release(third)
+
+        # The two long idle ones go, as the pool stays above min_size
+        self.assertTrue(first.closed and second.closed)
+        self.assertFalse(third.closed)
+        self.assertEqual(connection_pool.stats()['idle'], 1)
+
+    def test_failed_connect_frees_its_place(self):
+        connection_pool = self._pool(min_size=0, max_size=1)
+        with patch.object(connection_pool, '_connect', side_effect=Exception("connection refused")):
+            with self.assertRaises(Exception):
+                connection_pool.acquire()
+
+        self.assertIsNotNone(connection_pool.acquire())
+
+    def test_close(self):
+        connection_pool = self._pool(min_size=2)
+        conn = connection_pool.acquire()
+
+        connection_pool.close()
+
+        self.assertTrue(self.opened[0].closed)
+        with self.assertRaises(pool.PoolError):
+            connection_pool.acquire()
+        connection_pool.release(conn)
+        self.assertTrue(conn.closed)
+
+    def test_invalid_sizes(self):
+        with self.assertRaises(ValueError):
+            self._pool(min_size=3, max_size=2)
+
+class TestDatabasePool(unittest.TestCase):
+    def tearDown(self):
+        Database._pool = None
+
+    @patch('config.database.Config')
+    @patch('config.database.psycopg2.connect')
+    def test_pool_settings_and_statement_timeout(self, mock_connect, mock_config):
+        mock_config.DATABASE_URL = 'postgresql://localhost/keypilot'
+        mock_config.DB_POOL_MIN = 2
+        mock_config.DB_POOL_MAX = 7
+        mock_config.DB_POOL_ACQUIRE_TIMEOUT = 1.5
+        mock_config.DB_STATEMENT_TIMEOUT = '15s'
+        mock_config.DB_REPLICA_URLS = []
+        Database._pool = None
+
+        Database.initialize()
+
+        self.assertEqual(mock_connect.call_count, 2)
+        mock_connect.assert_called_with(dsn='postgresql://localhost/keypilot', options='-c statement_timeout=15s',
+                                        connection_factory=PreparingConnection)
+        stats = Database.stats()
+        self.assertEqual((stats['min_size'], stats['max_size']), (2, 7))
+        self.assertEqual(Database._pool.acquire_timeout, 1.5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,15 +18,22 @@ class TestDashboard(unittest.TestCase):
         self.app.register_blueprint(auth_bp)
         self.client = self.app.test_client()
 
+    @patch('services.stats_service.app_stats_model.get_totals')
     @patch('routes.admin_routes.get_activations')
     @patch('routes.admin_routes.list_apps')
-    def test_dashboard_route(self, mock_list_apps, mock_get_activations):
+    def test_dashboard_route(self, mock_list_apps, mock_get_activations, mock_get_totals):
         # Mock apps data
         mock_list_apps.return_value = [
             {'id': 1, 'name': 'App1', 'app_secret': 'secret123456789', 'created_at': '2023-01-01'},
             {'id': 2, 'name': 'App2', 'app_secret': 'secret987654321', 'created_at': '2023-01-02'}
         ]
 
+        # Mock the per-app counters
+        mock_get_totals.return_value = {
+            'licenses': 1234, 'licenses_active': 300, 'licenses_used': 700, 'licenses_revoked': 234,
+            'licenses_expired': 0, 'licenses_trial': 34, 'licenses_lifetime': 1200, 'activations': 700, 'failed_attempts': 4321
+        }
+
         # Mock activations data
         mock_get_activations.return_value = [
             {'app_name': 'App1', 'license_key': 'KEY-1234', 'ip_address': '127.0.0.1', 'activated_at': '2023-01-03'},
@@ -50,8 +57,11 @@ class TestDashboard(unittest.TestCase):
         # Check if new section is present
         self.assertIn(b'Derni\xc3\xa8res Licences Activ\xc3\xa9es', response.data) # Dernières Licences Activées in utf-8
 
-        # Check if stats are rendered (N/A for now as per backend)
-        self.assertIn(b'N/A', response.data)
+        # Check if stats are rendered from the counters (active = active + used)
+        self.assertIn(b'1234', response.data)
+        self.assertIn(b'1000', response.data)
+        self.assertIn(b'4321', response.data)
+        mock_get_activations.assert_called_once_with(limit=5)
 
         # Check if apps are listed
         self.assertIn(b'App1', response.data)
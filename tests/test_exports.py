@@ -0,0 +1,102 @@
+import json
+import unittest
+from contextlib import contextmanager
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from flask import Flask
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import tracking_model
+from routes.admin_routes import admin_bp
+
+AT = datetime(2024, 1, 1, 12, 0)
+
+class TestExportQueries(unittest.TestCase):
+    def _server_cursor(self, pages):
+        cursor = MagicMock()
+        cursor.fetchmany.side_effect = pages + [[]]
+
+        @contextmanager
+        def server_cursor(name, itersize, readonly=False):
+            self.assertEqual(itersize, 2)
+            self.assertTrue(readonly)
+            yield cursor
+        return cursor, server_cursor
+
+    def test_streams_chunks_with_filters(self):
+        pages = [[(1,), (2,)], [(3,)]]
+        cursor, server_cursor = self._server_cursor(pages)
+
+        with patch('models.tracking_model.get_db_server_cursor', server_cursor):
+            chunks = tracking_model.iter_failed_attempts(app_id=7, since=AT, chunk_size=2)
+            cursor.execute.assert_not_called()  # Nothing runs until the export is consumed
+            self.assertEqual(list(chunks), pages)
+
+        query, params = cursor.execute.call_args[0]
+        self.assertIn("WHERE f.app_id = %s AND f.attempted_at >= %s", query)
+        self.assertTrue(query.rstrip().endswith("ORDER BY f.id"))
+        self.assertEqual(params, (7, AT))
+
+    def test_no_filters(self):
+        cursor, server_cursor = self._server_cursor([])
+
+        with patch('models.tracking_model.get_db_server_cursor', server_cursor):
+            self.assertEqual(list(tracking_model.iter_activations(chunk_size=2)), [])
+
+        query, params = cursor.execute.call_args[0]
+        self.assertNotIn("WHERE", query)
+        self.assertEqual(params, ())
+
+class TestExportRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__, template_folder='../templates')
+        self.app.secret_key = 'test_secret'
+        self.app.register_blueprint(admin_bp)
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['admin_id'] = 1
+
+    def _activation(self, activation_id):
+        return (activation_id, 10, 'AAAA-AAAA-AAAA-AAAA', 'lifetime', 1, 'App', '1.2.3.4', 'mac', 'UA', 'FR', 'Paris', AT)
+
+    @patch('routes.admin_routes.iter_activations')
+    def test_csv(self, mock_iter):
+        mock_iter.return_value = iter([[self._activation(1)], [self._activation(2)]])
+
+        response = self.client.get('/activations/export?app_id=1&since=2024-01-01&until=2024-02-01')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('activations-app1.csv', response.headers['Content-Disposition'])
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[0], ','.join(tracking_model.ACTIVATION_EXPORT_COLUMNS))
+        self.assertEqual(lines[1], '1,10,AAAA-AAAA-AAAA-AAAA,lifetime,1,App,1.2.3.4,mac,UA,FR,Paris,2024-01-01T12:00:00')
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(mock_iter.call_args[0][:3], (1, datetime(2024, 1, 1), datetime(2024, 2, 1)))
+
+    @patch('routes.admin_routes.iter_failed_attempts')
+    def test_ndjson(self, mock_iter):
+        mock_iter.return_value = iter([[(5, 1, 'App', 'ZZZZ-ZZZZ-ZZZZ-ZZZZ', '1.2.3.4', None, 'UA', None, None, 'license_not_found', AT)]])
+
+        response = self.client.get('/attempts/export?format=ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(rows[0]['attempted_key'], 'ZZZZ-ZZZZ-ZZZZ-ZZZZ')
+        self.assertEqual(rows[0]['attempted_at'], '2024-01-01T12:00:00')
+        self.assertEqual(mock_iter.call_args[0][:3], (None, None, None))
+
+    @patch('routes.admin_routes.iter_activations')
+    def test_invalid_filters(self, mock_iter):
+        for query in ('format=xml', 'since=yesterday', 'app_id=abc'):
+            response = self.client.get(f'/activations/export?{query}')
+            self.assertEqual(response.status_code, 302)
+        mock_iter.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from unittest.mock import patch
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.geolocation import IpApiResolver, GeoEnrichmentPipeline
+
+class _StubGeoHandler(BaseHTTPRequestHandler):
+    """Answers like ip-api.com for 203.0.113.7 and fails for every other IP."""
+    def do_GET(self):
+        ip_address = self.path.rsplit('/', 1)[-1]
+        if ip_address == '203.0.113.7':
+            body = {'status': 'success', 'country': 'France', 'city': 'Paris'}
+        else:
+            body = {'status': 'fail', 'message': 'private range'}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestGeolocation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), _StubGeoHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}/json"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_resolver_against_stub_server(self):
+        resolver = IpApiResolver(base_url=self.base_url, timeout=1)
+        self.assertEqual(resolver.resolve('203.0.113.7'), ('France', 'Paris'))
+        self.assertIsNone(resolver.resolve('10.0.0.1'))
+
+    def test_resolver_unreachable_returns_none(self):
+        resolver = IpApiResolver(base_url='http://127.0.0.1:9/json', timeout=0.5)
+        self.assertIsNone(resolver.resolve('203.0.113.7'))
+
+    @patch('services.geolocation.tracking_model.apply_geolocation')
+    def test_pipeline_fills_pending_rows(self, mock_apply):
+        pipeline = GeoEnrichmentPipeline(IpApiResolver(base_url=self.base_url, timeout=1), workers=2)
+
+        self.assertTrue(pipeline.submit('203.0.113.7'))
+        self.assertTrue(pipeline.submit('10.0.0.1'))
+        pipeline.join()
+
+        mock_apply.assert_any_call('203.0.113.7', 'France', 'Paris')
+        # Unresolvable IPs are marked Unknown so they do not stay pending forever
+        mock_apply.assert_any_call('10.0.0.1', 'Unknown', 'Unknown')
+
+    @patch('services.geolocation.tracking_model.apply_geolocation')
+    def test_pipeline_drops_when_queue_full(self, mock_apply):
+        blocker = threading.Event()
+
+        class _SlowResolver:
+            def resolve(self, ip_address):
+                blocker.wait(5)
+                return None
+
+        pipeline = GeoEnrichmentPipeline(_SlowResolver(), workers=1, queue_size=1)
+        pipeline.submit('198.51.100.1')  # Picked up by the worker
+        # Fill the queue while the worker is busy
+        accepted = [pipeline.submit(f"198.51.100.{i}") for i in range(2, 6)]
+        blocker.set()
+        pipeline.join()
+
+        self.assertIn(False, accepted)
+        self.assertGreater(pipeline.dropped, 0)
+
+    @patch('services.geolocation.tracking_model.apply_geolocation')
+    def test_ip_submitted_during_lookup_is_queued_again(self, mock_apply):
+        looking_up = threading.Event()
+        blocker = threading.Event()
+
+        class _SlowResolver:
+            def resolve(self, ip_address):
+                looking_up.set()
+                blocker.wait(5)
+                return ('France', 'Paris')
+
+        pipeline = GeoEnrichmentPipeline(_SlowResolver(), workers=1, sweep_interval=0)
+        pipeline.submit('198.51.100.1')
+        looking_up.wait(5)
+        # New rows of the IP are committed while it is being resolved
+        self.assertTrue(pipeline.submit('198.51.100.1'))
+        blocker.set()
+        pipeline.join()
+
+        self.assertEqual(mock_apply.call_count, 2)
+
+    @patch('services.geolocation.tracking_model.get_pending_geolocation_ips')
+    def test_sweep_requeues_pending_rows(self, mock_pending):
+        pipeline = GeoEnrichmentPipeline(IpApiResolver(base_url=self.base_url), workers=1, queue_size=3, sweep_interval=0)
+        pipeline._pending.add('198.51.100.1')
+        pipeline._queue.put_nowait('198.51.100.1')
+        mock_pending.return_value = ['198.51.100.1', '198.51.100.2', '198.51.100.3', '198.51.100.4']
+
+        self.assertEqual(pipeline.sweep(), 2)
+
+        # Only as many IPs as the queue has room for are asked for
+        mock_pending.assert_called_once_with(2)
+        self.assertEqual(pipeline._queue.qsize(), 3)
+        self.assertEqual(pipeline.stats()['swept'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from routes.admin_routes import admin_bp
+from routes.api_routes import api_bp
+from routes.auth_routes import auth_bp
+from services import ip_filter
+from services.ip_filter import IpFilter
+
+RULES = [('10.0.0.0/8', 'block'), ('10.1.0.0/16', 'allow'), ('2001:db8::/32', 'block')]
+
+@patch('services.ip_filter.ip_rule_model')
+class TestIpFilter(unittest.TestCase):
+    def test_allow_inside_block(self, mock_model):
+        mock_model.list_active_rules.return_value = RULES
+        ip_filter_ = IpFilter(refresh_interval=60)
+
+        self.assertFalse(ip_filter_.is_blocked('10.2.0.1'))  # Not loaded yet
+        self.assertEqual(ip_filter_.load(), 3)
+
+        self.assertTrue(ip_filter_.is_blocked('10.2.0.1'))
+        self.assertFalse(ip_filter_.is_blocked('10.1.9.9'))
+        self.assertTrue(ip_filter_.is_blocked('2001:db8::1'))
+        self.assertFalse(ip_filter_.is_blocked('192.0.2.1'))
+        self.assertFalse(ip_filter_.is_blocked(None))
+        self.assertEqual(ip_filter_.stats()['blocked'], 2)
+
+    def test_promote_skips_covered_and_malformed_ips(self, mock_model):
+        mock_model.list_active_rules.return_value = RULES
+        mock_model.get_frequent_failed_ips.return_value = [
+            ('198.51.100.7', 120), ('10.1.2.3', 500), ('10.9.9.9', 300), ('garbage', 999), ('2001:db9::1', 100)
+        ]
+        mock_model.add_auto_blocks.return_value = 2
+        ip_filter_ = IpFilter(refresh_interval=60, autoblock_threshold=100, autoblock_window=10, autoblock_minutes=1440)
+        ip_filter_.load()
+
+        self.assertEqual(ip_filter_.promote(), 2)
+
+        mock_model.get_frequent_failed_ips.assert_called_once_with(10, 100)
+        networks, _, minutes = mock_model.add_auto_blocks.call_args[0]
+        # 10.1.2.3 is allowed and 10.9.9.9 already blocked
+        self.assertEqual(networks, ['198.51.100.7/32', '2001:db9::1/128'])
+        self.assertEqual(minutes, 1440)
+        # New rules are loaded at once
+        self.assertEqual(mock_model.list_active_rules.call_count, 2)
+
+    def test_promote_never_blocks_proxies(self, mock_model):
+        mock_model.list_active_rules.return_value = []
+        mock_model.get_frequent_failed_ips.return_value = [('10.0.0.5', 5000), ('198.51.100.7', 120)]
+        mock_model.add_auto_blocks.return_value = 1
+        ip_filter_ = IpFilter(refresh_interval=60, autoblock_threshold=100, proxy_networks=['10.0.0.0/24'])
+        ip_filter_.load()
+
+        ip_filter_.promote()
+
+        self.assertEqual(mock_model.add_auto_blocks.call_args[0][0], ['198.51.100.7/32'])
+
+    def test_save_rule_normalizes_network(self, mock_model):
+        mock_model.ACTIONS = ('allow', 'block')
+        with patch('services.ip_filter.reload') as mock_reload:
+            self.assertEqual(ip_filter.save_rule(' 203.0.113.9/24 ', 'block', ''), '203.0.113.0/24')
+            self.assertEqual(ip_filter.save_rule('2001:db8::1', 'allow'), '2001:db8::1/128')
+
+        mock_model.save_rule.assert_any_call('203.0.113.0/24', 'block', None)
+        self.assertEqual(mock_reload.call_count, 2)
+
+    def test_save_rule_rejects_invalid_input(self, mock_model):
+        mock_model.ACTIONS = ('allow', 'block')
+        with self.assertRaises(ValueError):
+            ip_filter.save_rule('10.0.0.0/33', 'block')
+        with self.assertRaises(ValueError):
+            ip_filter.save_rule('10.0.0.0/8', 'drop')
+        mock_model.save_rule.assert_not_called()
+
+class TestIpFilterRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__, template_folder='../templates')
+        self.app.secret_key = 'test_secret'
+        self.app.register_blueprint(api_bp)
+        self.app.register_blueprint(admin_bp)
+        self.app.register_blueprint(auth_bp)
+        self.client = self.app.test_client()
+
+    @patch('routes.api_routes.validate_license_request')
+    @patch('routes.api_routes.rate_limiter.admit')
+    @patch('routes.api_routes.ip_filter.is_blocked', return_value=True)
+    def test_blocked_ip_is_refused_before_validation(self, mock_is_blocked, mock_admit, mock_validate):
+        response = self.client.post('/api/v1/validate', json={'license_key': 'K', 'hwid': 'H'},
+                                    environ_base={'REMOTE_ADDR': '203.0.113.9'})
+
+        self.assertEqual(response.status_code, 403)
+        mock_is_blocked.assert_called_once_with('203.0.113.9')
+        mock_admit.assert_not_called()
+        mock_validate.assert_not_called()
+
+    @patch('routes.api_routes.validate_license_request')
+    @patch('routes.api_routes.rate_limiter.admit', return_value=0)
+    def test_forwarded_for_does_not_escape_the_filter(self, mock_admit, mock_validate):
+        mock_validate.side_effect = ValueError("License not found.")
+        with patch('routes.api_routes.ip_filter.is_blocked', side_effect=lambda ip: ip == '203.0.113.9') as mock_is_blocked:
+            blocked = self.client.post('/api/v1/validate', json={'license_key': 'K', 'hwid': 'H'},
+                                       headers={'X-Forwarded-For': '192.0.2.1'}, environ_base={'REMOTE_ADDR': '203.0.113.9'})
+            allowed = self.client.post('/api/v1/validate', json={'license_key': 'K', 'hwid': 'H'},
+                                       headers={'X-Forwarded-For': '203.0.113.9'}, environ_base={'REMOTE_ADDR': '198.51.100.2'})
+
+        self.assertEqual(blocked.status_code, 403)
+        self.assertEqual([c[0][0] for c in mock_is_blocked.call_args_list], ['203.0.113.9', '198.51.100.2'])
+        # Failed attempts, which feed the autoblock, are recorded under the peer
+        # address, not one named in the header
+        self.assertEqual(allowed.status_code, 403)
+        self.assertEqual(mock_validate.call_args[0][2], '198.51.100.2')
+
+    @patch('routes.api_routes.refresh_license_request')
+    @patch('routes.api_routes.ip_filter.is_blocked', return_value=True)
+    def test_blocked_ip_cannot_refresh(self, mock_is_blocked, mock_refresh):
+        response = self.client.post('/api/v1/refresh', json={'token': 'T', 'hwid': 'H'},
+                                    environ_base={'REMOTE_ADDR': '203.0.113.9'})
+
+        self.assertEqual(response.status_code, 403)
+        mock_is_blocked.assert_called_once_with('203.0.113.9')
+        mock_refresh.assert_not_called()
+
+    @patch('routes.admin_routes.ip_filter.save_rule', return_value='198.51.100.7/32')
+    def test_ban_button_blocks_ip(self, mock_save_rule):
+        with self.client.session_transaction() as session:
+            session['admin_id'] = 1
+
+        response = self.client.post('/attempts/ban', data={'ip_address': '198.51.100.7', 'reason': 'license_not_found', 'app_id': '3'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/attempts?app_id=3', response.headers['Location'])
+        mock_save_rule.assert_called_once_with('198.51.100.7', 'block', 'license_not_found')
+
+    @patch('routes.admin_routes.list_rules')
+    def test_rules_page(self, mock_list_rules):
+        mock_list_rules.return_value = [{
+            'id': 4, 'network': '10.0.0.0/8', 'action': 'block', 'reason': None,
+            'source': 'auto', 'created_at': '2024-01-01 10:00:00', 'expires_at': None
+        }]
+        with self.client.session_transaction() as session:
+            session['admin_id'] = 1
+
+        response = self.client.get('/ip-rules')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'10.0.0.0/8', response.data)
+        self.assertIn(b'/ip-rules/4/delete', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
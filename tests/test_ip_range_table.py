@@ -0,0 +1,72 @@
+import unittest
+import tempfile
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms.ip_range_table import IpRangeTable, write_table
+from scripts.build_geoip_db import read_ranges
+
+class TestIpRangeTable(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'geoip.bin')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lookup_ipv4_and_ipv6(self):
+        write_table(self.path, [
+            ('8.8.8.0', '8.8.8.255', 'United States', 'Mountain View'),
+            ('1.0.0.0', '1.0.0.255', 'Australia', 'Sydney'),
+            ('2001:db8::', '2001:db8::ffff', 'France', 'Paris'),
+            ('41.243.0.0', '41.243.255.255', 'RD Congo', 'Kinshasa'),
+        ])
+        table = IpRangeTable(self.path)
+        try:
+            self.assertEqual(table.lookup('8.8.8.8'), ('United States', 'Mountain View'))
+            self.assertEqual(table.lookup('1.0.0.0'), ('Australia', 'Sydney'))
+            self.assertEqual(table.lookup('41.243.255.255'), ('RD Congo', 'Kinshasa'))
+            self.assertEqual(table.lookup('2001:db8::1'), ('France', 'Paris'))
+            # IPv4-mapped IPv6 addresses resolve through the IPv4 ranges
+            self.assertEqual(table.lookup('::ffff:8.8.8.8'), ('United States', 'Mountain View'))
+            # Gaps, out-of-range and malformed input
+            self.assertIsNone(table.lookup('0.255.255.255'))
+            self.assertIsNone(table.lookup('8.8.9.0'))
+            self.assertIsNone(table.lookup('2001:db8::1:0'))
+            self.assertIsNone(table.lookup('not-an-ip'))
+        finally:
+            table.close()
+
+    def test_overlapping_ranges_rejected(self):
+        with self.assertRaises(ValueError):
+            write_table(self.path, [
+                ('10.0.0.0', '10.0.0.255', 'A', 'a'),
+                ('10.0.0.128', '10.0.1.0', 'B', 'b'),
+            ])
+
+    def test_rejects_foreign_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a geoip table at all')
+        with self.assertRaises(ValueError):
+            IpRangeTable(self.path)
+
+    def test_builder_reads_csv_ranges_and_networks(self):
+        csv_path = os.path.join(self.tmpdir.name, 'ranges.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write("start_ip,end_ip,country,city\n")
+            f.write("192.0.2.0,192.0.2.255,Sénégal,Dakar\n")
+            f.write("198.51.100.0/24,Canada,Montréal\n")
+
+        write_table(self.path, read_ranges(csv_path))
+        table = IpRangeTable(self.path)
+        try:
+            self.assertEqual(table.lookup('192.0.2.10'), ('Sénégal', 'Dakar'))
+            self.assertEqual(table.lookup('198.51.100.200'), ('Canada', 'Montréal'))
+        finally:
+            table.close()
+
+if __name__ == '__main__':
+    unittest.main()
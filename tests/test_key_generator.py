@@ -0,0 +1,97 @@
+import re
+import unittest
+from collections import Counter
+from unittest.mock import patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms import key_generator
+
+KEY_FORMAT = re.compile(r'^[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{4}$')
+
+class TestKeyGenerator(unittest.TestCase):
+    def test_single_key_format(self):
+        self.assertRegex(key_generator.generate_license_key(), KEY_FORMAT)
+
+    def test_batch_is_distinct_and_well_formed(self):
+        keys = key_generator.generate_license_keys(5000)
+
+        self.assertEqual(len(keys), 5000)
+        self.assertEqual(len(set(keys)), 5000)
+        for key in keys:
+            self.assertRegex(key, KEY_FORMAT)
+        self.assertEqual(key_generator.generate_license_keys(0), [])
+
+    def test_duplicates_within_batch_are_redrawn(self):
+        # The first draw yields the same key twice
+        same = b'ABCD' * 4
+        draws = iter([same + same, b'WXYZ' * 4])
+        with patch('algorithms.key_generator._random_bytes', side_effect=lambda length: next(draws)):
+            keys = key_generator.generate_license_keys(2)
+
+        self.assertEqual(sorted(keys), ['ABCD-ABCD-ABCD-ABCD', 'WXYZ-WXYZ-WXYZ-WXYZ'])
+
+    def test_biased_bytes_are_rejected(self):
+        # Bytes 252-255 would map to 'A'-'D' a fifth time; they must be dropped, not mapped
+        raw = bytes([252, 253, 254, 255, 0, 35]) + bytes(range(36)) * 2
+        with patch('algorithms.key_generator.secrets.token_bytes', return_value=raw):
+            chars = key_generator._random_bytes(6)
+
+        self.assertEqual(chars, b'A9ABCD')
+
+    def test_characters_are_uniform(self):
+        counts = Counter(''.join(key_generator.generate_license_keys(20000)).replace('-', ''))
+
+        self.assertEqual(set(counts), set(key_generator.CHARACTERS))
+        expected = 20000 * 16 / 36
+        chi_square = sum((count - expected) ** 2 / expected for count in counts.values())
+        # 35 degrees of freedom: a fair generator stays far below 80 (p < 0.0001)
+        self.assertLess(chi_square, 80)
+
+class TestKeyFormats(unittest.TestCase):
+    def test_checksum_keys_validate_offline(self):
+        keys = key_generator.generate_license_keys(1000, key_generator.KEY_FORMAT_CHECKSUM, 'secret')
+
+        for key in keys:
+            self.assertRegex(key, r'^[A-Z0-9]{4}(-[A-Z0-9]{4}){4}$')
+            self.assertEqual(key_generator.key_format_of(key, 'secret'), key_generator.KEY_FORMAT_CHECKSUM)
+        # The checksum depends on the secret
+        self.assertTrue(any(key_generator.key_format_of(key, 'other') is None for key in keys))
+
+    def test_made_up_keys_are_rejected(self):
+        key = key_generator.generate_license_key(key_generator.KEY_FORMAT_CHECKSUM, 'secret')
+        tampered = ('B' if key[0] != 'B' else 'C') + key[1:]
+
+        self.assertIsNone(key_generator.key_format_of(tampered, 'secret'))
+        for malformed in (None, '', 'key', 'abcd-efgh-ijkl-mnop', 'ABCD-EFGH-IJKL-MNOP-', 'ABCDEFGHIJKLMNOPQRS', key.lower()):
+            self.assertIsNone(key_generator.key_format_of(malformed, 'secret'))
+
+        # Random checksum groups almost never pass
+        body = key[:19]
+        candidates = {other[:4] for other in key_generator.generate_license_keys(2000)} - {key[20:]}
+        valid = [c for c in candidates if key_generator.key_format_of(f"{body}-{c}", 'secret') is not None]
+        self.assertLessEqual(len(valid), 1)
+
+    def test_plain_keys_keep_working(self):
+        key = key_generator.generate_license_key()
+
+        self.assertEqual(key_generator.key_format_of(key, 'secret'), key_generator.KEY_FORMAT_PLAIN)
+        with self.assertRaises(ValueError):
+            key_generator.generate_license_keys(1, key_format=3)
+
+    def test_checksum_keys_need_a_secret(self):
+        # With an empty secret the checksum is public: such keys are never issued nor accepted
+        with self.assertRaises(ValueError):
+            key_generator.generate_license_keys(1, key_generator.KEY_FORMAT_CHECKSUM, '')
+        forged = key_generator.generate_license_key(key_generator.KEY_FORMAT_CHECKSUM, 'secret')
+        body = forged[:19]
+        forged = f"{body}-{key_generator._checksum(body, key_generator._mac_key(''))}"
+
+        self.assertIsNone(key_generator.key_format_of(forged, ''))
+        self.assertEqual(key_generator.key_format_of(body, ''), key_generator.KEY_FORMAT_PLAIN)
+
+if __name__ == '__main__':
+    unittest.main()
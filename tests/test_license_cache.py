@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import license_cache, license_model, machine_model
+
+class TestLicenseCache(unittest.TestCase):
+    def setUp(self):
+        license_cache.clear()
+        self.row = (10, 1, 'TEST-KEY-1234', 'lifetime', None, 'used', '2023-01-01', 5, 'hwid-hash', '2023-01-02')
+
+    def tearDown(self):
+        license_cache.clear()
+
+    def _mock_cursor(self, mock_get_db_cursor, fetchone=None):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = fetchone
+        cursor.rowcount = 1
+        mock_get_db_cursor.return_value.__enter__.return_value = cursor
+        return cursor
+
+    @patch('models.license_model.get_db_cursor')
+    def test_read_through(self, mock_get_db_cursor):
+        cursor = self._mock_cursor(mock_get_db_cursor, self.row)
+
+        first = license_model.get_license_for_validation('TEST-KEY-1234')
+        second = license_model.get_license_for_validation('TEST-KEY-1234')
+
+        self.assertIs(first, second)
+        self.assertEqual(cursor.execute.call_count, 1)
+        self.assertEqual(first['machine']['hwid'], 'hwid-hash')
+        # Plain lookups by key or by license id are served from the same entry
+        self.assertEqual(license_model.get_license_by_key('TEST-KEY-1234')['status'], 'used')
+        self.assertEqual(machine_model.get_machine_by_license_id(10)['hwid'], 'hwid-hash')
+        self.assertEqual(cursor.execute.call_count, 1)
+
+    @patch('models.license_model.get_db_cursor')
+    def test_not_found_is_not_cached(self, mock_get_db_cursor):
+        cursor = self._mock_cursor(mock_get_db_cursor, None)
+
+        self.assertIsNone(license_model.get_license_for_validation('NOPE-NOPE-NOPE-NOPE'))
+        self.assertIsNone(license_model.get_license_for_validation('NOPE-NOPE-NOPE-NOPE'))
+        self.assertEqual(cursor.execute.call_count, 2)
+
+    @patch('models.machine_model.get_db_cursor')
+    @patch('models.license_model.get_db_cursor')
+    def test_writes_invalidate(self, mock_license_cursor, mock_machine_cursor):
+        self._mock_cursor(mock_license_cursor, self.row)
+        self._mock_cursor(mock_machine_cursor, (5, 10, 'hwid-hash', '2023-01-02'))
+
+        for write in (
+            lambda: license_model.update_license_status(10, 'revoked'),
+            lambda: license_model.revoke_license_by_key('TEST-KEY-1234'),
+            lambda: license_model.activate_license(10, 'hwid-hash'),
+            lambda: machine_model.add_machine(10, 'hwid-hash'),
+        ):
+            license_model.get_license_for_validation('TEST-KEY-1234')
+            self.assertIsNotNone(license_cache.get('TEST-KEY-1234'))
+            write()
+            self.assertIsNone(license_cache.get('TEST-KEY-1234'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+import threading
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms.bloom_filter import BloomFilter
+from algorithms.key_generator import generate_license_keys
+from services import license_filter
+from services.license_filter import LicenseFilter
+from services.validation_service import validate_license_request, validate_license_batch
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives(self):
+        keys = generate_license_keys(5000)
+        bloom = BloomFilter(5000, 0.01)
+        bloom.update(keys)
+
+        self.assertEqual(len(bloom), 5000)
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_false_positive_rate_at_capacity(self):
+        keys = generate_license_keys(20000)
+        bloom = BloomFilter(10000, 0.01)
+        bloom.update(keys[:10000])
+
+        false_positives = sum(key in bloom for key in keys[10000:])
+        self.assertLess(false_positives / 10000, 0.02)
+        self.assertAlmostEqual(bloom.estimated_fp_rate(), 0.01, delta=0.005)
+
+    def test_sizing(self):
+        bloom = BloomFilter(1000000, 0.001)
+        # About 14.4 bits and 10 hash functions per key at 0.1%
+        self.assertEqual(bloom.hash_count, 10)
+        self.assertAlmostEqual(bloom.size_bytes, 1797000, delta=1000)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            BloomFilter(0, 0.01)
+        with self.assertRaises(ValueError):
+            BloomFilter(100, 1.5)
+
+class TestLicenseFilter(unittest.TestCase):
+    def setUp(self):
+        self.rows = [(i, key) for i, key in enumerate(generate_license_keys(300), start=1)]
+
+    def _keys_after(self, last_id, limit):
+        return [row for row in self.rows if row[0] > last_id][:limit]
+
+    @patch('services.license_filter._PAGE_SIZE', 100)
+    @patch('services.license_filter.license_model.get_license_keys_after')
+    @patch('services.license_filter.license_model.count_licenses')
+    def test_load_and_sync(self, mock_count, mock_keys_after):
+        mock_count.return_value = len(self.rows)
+        mock_keys_after.side_effect = self._keys_after
+        keys = LicenseFilter(fp_rate=0.001, min_capacity=1000, sync_interval=60)
+
+        self.assertTrue(keys.might_exist('AAAA-AAAA-AAAA-AAAA'))  # Not loaded: no answer
+        self.assertEqual(keys.load(), 300)
+        self.assertTrue(all(keys.might_exist(key) for _, key in self.rows))
+        self.assertFalse(keys.might_exist('AAAA-AAAA-AAAA-AAAA'))
+
+        # Licenses created by another process are picked up from the last ID read
+        new_rows = [(301 + i, key) for i, key in enumerate(generate_license_keys(2))]
+        self.rows.extend(new_rows)
+        self.assertEqual(keys.sync(), 2)
+        mock_keys_after.assert_called_with(300, 100)
+        self.assertTrue(all(keys.might_exist(key) for _, key in new_rows))
+
+        stats = keys.stats()
+        self.assertEqual(stats['keys'], 302)
+        self.assertEqual(stats['capacity'], 1000)
+        self.assertGreater(stats['size_bytes'], 0)
+        self.assertEqual(stats['rejected'], 1)
+
+    @patch('services.license_filter.license_model.get_license_keys_after')
+    @patch('services.license_filter.license_model.count_licenses')
+    def test_grows_when_over_capacity(self, mock_count, mock_keys_after):
+        mock_count.return_value = 0
+        mock_keys_after.side_effect = self._keys_after
+        keys = LicenseFilter(fp_rate=0.01, min_capacity=100, sync_interval=60)
+        self.rows, later = [], self.rows
+        keys.load()
+
+        self.rows = later
+        self.assertEqual(keys.sync(), 300)
+        self.assertEqual(keys.stats()['capacity'], 600)
+        self.assertEqual(keys.stats()['loads'], 2)
+        self.assertTrue(all(keys.might_exist(key) for _, key in self.rows))
+
+    @patch('services.license_filter.license_model.get_transaction_horizon')
+    @patch('services.license_filter.license_model.get_license_keys_in_ranges')
+    @patch('services.license_filter.license_model.get_license_keys_after')
+    @patch('services.license_filter.license_model.count_licenses')
+    def test_ids_committed_out_of_order(self, mock_count, mock_keys_after, mock_keys_in_ranges, mock_horizon):
+        def keys_in_ranges(ranges):
+            return [row for row in self.rows if any(low <= row[0] <= high for low, high in ranges)]
+        mock_count.return_value = 2
+        mock_keys_after.side_effect = self._keys_after
+        mock_keys_in_ranges.side_effect = keys_in_ranges
+        keys = LicenseFilter(fp_rate=0.01, min_capacity=100, sync_interval=60)
+        self.rows, later = self.rows[:2], self.rows[2:10]
+        keys.load()
+
+        # IDs 3 to 7 are drawn by a bulk chunk still running when a single create commits ID 8
+        self.rows.append(later[5])
+        mock_horizon.return_value = (50, 52)
+        self.assertEqual(keys.sync(), 1)
+        self.assertEqual(keys.stats()['pending_id_gaps'], 1)
+
+        # The chunk commits after the watermark has moved past its IDs
+        self.rows.extend(later[:5])
+        self.assertEqual(keys.sync(), 5)
+        mock_keys_in_ranges.assert_called_with([(3, 7)])
+        self.assertTrue(all(keys.might_exist(key) for _, key in self.rows))
+
+        # ID 9 is skipped by a rollback: dropped once the transactions seen running have finished
+        self.rows.append(later[7])
+        keys.sync()
+        self.assertEqual(keys.stats()['pending_id_gaps'], 1)
+        mock_horizon.return_value = (52, 53)
+        self.assertEqual(keys.sync(), 0)
+        self.assertEqual(keys.stats()['pending_id_gaps'], 0)
+        self.assertEqual(len(keys._filter), 9)
+
+    @patch('services.license_filter.license_model.get_license_keys_after')
+    @patch('services.license_filter.license_model.count_licenses')
+    def test_key_added_during_load_is_kept(self, mock_count, mock_keys_after):
+        mock_count.return_value = 1
+        keys = LicenseFilter(fp_rate=0.01, min_capacity=100, sync_interval=60)
+        query_started = threading.Event()
+        release_query = threading.Event()
+        snapshot, created = generate_license_keys(2)
+
+        def slow_query(last_id, limit):
+            query_started.set()
+            release_query.wait(5)
+            return [(1, snapshot)] if last_id == 0 else []
+        mock_keys_after.side_effect = slow_query
+
+        loader = threading.Thread(target=keys.load)
+        loader.start()
+        query_started.wait(5)
+        keys.add([created])
+        release_query.set()
+        loader.join(5)
+
+        self.assertTrue(keys.might_exist(snapshot))
+        self.assertTrue(keys.might_exist(created))
+
+class TestValidationWithFilter(unittest.TestCase):
+    def setUp(self):
+        self.filter = LicenseFilter(fp_rate=0.01, min_capacity=100, sync_interval=60)
+        self.filter._filter = BloomFilter(100, 0.01)
+        self.filter.add(['TEST-KEY0-1234-ABCD'])
+        patcher = patch('services.license_filter._license_filter', self.filter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('services.validation_service.telemetry_writer.record_failed_attempt')
+    @patch('services.validation_service.app_registry.get_app')
+    @patch('services.validation_service.license_model.get_license_for_validation')
+    def test_unknown_key_skips_the_query(self, mock_get_record, mock_get_app, mock_record_failed):
+        mock_get_app.return_value = {'id': 1}
+        payload = {'license_key': 'ZZZZ-ZZZZ-ZZZZ-ZZZZ', 'hwid': 'hwid-1234', 'app_id': 1}
+
+        with self.assertRaisesRegex(ValueError, "License not found."):
+            validate_license_request(payload, {'User-Agent': 'TestAgent'}, '127.0.0.1')
+
+        mock_get_record.assert_not_called()
+        self.assertEqual(mock_record_failed.call_args[0][-1], 'license_not_found')
+
+    @patch('services.validation_service.license_model.get_license_for_validation')
+    def test_known_key_is_looked_up(self, mock_get_record):
+        mock_get_record.return_value = None
+        payload = {'license_key': 'TEST-KEY0-1234-ABCD', 'hwid': 'hwid-1234'}
+
+        with self.assertRaisesRegex(ValueError, "License not found."):
+            validate_license_request(payload, {'User-Agent': 'TestAgent'}, '127.0.0.1')
+
+        mock_get_record.assert_called_once_with('TEST-KEY0-1234-ABCD')
+
+    @patch('services.validation_service.license_model.mark_licenses_used')
+    @patch('services.validation_service.license_model.activate_licenses')
+    @patch('services.validation_service.license_model.get_licenses_for_validation')
+    def test_batch_only_queries_known_keys(self, mock_get_records, mock_activate, mock_mark_used):
+        mock_get_records.return_value = {}
+        mock_activate.return_value = set()
+        items = [
+            {'license_key': 'TEST-KEY0-1234-ABCD', 'hwid': 'hwid-1'},
+            {'license_key': 'ZZZZ-ZZZZ-ZZZZ-ZZZZ', 'hwid': 'hwid-2'}
+        ]
+
+        results = validate_license_batch(items, {'User-Agent': 'TestAgent'}, '127.0.0.1')
+
+        mock_get_records.assert_called_once_with(['TEST-KEY0-1234-ABCD'])
+        self.assertEqual(results, [{'error': "License not found."}] * 2)
+
+    def test_module_answers_yes_without_a_filter(self):
+        with patch('services.license_filter._license_filter', None):
+            self.assertTrue(license_filter.might_exist('ZZZZ-ZZZZ-ZZZZ-ZZZZ'))
+
+if __name__ == '__main__':
+    unittest.main()
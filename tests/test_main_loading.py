@@ -29,8 +29,8 @@ class TestMainRoutes(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
 
     @patch('routes.api_routes.validate_license_request')
-    @patch('routes.api_routes.get_app_by_id')
-    def test_api_validate_success(self, mock_get_app, mock_validate):
+    @patch('routes.api_routes.sign_token')
+    def test_api_validate_success(self, mock_sign_token, mock_validate):
         # Correctly configure mocks
         mock_validate.return_value = {
             'license_id': 1,
@@ -39,7 +39,7 @@ class TestMainRoutes(unittest.TestCase):
             'type': 'lifetime',
             'expires_at': None
         }
-        mock_get_app.return_value = {'app_secret': 'secret'}
+        mock_sign_token.return_value = 'signed-token'
 
         payload = {'license_key': 'key', 'hwid': 'hwid'}
         response = self.client.post('/api/v1/validate', json=payload)
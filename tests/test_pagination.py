@@ -0,0 +1,118 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from flask import Flask
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import Config
+from models import tracking_model
+from routes.admin_routes import admin_bp
+from routes.auth_routes import auth_bp
+
+START = datetime(2024, 1, 1, 12, 0)
+
+def _activation_row(row_id):
+    return (row_id, 10, '1.2.3.4', 'mac', 'UA', 'FR', 'Paris', START + timedelta(minutes=row_id), 'AAAA-AAAA-AAAA-AAAA', 'lifetime', 'App')
+
+class TestKeysetQueries(unittest.TestCase):
+    def _mock_cursor(self, mock_get_db_cursor, rows):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = rows
+        mock_get_db_cursor.return_value.__enter__.return_value = cursor
+        return cursor
+
+    @patch('models.tracking_model.get_db_cursor')
+    def test_first_page(self, mock_get_db_cursor):
+        cursor = self._mock_cursor(mock_get_db_cursor, [_activation_row(3), _activation_row(2)])
+
+        activations = tracking_model.get_activations(limit=2)
+
+        query, params = cursor.execute.call_args[0]
+        self.assertIn("ORDER BY a.activated_at DESC, a.id DESC LIMIT %s", query)
+        self.assertNotIn("WHERE", query)
+        self.assertEqual(params, (2,))
+        self.assertEqual([a['id'] for a in activations], [3, 2])
+
+    @patch('models.tracking_model.get_db_cursor')
+    def test_older_page_seeks_from_key(self, mock_get_db_cursor):
+        cursor = self._mock_cursor(mock_get_db_cursor, [])
+        key = (START, 7)
+
+        tracking_model.get_failed_attempts(app_id=4, limit=50, before=key)
+
+        query, params = cursor.execute.call_args[0]
+        self.assertIn("WHERE f.app_id = %s AND (f.attempted_at, f.id) < (%s, %s)", query)
+        self.assertIn("AND f.attempted_at <= %s", query)
+        self.assertIn("ORDER BY f.attempted_at DESC, f.id DESC", query)
+        self.assertEqual(params, (4, START, 7, START, 50))
+
+    @patch('models.tracking_model.get_db_cursor')
+    def test_newer_page_is_returned_newest_first(self, mock_get_db_cursor):
+        # The closest newer rows are read oldest first, then reversed
+        cursor = self._mock_cursor(mock_get_db_cursor, [_activation_row(4), _activation_row(5)])
+
+        activations = tracking_model.get_activations(limit=2, after=(START, 3))
+
+        query, params = cursor.execute.call_args[0]
+        self.assertIn("WHERE (a.activated_at, a.id) > (%s, %s)", query)
+        self.assertIn("ORDER BY a.activated_at ASC, a.id ASC", query)
+        self.assertEqual([a['id'] for a in activations], [5, 4])
+
+class TestPaginatedRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__, template_folder='../templates')
+        self.app.secret_key = 'test_secret'
+        self.app.register_blueprint(admin_bp)
+        self.app.register_blueprint(auth_bp)
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['admin_id'] = 1
+
+    def _activations(self, ids):
+        return [{
+            'id': i, 'activated_at': START + timedelta(minutes=i), 'app_name': 'App', 'ip_address': '1.2.3.4',
+            'mac_address': 'mac', 'country': None, 'city': None, 'license_key': 'AAAA-AAAA-AAAA-AAAA', 'license_type': 'lifetime'
+        } for i in ids]
+
+    @patch.object(Config, 'ADMIN_PAGE_SIZE', 2)
+    @patch('routes.admin_routes.get_activations')
+    def test_first_page_links_to_older(self, mock_get_activations):
+        mock_get_activations.return_value = self._activations([9, 8, 7])
+
+        response = self.client.get('/users?app_id=3')
+
+        self.assertEqual(response.status_code, 200)
+        mock_get_activations.assert_called_once_with(app_id=3, since=None, limit=3, before=None, after=None)
+        html = response.get_data(as_text=True)
+        self.assertIn('before=2024-01-01T12:08:00_8', html)
+        self.assertNotIn('after=', html)
+
+    @patch.object(Config, 'ADMIN_PAGE_SIZE', 2)
+    @patch('routes.admin_routes.get_activations')
+    def test_older_page_links_both_ways(self, mock_get_activations):
+        mock_get_activations.return_value = self._activations([7, 6])
+
+        response = self.client.get('/users?before=2024-01-01T12:08:00_8&period=week')
+
+        kwargs = mock_get_activations.call_args[1]
+        self.assertEqual(kwargs['before'], (datetime(2024, 1, 1, 12, 8), 8))
+        self.assertIsNotNone(kwargs['since'])
+        html = response.get_data(as_text=True)
+        self.assertIn('after=2024-01-01T12:07:00_7', html)
+        self.assertNotIn('before=', html)
+
+    @patch('routes.admin_routes.get_failed_attempts')
+    def test_invalid_page_key_shows_first_page(self, mock_get_attempts):
+        mock_get_attempts.return_value = []
+
+        response = self.client.get('/attempts?before=garbage')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(mock_get_attempts.call_args[1]['before'])
+
+if __name__ == '__main__':
+    unittest.main()
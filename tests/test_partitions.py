@@ -0,0 +1,162 @@
+import unittest
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import v004_partition_telemetry
+from models import partition_model
+from models.partition_model import add_months, create_partition_statement, month_start
+from services import partition_maintenance
+
+def _executed(cursor):
+    return [' '.join(c[0][0].split()) for c in cursor.execute.call_args_list]
+
+class TestMonths(unittest.TestCase):
+    def test_month_arithmetic(self):
+        self.assertEqual(month_start(datetime(2024, 2, 29, 23, 59)), date(2024, 2, 1))
+        self.assertEqual(add_months(date(2024, 11, 1), 3), date(2025, 2, 1))
+        self.assertEqual(add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+        self.assertEqual(add_months(date(2024, 1, 1), -24), date(2022, 1, 1))
+
+    def test_partition_bounds(self):
+        self.assertEqual(
+            create_partition_statement('failed_attempts', date(2024, 12, 1)),
+            "CREATE TABLE IF NOT EXISTS failed_attempts_2024_12 PARTITION OF failed_attempts "
+            "FOR VALUES FROM ('2024-12-01') TO ('2025-01-01')"
+        )
+
+class TestPartitionModel(unittest.TestCase):
+    def _mock_cursor(self, mock_get_db_cursor):
+        cursor = MagicMock()
+        mock_get_db_cursor.return_value.__enter__.return_value = cursor
+        return cursor
+
+    @patch('models.partition_model.get_db_cursor')
+    def test_list_partitions_ignores_other_children(self, mock_get_db_cursor):
+        cursor = self._mock_cursor(mock_get_db_cursor)
+        cursor.fetchall.return_value = [('activations_2024_02',), ('activations_2023_12',), ('activations_misc',)]
+
+        self.assertEqual(partition_model.list_partitions('activations'), [date(2023, 12, 1), date(2024, 2, 1)])
+
+    @patch('models.partition_model.get_db_cursor')
+    def test_existing_partition_is_not_created(self, mock_get_db_cursor):
+        cursor = self._mock_cursor(mock_get_db_cursor)
+        cursor.fetchone.return_value = (False,)
+
+        self.assertFalse(partition_model.create_partition('activations', date(2024, 1, 1)))
+        self.assertEqual(cursor.execute.call_count, 1)
+
+    @patch('models.partition_model.get_db_cursor')
+    def test_retire_subtracts_counts_then_drops(self, mock_get_db_cursor):
+        cursor = self._mock_cursor(mock_get_db_cursor)
+        cursor.fetchall.return_value = [(1, 40), (3, 2)]
+
+        self.assertEqual(partition_model.retire_detached('failed_attempts', date(2024, 1, 1)), 42)
+
+        statements = _executed(cursor)
+        self.assertEqual(statements[0], "SET LOCAL statement_timeout = 0")
+        self.assertIn("FROM failed_attempts_2024_01_detached", statements[1])
+        self.assertEqual(cursor.execute.call_args_list[2][0][1], (40, 1))
+        self.assertEqual(cursor.execute.call_args_list[3][0][1], (2, 3))
+        self.assertEqual(statements[-1], "DROP TABLE failed_attempts_2024_01_detached")
+
+    @patch('models.partition_model.get_db_cursor')
+    def test_retire_archive_keeps_table(self, mock_get_db_cursor):
+        cursor = self._mock_cursor(mock_get_db_cursor)
+        cursor.fetchall.return_value = []
+
+        partition_model.retire_detached('activations', date(2024, 1, 1), archive=True)
+
+        self.assertEqual(_executed(cursor)[-1], "ALTER TABLE activations_2024_01_detached RENAME TO activations_archive_2024_01")
+
+@patch('services.partition_maintenance.partition_model')
+class TestMaintain(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.multiple(
+            'services.partition_maintenance.Config',
+            TELEMETRY_PARTITIONS_AHEAD=2, ACTIVATIONS_RETENTION_MONTHS=0,
+            FAILED_ATTEMPTS_RETENTION_MONTHS=3, TELEMETRY_ARCHIVE_EXPIRED=False
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_creates_months_ahead_and_retires_expired(self, mock_model):
+        mock_model.list_detached.return_value = []
+        mock_model.create_partition.side_effect = lambda table, month: month != date(2024, 5, 1)
+        mock_model.list_partitions.return_value = [date(2024, 1, 1), date(2024, 2, 1), date(2024, 5, 1)]
+        mock_model.retire_detached.return_value = 10
+
+        result = partition_maintenance.maintain(today=date(2024, 5, 17))
+
+        self.assertEqual(result['created'], [
+            'activations_2024_06', 'activations_2024_07',
+            'failed_attempts_2024_06', 'failed_attempts_2024_07'
+        ])
+        # Activations are kept forever; failed attempts keep February to May
+        self.assertEqual(result['retired'], ['failed_attempts_2024_01'])
+        mock_model.detach_partition.assert_called_once_with('failed_attempts', date(2024, 1, 1))
+        mock_model.retire_detached.assert_called_once_with('failed_attempts', date(2024, 1, 1), archive=False)
+
+    def test_interrupted_retirement_is_finished(self, mock_model):
+        mock_model.list_detached.side_effect = lambda table: [date(2023, 1, 1)] if table == 'activations' else []
+        mock_model.create_partition.return_value = False
+        mock_model.list_partitions.return_value = []
+        mock_model.retire_detached.return_value = 0
+
+        result = partition_maintenance.maintain(today=date(2024, 5, 17))
+
+        self.assertEqual(result, {'created': [], 'retired': ['activations_2023_01']})
+        mock_model.detach_partition.assert_not_called()
+
+    def test_ensure_upcoming_only_creates(self, mock_model):
+        mock_model.create_partition.side_effect = lambda table, month: month == date(2024, 7, 1)
+
+        created = partition_maintenance.ensure_upcoming(today=date(2024, 5, 17))
+
+        self.assertEqual(created, ['activations_2024_07', 'failed_attempts_2024_07'])
+        mock_model.list_partitions.assert_not_called()
+        mock_model.detach_partition.assert_not_called()
+
+class TestPartitionMigration(unittest.TestCase):
+    @patch('migrations.v004_partition_telemetry.date')
+    def test_swaps_table_then_moves_rows(self, mock_date):
+        mock_date.today.return_value = date(2024, 5, 17)
+        cursor = MagicMock()
+        # activations: plain table, old rows from March; failed_attempts: already migrated
+        cursor.fetchone.side_effect = [
+            ('r',), (True,), (datetime(2024, 3, 2), datetime(2024, 5, 16)), ("id, license_id, activated_at",),
+            ('p',), (False,)
+        ]
+        cursor.rowcount = 12
+
+        with patch('migrations.v004_partition_telemetry.Config.TELEMETRY_PARTITIONS_AHEAD', 1):
+            v004_partition_telemetry.upgrade(cursor)
+
+        statements = _executed(cursor)
+        begin, commit = statements.index("BEGIN"), statements.index("COMMIT")
+        swap = statements[begin:commit]
+        self.assertEqual(swap[1], "ALTER TABLE activations RENAME TO activations_unpartitioned")
+        create = next(s for s in swap if s.startswith("CREATE TABLE activations "))
+        self.assertIn("id INTEGER NOT NULL DEFAULT nextval('activations_id_seq')", create)
+        self.assertTrue(create.endswith("PARTITION BY RANGE (activated_at)"))
+        # The old table gives up its sequence before the new one takes it
+        self.assertLess(swap.index("ALTER SEQUENCE activations_id_seq OWNED BY NONE"), swap.index(create))
+        self.assertIn("CREATE INDEX idx_activations_activated_at ON activations (activated_at DESC, id DESC)", swap)
+        self.assertTrue(any("CREATE TRIGGER app_stats_activations_insert" in s for s in swap))
+        self.assertFalse(any("failed_attempts" in s for s in swap))
+
+        # Partitions cover the old rows, this month and the month ahead
+        partitions = [s.split()[5] for s in statements if s.startswith("CREATE TABLE IF NOT EXISTS")]
+        self.assertEqual(sorted(set(partitions)), ['activations_2024_03', 'activations_2024_04', 'activations_2024_05', 'activations_2024_06'])
+
+        move = next(s for s in statements if s.startswith("WITH moved AS"))
+        self.assertIn("DELETE FROM activations_unpartitioned", move)
+        self.assertIn("SELECT id, license_id, COALESCE(activated_at, CURRENT_TIMESTAMP) FROM moved", move)
+        self.assertIn("DROP TABLE activations_unpartitioned", statements)
+
+if __name__ == '__main__':
+    unittest.main()
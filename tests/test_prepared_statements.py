@@ -0,0 +1,129 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2 import errors
+from config import prepared_statements
+from config.prepared_statements import PreparingConnection, Statement
+from models import license_cache, license_model
+# Imported for the statements they register
+from models import app_model, machine_model, tracking_model  # noqa: F401
+
+def _cursor():
+    cursor = MagicMock()
+    cursor.connection = MagicMock(spec=PreparingConnection)
+    cursor.connection.prepared = set()
+    cursor.connection.autocommit = False
+    return cursor
+
+class TestStatement(unittest.TestCase):
+    def test_numbers_placeholders(self):
+        statement = Statement('find_machine', "SELECT 1 FROM machines WHERE hwid = %s AND license_id = %s::integer")
+
+        self.assertEqual(statement.prepare_query,
+                         "PREPARE find_machine AS SELECT 1 FROM machines WHERE hwid = $1 AND license_id = $2::integer")
+        self.assertEqual(statement.execute_query, "EXECUTE find_machine (%s, %s)")
+        self.assertEqual(Statement('count_apps', "SELECT COUNT(*) FROM apps").execute_query, "EXECUTE count_apps")
+
+    def test_prepared_once_per_connection(self):
+        statement = Statement('find_app', "SELECT name FROM apps WHERE id = %s")
+        cursor = _cursor()
+
+        statement.execute(cursor, (1,))
+        statement.execute(cursor, (2,))
+
+        self.assertEqual([c[0] for c in cursor.execute.call_args_list], [
+            ("SAVEPOINT find_app; PREPARE find_app AS SELECT name FROM apps WHERE id = $1; RELEASE SAVEPOINT find_app",),
+            ("EXECUTE find_app (%s)", (1,)),
+            ("EXECUTE find_app (%s)", (2,))
+        ])
+        self.assertEqual((statement.prepares, statement.executions), (1, 2))
+
+        # A new connection (e.g. after a reconnect) prepares it again, without
+        # a savepoint outside a transaction
+        other = _cursor()
+        other.connection.autocommit = True
+        statement.execute(other, (3,))
+        self.assertEqual(other.execute.call_args_list[0][0][0], "PREPARE find_app AS SELECT name FROM apps WHERE id = $1")
+
+    def test_plain_query_when_disabled_or_foreign_connection(self):
+        statement = Statement('find_app', "SELECT name FROM apps WHERE id = %s")
+        cursor = _cursor()
+        with patch('config.prepared_statements.Config') as mock_config:
+            mock_config.DB_PREPARED_STATEMENTS = False
+            statement.execute(cursor, (1,))
+        cursor.execute.assert_called_once_with("SELECT name FROM apps WHERE id = %s", (1,))
+
+        plain = MagicMock()
+        statement.execute(plain, (1,))
+        plain.execute.assert_called_once_with("SELECT name FROM apps WHERE id = %s", (1,))
+
+    def test_deallocated_statement_is_prepared_again(self):
+        statement = Statement('find_app', "SELECT name FROM apps WHERE id = %s")
+        cursor = _cursor()
+        statement.execute(cursor, (1,))
+        cursor.execute.side_effect = errors.InvalidSqlStatementName("prepared statement \"find_app\" does not exist")
+
+        cursor.connection.prepared.add('other_statement')
+
+        with self.assertRaises(errors.InvalidSqlStatementName):
+            statement.execute(cursor, (1,))
+
+        # Only the failing statement is known to be gone
+        self.assertEqual(cursor.connection.prepared, {'other_statement'})
+
+    def test_statement_already_prepared_in_session_is_used(self):
+        statement = Statement('find_app', "SELECT name FROM apps WHERE id = %s")
+        cursor = _cursor()
+
+        def execute(query, params=None):
+            if 'PREPARE' in query:
+                raise errors.DuplicatePreparedStatement("prepared statement \"find_app\" already exists")
+        cursor.execute.side_effect = execute
+
+        statement.execute(cursor, (1,))
+
+        self.assertEqual([c[0] for c in cursor.execute.call_args_list[1:]], [
+            ("ROLLBACK TO SAVEPOINT find_app",),
+            ("EXECUTE find_app (%s)", (1,))
+        ])
+        self.assertIn('find_app', cursor.connection.prepared)
+        self.assertEqual((statement.prepares, statement.executions), (0, 1))
+
+class TestRegistry(unittest.TestCase):
+    def test_register(self):
+        statement = prepared_statements.register('test_registry_app', "SELECT name FROM apps WHERE id = %s")
+
+        self.assertIs(prepared_statements.register('test_registry_app', "SELECT name FROM apps WHERE id = %s"), statement)
+        self.assertIs(prepared_statements.statements()['test_registry_app'], statement)
+        with self.assertRaises(ValueError):
+            prepared_statements.register('test_registry_app', "SELECT id FROM apps")
+        with self.assertRaises(ValueError):
+            prepared_statements.register('Bad Name', "SELECT 1")
+        with self.assertRaises(ValueError):
+            prepared_statements.register('test_registry_like', "SELECT id FROM apps WHERE name LIKE 'a%%'")
+
+    def test_hot_queries_are_registered(self):
+        names = prepared_statements.statements()
+        for name in ('license_for_validation', 'licenses_for_validation', 'activate_license',
+                     'machine_by_license_id', 'app_by_id', 'log_activation'):
+            self.assertIn(name, names)
+
+    @patch('models.license_model.get_db_cursor')
+    def test_model_executes_prepared_statement(self, mock_get_db_cursor):
+        license_cache.clear()
+        cursor = _cursor()
+        cursor.fetchone.return_value = None
+        mock_get_db_cursor.return_value.__enter__.return_value = cursor
+
+        self.assertIsNone(license_model.get_license_for_validation('TEST-KEY0-1234-ABCD'))
+
+        self.assertIn("PREPARE license_for_validation AS", cursor.execute.call_args_list[0][0][0])
+        self.assertEqual(cursor.execute.call_args_list[1][0], ("EXECUTE license_for_validation (%s)", ('TEST-KEY0-1234-ABCD',)))
+
+if __name__ == '__main__':
+    unittest.main()
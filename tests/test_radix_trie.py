@@ -0,0 +1,81 @@
+import ipaddress
+import random
+import unittest
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms.radix_trie import CidrTrie
+
+class TestCidrTrie(unittest.TestCase):
+    def test_longest_prefix_wins(self):
+        trie = CidrTrie()
+        trie.insert('10.0.0.0/8', 'block')
+        trie.insert('10.1.2.0/24', 'allow')
+        trie.insert('10.1.2.3/32', 'block')
+
+        self.assertEqual(trie.lookup('10.200.0.1'), 'block')
+        self.assertEqual(trie.lookup('10.1.2.200'), 'allow')
+        self.assertEqual(trie.lookup('10.1.2.3'), 'block')
+        self.assertIsNone(trie.lookup('11.0.0.1'))
+        self.assertEqual(len(trie), 3)
+
+    def test_insert_order_does_not_matter(self):
+        # A shorter network inserted after longer ones splits their edge
+        trie = CidrTrie()
+        trie.insert('192.168.1.0/24', 'a')
+        trie.insert('192.168.128.0/17', 'b')
+        trie.insert('192.168.0.0/16', 'c')
+
+        self.assertEqual(trie.lookup('192.168.1.9'), 'a')
+        self.assertEqual(trie.lookup('192.168.200.1'), 'b')
+        self.assertEqual(trie.lookup('192.168.64.1'), 'c')
+        self.assertEqual(len(trie), 3)
+
+    def test_ipv6_and_mapped_ipv4(self):
+        trie = CidrTrie()
+        trie.insert('2001:db8::/32', 'block')
+        trie.insert('198.51.100.0/24', 'block')
+
+        self.assertEqual(trie.lookup('2001:db8:1::5'), 'block')
+        self.assertIsNone(trie.lookup('2001:db9::1'))
+        self.assertEqual(trie.lookup('::ffff:198.51.100.7'), 'block')
+        self.assertIsNone(trie.lookup('not an ip'))
+
+    def test_default_route_and_replacement(self):
+        trie = CidrTrie()
+        trie.insert('0.0.0.0/0', 'block')
+        trie.insert('0.0.0.0/0', 'allow')
+        # Host bits are ignored
+        trie.insert('172.16.5.4/12', 'block')
+
+        self.assertEqual(trie.lookup('8.8.8.8'), 'allow')
+        self.assertEqual(trie.lookup('172.31.0.1'), 'block')
+        self.assertEqual(len(trie), 2)
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(7)
+        networks = {}
+        for _ in range(300):
+            length = rng.choice([8, 12, 16, 20, 24, 28, 32])
+            network = ipaddress.ip_network((rng.getrandbits(32) & 0xF0FFFFFF, length), strict=False)
+            networks[network] = str(network)
+        trie = CidrTrie()
+        for network, value in networks.items():
+            trie.insert(network, value)
+
+        for _ in range(2000):
+            # Draw addresses inside the networks as well as random ones
+            if rng.random() < 0.5:
+                network = rng.choice(list(networks))
+                address = ipaddress.ip_address(int(network.network_address) + rng.randrange(network.num_addresses))
+            else:
+                address = ipaddress.ip_address(rng.getrandbits(32))
+            matches = [n for n in networks if address in n]
+            expected = str(max(matches, key=lambda n: n.prefixlen)) if matches else None
+            self.assertEqual(trie.lookup(str(address)), expected, str(address))
+
+if __name__ == '__main__':
+    unittest.main()
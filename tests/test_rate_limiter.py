@@ -0,0 +1,222 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import AsyncMock, patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+import asgi
+from routes.api_routes import api_bp
+from security.client_address import client_ip
+from security.rate_limiter import AdmissionControl, TokenBucketLimiter, retry_after_header
+
+class TestTokenBucketLimiter(unittest.TestCase):
+    def test_burst_then_rate(self):
+        limiter = TokenBucketLimiter(rate=2, burst=3, max_buckets=10)
+
+        self.assertEqual([limiter.acquire('ip', now=0) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(limiter.acquire('ip', now=0), 0.5)
+        # Half a second later, one token is back
+        self.assertEqual(limiter.acquire('ip', now=0.5), 0)
+        self.assertAlmostEqual(limiter.acquire('ip', now=0.5), 0.5)
+        # Other keys have their own bucket
+        self.assertEqual(limiter.acquire('other', now=0.5), 0)
+
+    def test_refill_is_capped_at_burst(self):
+        limiter = TokenBucketLimiter(rate=1, burst=2, max_buckets=10)
+        limiter.acquire('ip', now=0)
+
+        # Idle for an hour, the bucket holds 'burst' tokens, not 3600
+        self.assertEqual([limiter.acquire('ip', now=1.5 + 3600) for _ in range(2)], [0, 0])
+        self.assertGreater(limiter.acquire('ip', now=1.5 + 3600), 0)
+
+    def test_idle_buckets_are_evicted(self):
+        limiter = TokenBucketLimiter(rate=1, burst=5, max_buckets=10)
+        for ip in ('a', 'b', 'c'):
+            limiter.acquire(ip, now=0)
+        limiter.acquire('a', now=3)
+
+        # b and c are full again 5 seconds after their last use; a was used since
+        limiter.acquire('d', now=5)
+        self.assertEqual(len(limiter), 2)
+        self.assertEqual(limiter.evicted, 2)
+
+    def test_max_buckets_evicts_least_recently_used(self):
+        limiter = TokenBucketLimiter(rate=1, burst=5, max_buckets=2)
+        for ip in ('a', 'b', 'c'):
+            limiter.acquire(ip, now=0)
+
+        self.assertEqual(len(limiter), 2)
+        self.assertEqual(limiter.evicted, 1)
+
+class TestAdmissionControl(unittest.TestCase):
+    def setUp(self):
+        self.admission = AdmissionControl({'ip': (1, 2), 'app': (0, 0), 'key': (1, 1)}, shared=False)
+
+    def test_first_empty_bucket_rejects(self):
+        self.assertEqual(self.admission.check('10.0.0.1', 1, 'AAAA-BBBB'), 0)
+        # Same key, other IP: the key bucket is empty
+        self.assertGreater(self.admission.check('10.0.0.2', 1, ' aaaa-bbbb '), 0)
+        self.assertEqual(self.admission.rejected, {'ip': 0, 'app': 0, 'key': 1})
+        # Disabled scopes hold no buckets
+        self.assertEqual(self.admission.stats()['buckets'], {'ip': 2, 'key': 1})
+
+    def test_rejected_requests_take_no_later_tokens(self):
+        self.admission.check('10.0.0.1', 1, 'KEY-1')
+        self.admission.check('10.0.0.1', 1, 'KEY-2')
+        # The IP bucket is empty: KEY-3 keeps its token
+        self.assertGreater(self.admission.check('10.0.0.1', 1, 'KEY-3'), 0)
+        self.assertEqual(self.admission.check('10.0.0.9', 1, 'KEY-3'), 0)
+
+    def test_batch_charges_ip_once_and_each_item(self):
+        admission = AdmissionControl({'ip': (1, 1), 'app': (0, 0), 'key': (1, 2)}, shared=False)
+
+        self.assertEqual(admission.check_batch('10.0.0.1', [(1, 'KEY-1'), (1, 'KEY-2'), (1, 'KEY-1')]), 0)
+        # The IP bucket is empty after one batch, and KEY-1 after three uses
+        self.assertGreater(admission.check_batch('10.0.0.1', [(1, 'KEY-3')]), 0)
+        self.assertGreater(admission.check_batch('10.0.0.2', [(1, 'KEY-3'), (1, 'KEY-1')]), 0)
+        self.assertEqual(admission.rejected, {'ip': 1, 'app': 0, 'key': 1})
+
+    @patch('security.rate_limiter.rate_limit_model.acquire', return_value=0)
+    def test_shared_batch_takes_a_token_per_bucket(self, mock_acquire):
+        admission = AdmissionControl({'ip': (5, 10), 'app': (0, 0), 'key': (5, 10)}, shared=True)
+
+        self.assertEqual(admission.admit_batch('10.0.0.1', [(1, 'KEY-1'), (1, 'KEY-1'), (1, None)]), 0)
+        self.assertEqual([c[0][0] for c in mock_acquire.call_args_list], ['ip:10.0.0.1', 'key:KEY-1'])
+
+    @patch('security.rate_limiter.rate_limit_model.acquire')
+    def test_shared_buckets(self, mock_acquire):
+        admission = AdmissionControl({'ip': (5, 10), 'app': (0, 0), 'key': (0, 0)}, shared=True)
+        mock_acquire.return_value = 0.25
+
+        self.assertEqual(admission.admit('10.0.0.1', None, None), 0.25)
+        mock_acquire.assert_called_once_with('ip:10.0.0.1', 5, 10)
+
+    @patch('security.rate_limiter.rate_limit_model.acquire')
+    def test_shared_errors_admit(self, mock_acquire):
+        admission = AdmissionControl({'ip': (5, 10), 'app': (0, 0), 'key': (0, 0)}, shared=True)
+        mock_acquire.side_effect = RuntimeError("connection refused")
+
+        self.assertEqual(admission.admit('10.0.0.1', None, None), 0)
+        self.assertEqual(admission.stats()['shared_errors'], 1)
+
+    def test_retry_after_header(self):
+        self.assertEqual(retry_after_header(0.2), '1')
+        self.assertEqual(retry_after_header(4.1), '5')
+
+class TestClientIp(unittest.TestCase):
+    def test_forwarded_for_needs_trusted_proxies(self):
+        with patch('security.client_address._warned', False), patch('builtins.print') as mock_print:
+            self.assertEqual(client_ip('10.0.0.5', '198.51.100.1', trusted_hops=0), '10.0.0.5')
+            self.assertEqual(client_ip('10.0.0.5', '198.51.100.2', trusted_hops=0), '10.0.0.5')
+        # A proxy in front of an unconfigured API is reported, once
+        mock_print.assert_called_once()
+        self.assertIn('TRUSTED_PROXY_HOPS', mock_print.call_args[0][0])
+        self.assertEqual(client_ip('10.0.0.5', None, trusted_hops=1), '10.0.0.5')
+
+    def test_client_entries_are_skipped(self):
+        # The client wrote the first entry, the proxy appended the address it saw
+        self.assertEqual(client_ip('10.0.0.5', '192.0.2.66, 198.51.100.1', trusted_hops=1), '198.51.100.1')
+        self.assertEqual(client_ip('10.0.0.6', '192.0.2.66, 198.51.100.1, 10.0.0.5', trusted_hops=2), '198.51.100.1')
+        self.assertEqual(client_ip('10.0.0.6', '198.51.100.1', trusted_hops=2), '10.0.0.6')
+
+class TestValidateRateLimit(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(api_bp)
+        self.client = app.test_client()
+
+    @patch('routes.api_routes.validate_license_request')
+    @patch('routes.api_routes.rate_limiter.admit', return_value=2.5)
+    def test_over_limit_is_429_before_validation(self, mock_admit, mock_validate):
+        response = self.client.post('/api/v1/validate', json={'license_key': 'K', 'hwid': 'H', 'app_id': 3},
+                                    environ_base={'REMOTE_ADDR': '198.51.100.1'})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '3')
+        mock_admit.assert_called_once_with('198.51.100.1', 3, 'K')
+        mock_validate.assert_not_called()
+
+    @patch('routes.api_routes.validate_license_request')
+    @patch('routes.api_routes.rate_limiter.admit', return_value=0)
+    def test_spoofed_forwarded_for_is_ignored(self, mock_admit, mock_validate):
+        mock_validate.side_effect = ValueError("License not found.")
+        for forwarded_for in ('192.0.2.1', '192.0.2.2, 203.0.113.50'):
+            self.client.post('/api/v1/validate', json={'license_key': 'K', 'hwid': 'H'},
+                             headers={'X-Forwarded-For': forwarded_for}, environ_base={'REMOTE_ADDR': '203.0.113.50'})
+        with patch('security.client_address.Config.TRUSTED_PROXY_HOPS', 1):
+            self.client.post('/api/v1/validate', json={'license_key': 'K', 'hwid': 'H'},
+                             headers={'X-Forwarded-For': '192.0.2.3, 198.51.100.4'}, environ_base={'REMOTE_ADDR': '10.0.0.5'})
+
+        self.assertEqual([c[0][0] for c in mock_admit.call_args_list], ['203.0.113.50', '203.0.113.50', '198.51.100.4'])
+
+    @patch('routes.api_routes.validate_license_batch')
+    @patch('routes.api_routes.rate_limiter.admit_batch', return_value=1.5)
+    def test_batch_over_limit_is_429(self, mock_admit_batch, mock_validate_batch):
+        items = [{'license_key': 'K1', 'hwid': 'H', 'app_id': 3}, {'license_key': 'K2', 'hwid': 'H'}, 'junk']
+
+        response = self.client.post('/api/v1/validate/batch', json={'items': items},
+                                    environ_base={'REMOTE_ADDR': '198.51.100.1'})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '2')
+        mock_admit_batch.assert_called_once_with('198.51.100.1', [(3, 'K1'), (None, 'K2'), (None, None)])
+        mock_validate_batch.assert_not_called()
+
+    @patch('routes.api_routes.refresh_license_request')
+    @patch('routes.api_routes.rate_limiter.admit', return_value=0.5)
+    def test_refresh_over_limit_is_429(self, mock_admit, mock_refresh):
+        response = self.client.post('/api/v1/refresh', json={'token': 'T', 'hwid': 'H'},
+                                    environ_base={'REMOTE_ADDR': '198.51.100.1'})
+
+        self.assertEqual(response.status_code, 429)
+        mock_admit.assert_called_once_with('198.51.100.1', None, None)
+        mock_refresh.assert_not_called()
+
+    @patch('asgi.refresh_license_request', new_callable=AsyncMock)
+    def test_asgi_refresh_over_limit_is_429(self, mock_refresh):
+        admission = AdmissionControl({'ip': (1, 1), 'app': (0, 0), 'key': (0, 0)}, shared=False)
+        admission.check('203.0.113.7', None, None)
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'{"token": "T", "hwid": "H"}', 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/api/v1/refresh', 'headers': [], 'client': ('203.0.113.7', 51000)}
+        with patch('asgi.rate_limiter.get_admission_control', return_value=admission):
+            asyncio.run(asgi.app(scope, receive, send))
+
+        self.assertEqual(sent[0]['status'], 429)
+        self.assertIn((b'retry-after', b'1'), sent[0]['headers'])
+        mock_refresh.assert_not_awaited()
+
+    @patch('asgi.validate_license_request', new_callable=AsyncMock)
+    def test_asgi_over_limit_is_429(self, mock_validate):
+        admission = AdmissionControl({'ip': (1, 1), 'app': (0, 0), 'key': (0, 0)}, shared=False)
+        admission.check('203.0.113.7', None, None)
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'{"license_key": "K", "hwid": "H"}', 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/api/v1/validate', 'headers': [], 'client': ('203.0.113.7', 51000)}
+        with patch('asgi.rate_limiter.get_admission_control', return_value=admission):
+            asyncio.run(asgi.app(scope, receive, send))
+
+        self.assertEqual(sent[0]['status'], 429)
+        self.assertIn((b'retry-after', b'1'), sent[0]['headers'])
+        self.assertEqual(json.loads(sent[1]['body']), {'error': 'Too many requests'})
+        mock_validate.assert_not_awaited()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import hashlib
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+import jwt
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import Config
+from security import jwt_handler
+from services import signing_keys
+from utils.snippet_builder import generate_client_snippet
+
+APP = {'id': 1, 'name': 'App', 'app_secret': 's' * 64, 'created_at': None}
+
+def _key(key_id, algorithm='EdDSA', retired=False):
+    return {
+        'id': key_id,
+        'app_id': 1,
+        'kid': f'kid-{key_id}',
+        'algorithm': algorithm,
+        'private_key': jwt_handler.generate_signing_key(algorithm),
+        'created_at': datetime(2024, 1, 1),
+        'retired_at': datetime(2024, 1, 2) if retired else None
+    }
+
+def _verify(token, jwks):
+    kid = jwt.get_unverified_header(token)['kid']
+    jwk = next(key for key in jwks['keys'] if key['kid'] == kid)
+    return jwt.decode(token, jwt.PyJWK(jwk).key, algorithms=[jwk['alg']])
+
+class TestJwtHandlerKeys(unittest.TestCase):
+    def test_round_trip_through_jwk(self):
+        for algorithm in jwt_handler.SIGNING_ALGORITHMS:
+            private_key = jwt_handler.load_signing_key(jwt_handler.generate_signing_key(algorithm))
+            jwk = jwt_handler.public_jwk(private_key, 'kid-1', algorithm)
+            token = jwt_handler.generate_token({'license_id': 1}, private_key, algorithm=algorithm, headers={'kid': 'kid-1'})
+
+            self.assertNotIn('d', jwk)  # Public half only
+            self.assertEqual(jwt.get_unverified_header(token)['kid'], 'kid-1')
+            self.assertEqual(jwt.decode(token, jwt.PyJWK(jwk).key, algorithms=[algorithm])['license_id'], 1)
+
+    def test_unsupported_algorithm(self):
+        with self.assertRaises(ValueError):
+            jwt_handler.generate_signing_key('RS256')
+
+@patch.object(Config, 'TOKEN_SIGNING_ALGORITHM', 'EdDSA')
+@patch('services.signing_keys.app_registry.get_app', return_value=APP)
+@patch('services.signing_keys.signing_key_model.create_key')
+@patch('services.signing_keys.signing_key_model.get_publishable_keys')
+class TestSigningKeys(unittest.TestCase):
+    def setUp(self):
+        signing_keys.clear()
+
+    def tearDown(self):
+        signing_keys.clear()
+
+    def test_first_key_is_created_and_cached(self, mock_get_keys, mock_create, mock_get_app):
+        key = _key(1)
+        mock_get_keys.side_effect = [[], [key]]
+
+        token = signing_keys.sign_token({'license_id': 10, 'app_id': 1})
+        jwks = signing_keys.get_jwks(1)
+
+        self.assertEqual(_verify(token, jwks)['license_id'], 10)
+        self.assertEqual([k['kid'] for k in jwks['keys']], ['kid-1'])
+        mock_create.assert_called_once()
+        self.assertEqual(mock_create.call_args[0][0], 1)
+        self.assertEqual(mock_create.call_args[0][2], 'EdDSA')
+        # Second signature and the JWKS were served from the keyset cache
+        self.assertEqual(mock_get_keys.call_count, 2)
+
+    def test_jwks_does_not_create_a_key(self, mock_get_keys, mock_create, mock_get_app):
+        key = _key(1)
+        mock_get_keys.side_effect = [[], [], [key]]
+
+        self.assertEqual(signing_keys.get_jwks(1), {'keys': []})
+        mock_create.assert_not_called()
+
+        # The first signature creates the key and replaces the cached empty keyset
+        token = signing_keys.sign_token({'license_id': 10, 'app_id': 1})
+        jwks = signing_keys.get_jwks(1)
+
+        self.assertEqual(_verify(token, jwks)['license_id'], 10)
+        mock_create.assert_called_once()
+
+    def test_retired_key_stays_published(self, mock_get_keys, mock_create, mock_get_app):
+        retired, active = _key(1, retired=True), _key(2, algorithm='ES256')
+        mock_get_keys.return_value = [retired, active]
+
+        token = signing_keys.sign_token({'license_id': 10, 'app_id': 1})
+        jwks = signing_keys.get_jwks(1)
+
+        self.assertEqual(jwt.get_unverified_header(token), {'alg': 'ES256', 'kid': 'kid-2', 'typ': 'JWT'})
+        self.assertEqual([k['kid'] for k in jwks['keys']], ['kid-1', 'kid-2'])
+        mock_create.assert_not_called()
+
+    def test_unknown_app(self, mock_get_keys, mock_create, mock_get_app):
+        mock_get_app.return_value = None
+
+        self.assertIsNone(signing_keys.sign_token({'license_id': 10, 'app_id': 99}))
+        self.assertIsNone(signing_keys.get_jwks(99))
+        mock_get_keys.assert_not_called()
+
+    def test_hs256_signs_with_app_secret(self, mock_get_keys, mock_create, mock_get_app):
+        with patch.object(Config, 'TOKEN_SIGNING_ALGORITHM', 'HS256'):
+            token = signing_keys.sign_token({'license_id': 10, 'app_id': 1})
+            self.assertEqual(signing_keys.get_jwks(1), {'keys': []})
+
+        self.assertEqual(jwt_handler.validate_token(token, APP['app_secret'])['license_id'], 10)
+        mock_get_keys.assert_not_called()
+
+class TestClientSnippetVerification(unittest.TestCase):
+    def setUp(self):
+        namespace = {}
+        exec(generate_client_snippet(1), namespace)
+        self.verify_token = namespace['verify_token']
+
+        private_key = jwt_handler.load_signing_key(jwt_handler.generate_signing_key('EdDSA'))
+        self.jwks = {'keys': [jwt_handler.public_jwk(private_key, 'kid-1', 'EdDSA')]}
+        self.private_key = private_key
+
+    def _token(self, hwid, app_id=1):
+        payload = {'license_id': 10, 'app_id': app_id, 'hwid': hashlib.sha256(hwid.strip().lower().encode()).hexdigest()}
+        return jwt_handler.generate_token(payload, self.private_key, algorithm='EdDSA', headers={'kid': 'kid-1'})
+
+    def test_verifies_locally(self):
+        self.assertEqual(self.verify_token(self._token('Machine-1'), self.jwks, 'machine-1 ')['license_id'], 10)
+
+    def test_rejects_other_machine_app_or_key(self):
+        self.assertIsNone(self.verify_token(self._token('machine-2'), self.jwks, 'machine-1'))
+        self.assertIsNone(self.verify_token(self._token('machine-1', app_id=2), self.jwks, 'machine-1'))
+        other_key = jwt_handler.load_signing_key(jwt_handler.generate_signing_key('EdDSA'))
+        self.jwks['keys'] = [jwt_handler.public_jwk(other_key, 'kid-1', 'EdDSA')]
+        self.assertIsNone(self.verify_token(self._token('machine-1'), self.jwks, 'machine-1'))
+
+class TestClientSnippetTrustAnchor(unittest.TestCase):
+    def setUp(self):
+        self.private_key = jwt_handler.load_signing_key(jwt_handler.generate_signing_key('EdDSA'))
+        jwks = {'keys': [jwt_handler.public_jwk(self.private_key, 'kid-1', 'EdDSA')]}
+        self.namespace = {}
+        exec(generate_client_snippet(1, 'https://keypilot.example', jwks), self.namespace)
+        self.namespace['get_hwid'] = lambda: 'machine-1'
+        self.namespace['requests'] = MagicMock()
+        self.namespace['requests'].post.side_effect = Exception("offline")
+
+    def _token(self, private_key, kid='kid-1'):
+        payload = {'license_id': 10, 'app_id': 1, 'hwid': hashlib.sha256(b'machine-1').hexdigest()}
+        return jwt_handler.generate_token(payload, private_key, algorithm='EdDSA', headers={'kid': kid})
+
+    def test_cached_token_verified_with_embedded_keys(self):
+        self.namespace['load_cache'] = lambda: {'license_key': 'KEY', 'token': self._token(self.private_key)}
+
+        is_valid, claims = self.namespace['validate_license']('KEY')
+
+        self.assertTrue(is_valid)
+        self.assertEqual(claims['license_id'], 10)
+        self.namespace['requests'].post.assert_not_called()
+
+    def test_forged_cache_is_not_trusted(self):
+        # A self-signed token next to its own public key in the writable cache
+        forger = jwt_handler.load_signing_key(jwt_handler.generate_signing_key('EdDSA'))
+        self.namespace['load_cache'] = lambda: {
+            'license_key': 'KEY', 'token': self._token(forger),
+            'jwks': {'keys': [jwt_handler.public_jwk(forger, 'kid-1', 'EdDSA')]}
+        }
+
+        is_valid, _ = self.namespace['validate_license']('KEY')
+
+        self.assertFalse(is_valid)
+        self.namespace['requests'].post.assert_called_once()
+
+    def test_rotated_keys_are_fetched_over_tls_only(self):
+        namespace = {}
+        exec(generate_client_snippet(1, 'http://keypilot.example'), namespace)
+        namespace['requests'] = MagicMock()
+
+        self.assertEqual(namespace['fetch_jwks'](), {'keys': []})
+        namespace['requests'].get.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import patch
+import threading
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2 import errors
+from services.telemetry_writer import TelemetryWriter
+
+class TestTelemetryWriter(unittest.TestCase):
+    def _attempt(self, i, country=None):
+        return (1, f"KEY-{i}", f"198.51.100.{i}", 'hwid', 'UA', country, None, 'license_not_found')
+
+    @patch('services.telemetry_writer.geolocation.enqueue')
+    @patch('services.telemetry_writer.tracking_model.insert_telemetry_batch')
+    def test_flush_writes_one_batch_and_schedules_geolocation(self, mock_insert, mock_enqueue):
+        writer = TelemetryWriter(batch_size=100, flush_interval=60, max_buffer=1000)
+        writer.record_activation(10, '203.0.113.7', 'hwid', 'UA', None, None)
+        writer.record_failed_attempt(*self._attempt(1))
+        writer.record_failed_attempt(*self._attempt(2, country='France'))
+
+        self.assertEqual(writer.flush(), 3)
+        writer.stop()
+
+        mock_insert.assert_called_once()
+        activations, attempts = mock_insert.call_args[0]
+        self.assertEqual(len(activations), 1)
+        self.assertEqual(len(attempts), 2)
+        # Only rows with a pending location are queued for enrichment
+        enqueued = {call[0][0] for call in mock_enqueue.call_args_list}
+        self.assertEqual(enqueued, {'203.0.113.7', '198.51.100.1'})
+        self.assertEqual(writer.stats()['written'], 3)
+
+    @patch('services.telemetry_writer.geolocation.enqueue')
+    @patch('services.telemetry_writer.tracking_model.insert_telemetry_batch')
+    def test_size_threshold_triggers_background_flush(self, mock_insert, mock_enqueue):
+        flushed = threading.Event()
+        mock_insert.side_effect = lambda activations, attempts: flushed.set()
+
+        writer = TelemetryWriter(batch_size=3, flush_interval=60, max_buffer=1000)
+        for i in range(3):
+            writer.record_failed_attempt(*self._attempt(i))
+
+        self.assertTrue(flushed.wait(5))
+        writer.stop()
+
+    @patch('services.telemetry_writer.geolocation.enqueue')
+    @patch('services.telemetry_writer.tracking_model.insert_telemetry_batch')
+    def test_drop_policies(self, mock_insert, mock_enqueue):
+        for policy, kept in (('oldest', ['KEY-2', 'KEY-3']), ('newest', ['KEY-0', 'KEY-1'])):
+            writer = TelemetryWriter(batch_size=100, flush_interval=60, max_buffer=2, drop_policy=policy)
+            for i in range(4):
+                writer.record_failed_attempt(*self._attempt(i))
+            self.assertEqual(writer.stats()['dropped'], 2)
+
+            writer.stop()
+            attempts = mock_insert.call_args[0][1]
+            self.assertEqual([row[1] for row in attempts], kept)
+
+    @patch('services.telemetry_writer.geolocation.enqueue')
+    @patch('services.telemetry_writer.tracking_model.log_failed_attempt')
+    @patch('services.telemetry_writer.tracking_model.insert_telemetry_batch')
+    def test_failed_batch_falls_back_to_row_by_row(self, mock_insert, mock_log_fail, mock_enqueue):
+        mock_insert.side_effect = Exception('insert or update on table "failed_attempts" violates foreign key constraint')
+        mock_log_fail.side_effect = [1, Exception('foreign key violation')]
+
+        writer = TelemetryWriter(batch_size=100, flush_interval=60, max_buffer=1000)
+        writer.record_failed_attempt(*self._attempt(1))
+        writer.record_failed_attempt(*self._attempt(2))
+
+        self.assertEqual(writer.flush(), 1)
+        writer.stop()
+        stats = writer.stats()
+        self.assertEqual(stats['written'], 1)
+        self.assertEqual(stats['failed'], 1)
+
+    @patch('services.telemetry_writer.geolocation.enqueue')
+    @patch('services.telemetry_writer.partition_maintenance.ensure_upcoming')
+    @patch('services.telemetry_writer.tracking_model.insert_telemetry_batch')
+    def test_missing_partition_is_created_and_batch_retried(self, mock_insert, mock_ensure, mock_enqueue):
+        mock_insert.side_effect = [
+            errors.CheckViolation('no partition of relation "failed_attempts" found for row'), None
+        ]
+
+        writer = TelemetryWriter(batch_size=100, flush_interval=60, max_buffer=1000)
+        writer.record_failed_attempt(*self._attempt(1))
+
+        self.assertEqual(writer.flush(), 1)
+        writer.stop()
+        mock_ensure.assert_called_once_with()
+        self.assertEqual(mock_insert.call_count, 2)
+
+    def test_invalid_drop_policy(self):
+        with self.assertRaises(ValueError):
+            TelemetryWriter(drop_policy='random')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import Config
+from algorithms.hwid_parser import parse_hwid
+from security import jwt_handler
+from services import signing_keys, async_validation_service
+from services.revocation_list import RevocationList
+from services.validation_service import refresh_license_request
+
+APP = {'id': 1, 'name': 'App', 'app_secret': 's' * 64, 'created_at': None}
+
+class TestRevocationList(unittest.TestCase):
+    @patch('services.revocation_list.license_model.get_revoked_license_ids')
+    def test_load_and_revoke(self, mock_get_revoked):
+        mock_get_revoked.return_value = [3, 5]
+        revocations = RevocationList(refresh_interval=60)
+
+        self.assertEqual(revocations.load(), 2)
+        self.assertTrue(revocations.is_revoked(3))
+        self.assertFalse(revocations.is_revoked(4))
+
+        revocations.revoke(4)
+        self.assertTrue(revocations.is_revoked(4))
+
+        # A reload replaces the set with what the database says
+        mock_get_revoked.return_value = [5]
+        revocations.load()
+        self.assertFalse(revocations.is_revoked(3))
+        self.assertEqual(revocations.stats()['loads'], 2)
+
+    @patch('services.revocation_list.license_model.get_revoked_license_ids')
+    def test_revocation_during_load_is_kept(self, mock_get_revoked):
+        revocations = RevocationList(refresh_interval=60)
+        query_started = threading.Event()
+        release_query = threading.Event()
+
+        def slow_query():
+            query_started.set()
+            release_query.wait(5)
+            return [1]  # Snapshot taken before license 2 was revoked
+        mock_get_revoked.side_effect = slow_query
+
+        loader = threading.Thread(target=revocations.load)
+        loader.start()
+        query_started.wait(5)
+        revocations.revoke(2)
+        release_query.set()
+        loader.join(5)
+
+        self.assertTrue(revocations.is_revoked(1))
+        self.assertTrue(revocations.is_revoked(2))
+
+@patch.object(Config, 'TOKEN_SIGNING_ALGORITHM', 'EdDSA')
+@patch('services.signing_keys.app_registry.get_app', return_value=APP)
+@patch('services.validation_service.revocation_list.is_revoked', return_value=False)
+class TestRefreshLicenseRequest(unittest.TestCase):
+    def setUp(self):
+        signing_keys.clear()
+        signing_keys.remember(1, signing_keys.build_keyset([{
+            'kid': 'kid-1', 'algorithm': 'EdDSA', 'retired_at': None,
+            'private_key': jwt_handler.generate_signing_key('EdDSA')
+        }]))
+        self.payload = {'license_id': 10, 'app_id': 1, 'type': 'lifetime', 'expires_at': None, 'hwid': parse_hwid('machine-1')}
+
+    def tearDown(self):
+        signing_keys.clear()
+
+    def test_refresh_reissues_payload(self, mock_is_revoked, mock_get_app):
+        token = signing_keys.sign_token(self.payload)
+
+        refreshed = refresh_license_request({'token': token, 'hwid': 'machine-1'})
+
+        self.assertEqual(refreshed, self.payload)
+        mock_is_revoked.assert_called_once_with(10)
+
+    def test_revoked_license(self, mock_is_revoked, mock_get_app):
+        mock_is_revoked.return_value = True
+        token = signing_keys.sign_token(self.payload)
+
+        with self.assertRaises(ValueError) as context:
+            refresh_license_request({'token': token, 'hwid': 'machine-1'})
+        self.assertEqual(str(context.exception), "License is no longer valid.")
+
+    def test_rejected_tokens(self, mock_is_revoked, mock_get_app):
+        token = signing_keys.sign_token(self.payload)
+        expired_trial = signing_keys.sign_token(dict(self.payload, type='trial', expires_at=(datetime.utcnow() - timedelta(days=1)).isoformat()))
+        foreign_key = jwt_handler.load_signing_key(jwt_handler.generate_signing_key('EdDSA'))
+        forged = jwt_handler.generate_token(self.payload, foreign_key, algorithm='EdDSA', headers={'kid': 'kid-1'})
+        expired = jwt_handler.generate_token(self.payload, signing_keys.lookup(1)['active']['private_key'],
+                                             algorithm='EdDSA', expiration_minutes=-1, headers={'kid': 'kid-1'})
+
+        for payload in (
+            {'token': token},
+            {'token': token, 'hwid': 'machine-2'},
+            {'token': forged, 'hwid': 'machine-1'},
+            {'token': expired, 'hwid': 'machine-1'},
+            {'token': expired_trial, 'hwid': 'machine-1'},
+            {'token': 'not-a-token', 'hwid': 'machine-1'},
+        ):
+            with self.assertRaises(ValueError):
+                refresh_license_request(payload)
+
+    @patch('services.async_validation_service.app_registry.lookup', return_value=(True, APP))
+    def test_async_refresh(self, mock_lookup, mock_is_revoked, mock_get_app):
+        token = signing_keys.sign_token(self.payload)
+
+        refreshed = asyncio.run(async_validation_service.refresh_license_request({'token': token, 'hwid': 'machine-1'}))
+
+        self.assertEqual(refreshed, self.payload)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ttl_cache import TTLCache
+from services.geolocation import CachingResolver
+
+class TestTTLCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')  # 'a' becomes most recently used
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    @patch('utils.ttl_cache.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=5)
+
+        mock_monotonic.return_value = 1010.0
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['size'], 1)
+
+class TestCachingResolver(unittest.TestCase):
+    def test_exact_and_prefix_hits(self):
+        backend = MagicMock()
+        backend.resolve.return_value = ('France', 'Paris')
+        resolver = CachingResolver(backend, maxsize=100, ttl=60, negative_ttl=5, prefix_keys=True)
+
+        self.assertEqual(resolver.resolve('203.0.113.7'), ('France', 'Paris'))
+        self.assertEqual(resolver.resolve('203.0.113.7'), ('France', 'Paris'))
+        # Same /24: served from the prefix entry
+        self.assertEqual(resolver.resolve('203.0.113.99'), ('France', 'Paris'))
+        # Same /48 for IPv6 after one lookup
+        resolver.resolve('2001:db8:1::1')
+        resolver.resolve('2001:db8:1:ffff::2')
+
+        self.assertEqual(backend.resolve.call_count, 2)
+        stats = resolver.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['prefix_hits'], 2)
+        self.assertEqual(stats['misses'], 2)
+
+    def test_failures_are_negatively_cached_by_exact_ip(self):
+        backend = MagicMock()
+        backend.resolve.return_value = None
+        resolver = CachingResolver(backend, maxsize=100, ttl=60, negative_ttl=5, prefix_keys=True)
+
+        self.assertIsNone(resolver.resolve('198.51.100.1'))
+        self.assertIsNone(resolver.resolve('198.51.100.1'))
+        self.assertEqual(backend.resolve.call_count, 1)
+        self.assertEqual(resolver.stats()['negative_hits'], 1)
+
+        # A failure does not poison the rest of the prefix
+        resolver.resolve('198.51.100.2')
+        self.assertEqual(backend.resolve.call_count, 2)
+
+    def test_prefix_keys_disabled(self):
+        backend = MagicMock()
+        backend.resolve.return_value = ('Canada', 'Montréal')
+        resolver = CachingResolver(backend, maxsize=100, ttl=60, negative_ttl=5, prefix_keys=False)
+
+        resolver.resolve('192.0.2.1')
+        resolver.resolve('192.0.2.2')
+        self.assertEqual(backend.resolve.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.validation_service import validate_license_batch
+from algorithms.hwid_parser import parse_hwid
+
+def _record(license_id, key, status, hwid=None):
+    return {
+        'license': {
+            'id': license_id,
+            'app_id': 1,
+            'license_key': key,
+            'status': status,
+            'type': 'lifetime',
+            'created_at': '2023-01-01',
+            'duration_days': None
+        },
+        'machine': {'license_id': license_id, 'hwid': parse_hwid(hwid)} if hwid else None
+    }
+
+@patch('services.validation_service.telemetry_writer.record_activation')
+@patch('services.validation_service.telemetry_writer.record_failed_attempt')
+@patch('services.validation_service.app_registry.get_app')
+@patch('services.validation_service.license_model.mark_licenses_used')
+@patch('services.validation_service.license_model.activate_licenses')
+@patch('services.validation_service.license_model.get_licenses_for_validation')
+class TestValidationBatch(unittest.TestCase):
+    def setUp(self):
+        self.headers = {'User-Agent': 'FleetManager'}
+        self.ip = '10.0.0.1'
+
+    def test_mixed_batch(self, mock_get_records, mock_activate, mock_mark_used, mock_get_app, mock_log_fail, mock_log_act):
+        mock_get_records.return_value = {
+            'AAAA-AAAA-AAAA-AAAA': _record(1, 'AAAA-AAAA-AAAA-AAAA', 'used', 'seat-1'),
+            'BBBB-BBBB-BBBB-BBBB': _record(2, 'BBBB-BBBB-BBBB-BBBB', 'active'),
+            'CCCC-CCCC-CCCC-CCCC': _record(3, 'CCCC-CCCC-CCCC-CCCC', 'revoked', 'seat-3'),
+        }
+        mock_activate.return_value = {2}
+        mock_get_app.return_value = {'id': 1}
+
+        results = validate_license_batch([
+            {'license_key': 'AAAA-AAAA-AAAA-AAAA', 'hwid': 'seat-1', 'app_id': 1},
+            {'license_key': 'BBBB-BBBB-BBBB-BBBB', 'hwid': 'seat-2', 'app_id': 1},
+            {'license_key': 'CCCC-CCCC-CCCC-CCCC', 'hwid': 'seat-3', 'app_id': 1},
+            {'license_key': 'DDDD-DDDD-DDDD-DDDD', 'hwid': 'seat-4', 'app_id': 1},
+            {'license_key': 'AAAA-AAAA-AAAA-AAAA'},
+        ], self.headers, self.ip)
+
+        self.assertEqual(results[0]['payload']['license_id'], 1)
+        self.assertEqual(results[1]['payload']['license_id'], 2)
+        self.assertEqual(results[2], {'error': 'License is revoked.'})
+        self.assertEqual(results[3], {'error': 'License not found.'})
+        self.assertEqual(results[4], {'error': 'Missing license_key or hwid.'})
+
+        # One set-based read and one set-based activation for the whole batch
+        mock_get_records.assert_called_once()
+        self.assertEqual(sorted(mock_get_records.call_args[0][0]), ['AAAA-AAAA-AAAA-AAAA', 'BBBB-BBBB-BBBB-BBBB', 'CCCC-CCCC-CCCC-CCCC', 'DDDD-DDDD-DDDD-DDDD'])
+        mock_activate.assert_called_once_with([(2, parse_hwid('seat-2'))])
+        mock_log_act.assert_called_once_with(2, self.ip, parse_hwid('seat-2'), 'FleetManager', None, None)
+        reasons = [call[0][7] for call in mock_log_fail.call_args_list]
+        self.assertEqual(sorted(reasons), ['license_not_found', 'license_revoked'])
+
+    def test_same_license_twice_in_batch(self, mock_get_records, mock_activate, mock_mark_used, mock_get_app, mock_log_fail, mock_log_act):
+        mock_get_records.return_value = {
+            'BBBB-BBBB-BBBB-BBBB': _record(2, 'BBBB-BBBB-BBBB-BBBB', 'active'),
+        }
+        mock_activate.return_value = {2}
+
+        results = validate_license_batch([
+            {'license_key': 'BBBB-BBBB-BBBB-BBBB', 'hwid': 'seat-2'},
+            {'license_key': 'BBBB-BBBB-BBBB-BBBB', 'hwid': 'seat-2'},
+            {'license_key': 'BBBB-BBBB-BBBB-BBBB', 'hwid': 'intruder'},
+        ], self.headers, self.ip)
+
+        self.assertIn('payload', results[0])
+        self.assertIn('payload', results[1])
+        self.assertEqual(results[2], {'error': 'License is already used on another machine.'})
+        mock_activate.assert_called_once_with([(2, parse_hwid('seat-2'))])
+
+    def test_lost_activation_race_is_rechecked(self, mock_get_records, mock_activate, mock_mark_used, mock_get_app, mock_log_fail, mock_log_act):
+        mock_get_records.side_effect = [
+            {'BBBB-BBBB-BBBB-BBBB': _record(2, 'BBBB-BBBB-BBBB-BBBB', 'active')},
+            {'BBBB-BBBB-BBBB-BBBB': _record(2, 'BBBB-BBBB-BBBB-BBBB', 'used', 'other-seat')},
+        ]
+        mock_activate.return_value = set()
+
+        results = validate_license_batch([
+            {'license_key': 'BBBB-BBBB-BBBB-BBBB', 'hwid': 'seat-2'},
+        ], self.headers, self.ip)
+
+        self.assertEqual(results[0], {'error': 'License is already used on another machine.'})
+        mock_log_act.assert_not_called()
+        self.assertEqual(mock_log_fail.call_args[0][7], 'already_used_elsewhere')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,22 +12,20 @@ from services.validation_service import validate_license_request
 class TestValidationExpiration(unittest.TestCase):
     def setUp(self):
         self.payload = {
-            'license_key': 'TEST-KEY-1234',
+            'license_key': 'TEST-KEY0-1234-ABCD',
             'hwid': 'hwid-1234',
             'app_id': 1
         }
         self.headers = {'User-Agent': 'TestAgent'}
         self.ip = '127.0.0.1'
 
-    @patch('services.validation_service.requests.get')
-    @patch('services.validation_service.license_model.get_license_by_key')
-    @patch('services.validation_service.machine_model.get_machine_by_license_id')
-    @patch('services.validation_service.machine_model.add_machine')
+    @patch('services.validation_service.telemetry_writer.record_activation')
+    @patch('services.validation_service.license_model.get_license_for_validation')
+    @patch('services.validation_service.license_model.activate_license')
     @patch('services.validation_service.license_model.update_license_status')
-    @patch('services.validation_service.tracking_model.log_activation')
-    @patch('services.validation_service.tracking_model.log_failed_attempt')
+    @patch('services.validation_service.telemetry_writer.record_failed_attempt')
     @patch('services.validation_service.hwid_parser.parse_hwid')
-    def test_validate_expired_trial(self, mock_parse_hwid, mock_log_fail, mock_log_act, mock_update, mock_add, mock_get_machine, mock_get_license, mock_requests):
+    def test_validate_expired_trial(self, mock_parse_hwid, mock_log_fail, mock_update, mock_activate, mock_get_license, mock_record_act):
         mock_parse_hwid.return_value = 'normalized-hwid'
 
         # Expired trial license
@@ -35,36 +33,34 @@ class TestValidationExpiration(unittest.TestCase):
         created_at = datetime.now(timezone.utc) - timedelta(days=10)
 
         mock_get_license.return_value = {
-            'id': 10,
-            'app_id': 1,
-            'license_key': 'TEST-KEY-1234',
-            'status': 'active',
-            'type': 'trial',
-            'created_at': created_at,
-            'duration_days': 5
+            'license': {
+                'id': 10,
+                'app_id': 1,
+                'license_key': 'TEST-KEY0-1234-ABCD',
+                'status': 'active',
+                'type': 'trial',
+                'created_at': created_at,
+                'duration_days': 5
+            },
+            'machine': None # First activation
         }
 
-        # Mock geolocation (fail gracefully)
-        mock_requests.return_value.status_code = 500
-
         with self.assertRaises(ValueError) as cm:
             validate_license_request(self.payload, self.headers, self.ip)
 
         self.assertIn("La période d'essai de cette licence a expiré.", str(cm.exception))
 
         mock_log_fail.assert_called_with(
-            1, 'TEST-KEY-1234', self.ip, 'normalized-hwid', 'TestAgent', 'Unknown', 'Unknown', 'license_expired'
+            1, 'TEST-KEY0-1234-ABCD', self.ip, 'normalized-hwid', 'TestAgent', None, None, 'license_expired'
         )
 
-    @patch('services.validation_service.requests.get')
-    @patch('services.validation_service.license_model.get_license_by_key')
-    @patch('services.validation_service.machine_model.get_machine_by_license_id')
-    @patch('services.validation_service.machine_model.add_machine')
+    @patch('services.validation_service.telemetry_writer.record_activation')
+    @patch('services.validation_service.license_model.get_license_for_validation')
+    @patch('services.validation_service.license_model.activate_license')
     @patch('services.validation_service.license_model.update_license_status')
-    @patch('services.validation_service.tracking_model.log_activation')
-    @patch('services.validation_service.tracking_model.log_failed_attempt')
+    @patch('services.validation_service.telemetry_writer.record_failed_attempt')
     @patch('services.validation_service.hwid_parser.parse_hwid')
-    def test_validate_valid_trial(self, mock_parse_hwid, mock_log_fail, mock_log_act, mock_update, mock_add, mock_get_machine, mock_get_license, mock_requests):
+    def test_validate_valid_trial(self, mock_parse_hwid, mock_log_fail, mock_update, mock_activate, mock_get_license, mock_record_act):
         mock_parse_hwid.return_value = 'normalized-hwid'
 
         # Valid trial license
@@ -72,17 +68,19 @@ class TestValidationExpiration(unittest.TestCase):
         created_at = datetime.now(timezone.utc) - timedelta(days=1)
 
         mock_get_license.return_value = {
-            'id': 10,
-            'app_id': 1,
-            'license_key': 'TEST-KEY-1234',
-            'status': 'active',
-            'type': 'trial',
-            'created_at': created_at,
-            'duration_days': 5
+            'license': {
+                'id': 10,
+                'app_id': 1,
+                'license_key': 'TEST-KEY0-1234-ABCD',
+                'status': 'active',
+                'type': 'trial',
+                'created_at': created_at,
+                'duration_days': 5
+            },
+            'machine': None # First activation
         }
 
-        mock_get_machine.return_value = None # First activation
-        mock_requests.return_value.status_code = 500 # Geo fail
+        mock_activate.return_value = 1
 
         # Should not raise
         result = validate_license_request(self.payload, self.headers, self.ip)
@@ -6,48 +6,45 @@ import os
 # Ensure project root is in path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from services import app_registry
 from services.validation_service import validate_license_request
 
 class TestValidationService(unittest.TestCase):
     def setUp(self):
         self.payload = {
-            'license_key': 'TEST-KEY-1234',
+            'license_key': 'TEST-KEY0-1234-ABCD',
             'hwid': 'hwid-1234',
             'app_id': 1
         }
         self.headers = {'User-Agent': 'TestAgent'}
         self.ip = '127.0.0.1'
 
-    @patch('services.validation_service.requests.get')
-    @patch('services.validation_service.license_model.get_license_by_key')
-    @patch('services.validation_service.machine_model.get_machine_by_license_id')
-    @patch('services.validation_service.machine_model.add_machine')
+    def _record(self, status, machine=None):
+        return {
+            'license': {
+                'id': 10,
+                'app_id': 1,
+                'license_key': 'TEST-KEY0-1234-ABCD',
+                'status': status,
+                'type': 'lifetime',
+                'created_at': '2023-01-01',
+                'duration_days': None
+            },
+            'machine': machine
+        }
+
+    @patch('services.validation_service.telemetry_writer.record_activation')
+    @patch('services.validation_service.license_model.get_license_for_validation')
+    @patch('services.validation_service.license_model.activate_license')
     @patch('services.validation_service.license_model.update_license_status')
-    @patch('services.validation_service.tracking_model.log_activation')
     @patch('services.validation_service.hwid_parser.parse_hwid')
-    def test_validate_success_first_activation(self, mock_parse_hwid, mock_log_act, mock_update, mock_add_machine, mock_get_machine, mock_get_license, mock_requests_get):
+    def test_validate_success_first_activation(self, mock_parse_hwid, mock_update, mock_activate, mock_get_record, mock_record_act):
         # Setup mocks
         mock_parse_hwid.return_value = 'normalized-hwid'
 
-        # License found, active
-        mock_get_license.return_value = {
-            'id': 10,
-            'app_id': 1,
-            'license_key': 'TEST-KEY-1234',
-            'status': 'active',
-            'type': 'lifetime',
-            'created_at': '2023-01-01',
-            'duration_days': None
-        }
-
-        # No machine bound yet
-        mock_get_machine.return_value = None
-
-        # Mock geolocation
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {'status': 'success', 'country': 'US', 'city': 'New York'}
-        mock_requests_get.return_value = mock_response
+        # License found, active, no machine bound yet
+        mock_get_record.return_value = self._record('active')
+        mock_activate.return_value = 99
 
         # Execute
         result = validate_license_request(self.payload, self.headers, self.ip)
@@ -56,43 +53,111 @@ class TestValidationService(unittest.TestCase):
         self.assertEqual(result['license_id'], 10)
         self.assertEqual(result['hwid'], 'normalized-hwid')
 
-        # Check side effects
-        mock_add_machine.assert_called_with(10, 'normalized-hwid')
-        mock_update.assert_called_with(10, 'used')
-        mock_log_act.assert_called()
+        # Binding and status change go out in one call, the activation log is buffered
+        # with a pending location that is resolved in the background
+        mock_activate.assert_called_once_with(10, 'normalized-hwid')
+        mock_record_act.assert_called_once_with(10, self.ip, 'normalized-hwid', 'TestAgent', None, None)
+        mock_update.assert_not_called()
+        mock_get_record.assert_called_once_with('TEST-KEY0-1234-ABCD')
 
-    @patch('services.validation_service.requests.get')
-    @patch('services.validation_service.license_model.get_license_by_key')
-    @patch('services.validation_service.machine_model.get_machine_by_license_id')
-    @patch('services.validation_service.tracking_model.log_failed_attempt')
+    @patch('services.validation_service.telemetry_writer.record_activation')
+    @patch('services.validation_service.license_model.get_license_for_validation')
+    @patch('services.validation_service.license_model.activate_license')
+    @patch('services.validation_service.license_model.update_license_status')
     @patch('services.validation_service.hwid_parser.parse_hwid')
-    def test_validate_fail_hwid_mismatch(self, mock_parse_hwid, mock_log_fail, mock_get_machine, mock_get_license, mock_requests_get):
+    def test_validate_revalidation_needs_no_writes(self, mock_parse_hwid, mock_update, mock_activate, mock_get_record, mock_record_act):
         mock_parse_hwid.return_value = 'normalized-hwid'
+        mock_get_record.return_value = self._record('used', {'hwid': 'normalized-hwid'})
 
-        mock_get_license.return_value = {
-            'id': 10,
-            'app_id': 1,
-            'license_key': 'TEST-KEY-1234',
-            'status': 'used',
-            'type': 'lifetime',
-            'created_at': '2023-01-01',
-            'duration_days': None
-        }
+        result = validate_license_request(self.payload, self.headers, self.ip)
+
+        self.assertEqual(result['license_id'], 10)
+        mock_activate.assert_not_called()
+        mock_update.assert_not_called()
+
+    @patch('services.validation_service.telemetry_writer.record_activation')
+    @patch('services.validation_service.license_model.get_license_for_validation')
+    @patch('services.validation_service.license_model.activate_license')
+    @patch('services.validation_service.telemetry_writer.record_failed_attempt')
+    @patch('services.validation_service.hwid_parser.parse_hwid')
+    def test_validate_activation_race_rechecks_binding(self, mock_parse_hwid, mock_log_fail, mock_activate, mock_get_record, mock_record_act):
+        mock_parse_hwid.return_value = 'normalized-hwid'
+
+        # Another request bound the license to a different machine in between
+        mock_get_record.side_effect = [
+            self._record('active'),
+            self._record('used', {'hwid': 'other-hwid'})
+        ]
+        mock_activate.return_value = None
+
+        with self.assertRaises(ValueError) as cm:
+            validate_license_request(self.payload, self.headers, self.ip)
+
+        self.assertIn("License is already used on another machine", str(cm.exception))
+        mock_log_fail.assert_called_with(
+            1, 'TEST-KEY0-1234-ABCD', self.ip, 'normalized-hwid', 'TestAgent', None, None, 'already_used_elsewhere'
+        )
+
+    @patch('services.validation_service.telemetry_writer.record_activation')
+    @patch('services.validation_service.license_model.get_license_for_validation')
+    @patch('services.validation_service.telemetry_writer.record_failed_attempt')
+    @patch('services.validation_service.hwid_parser.parse_hwid')
+    def test_validate_fail_hwid_mismatch(self, mock_parse_hwid, mock_log_fail, mock_get_record, mock_record_act):
+        mock_parse_hwid.return_value = 'normalized-hwid'
 
         # Bound to DIFFERENT hwid
-        mock_get_machine.return_value = {'hwid': 'other-hwid'}
+        mock_get_record.return_value = self._record('used', {'hwid': 'other-hwid'})
 
         with self.assertRaises(ValueError) as cm:
             validate_license_request(self.payload, self.headers, self.ip)
 
         self.assertIn("License is already used on another machine", str(cm.exception))
-        # Note: log_failed_attempt args might have changed or I need to be careful with arguments.
-        # In validation_service:
-        # tracking_model.log_failed_attempt(app_id, license_key, client_ip, normalized_hwid, user_agent, country, city, "already_used_elsewhere")
-        # In test:
         mock_log_fail.assert_called_with(
-            1, 'TEST-KEY-1234', self.ip, 'normalized-hwid', 'TestAgent', 'Unknown', 'Unknown', 'already_used_elsewhere'
+            1, 'TEST-KEY0-1234-ABCD', self.ip, 'normalized-hwid', 'TestAgent', None, None, 'already_used_elsewhere'
+        )
+
+    @patch('services.validation_service.app_registry.get_app')
+    @patch('services.validation_service.license_model.get_license_for_validation')
+    @patch('services.validation_service.telemetry_writer.record_failed_attempt')
+    @patch('services.validation_service.hwid_parser.parse_hwid')
+    def test_not_found_logged_only_for_known_apps(self, mock_parse_hwid, mock_log_fail, mock_get_record, mock_get_app):
+        mock_parse_hwid.return_value = 'normalized-hwid'
+        mock_get_record.return_value = None
+
+        mock_get_app.return_value = None
+        with self.assertRaises(ValueError):
+            validate_license_request(self.payload, self.headers, self.ip)
+        mock_log_fail.assert_not_called()
+
+        mock_get_app.return_value = {'id': 1, 'name': 'App', 'app_secret': 'secret'}
+        with self.assertRaises(ValueError):
+            validate_license_request(self.payload, self.headers, self.ip)
+        mock_log_fail.assert_called_once_with(
+            1, 'TEST-KEY0-1234-ABCD', self.ip, 'normalized-hwid', 'TestAgent', None, None, 'license_not_found'
         )
 
+    @patch('services.validation_service.telemetry_writer.record_failed_attempt')
+    @patch('services.validation_service.license_model.get_license_for_validation')
+    @patch('services.validation_service.geolocation.resolve_inline')
+    def test_malformed_keys_rejected_before_any_io(self, mock_resolve, mock_get_record, mock_record_fail):
+        app_registry.clear()
+        try:
+            app_registry.remember(2, {'id': 2, 'name': 'App2', 'app_secret': 's', 'key_format': 2})
+
+            for payload in (
+                dict(self.payload, license_key='NOT-A-KEY'),
+                dict(self.payload, license_key='ABCD-EFGH-IJKL-MNOP-QRST'),  # Wrong checksum
+                dict(self.payload, license_key='ABCD-EFGH-IJKL-MNOP', app_id=2),  # Plain key for a checksum app
+            ):
+                with self.assertRaises(ValueError) as context:
+                    validate_license_request(payload, self.headers, self.ip)
+                self.assertEqual(str(context.exception), "Invalid license key format.")
+        finally:
+            app_registry.clear()
+
+        mock_resolve.assert_not_called()
+        mock_get_record.assert_not_called()
+        mock_record_fail.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
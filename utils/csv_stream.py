@@ -0,0 +1,26 @@
+import csv
+import io
+
+def stream_csv(header, row_chunks):
+    """
+    Renders CSV incrementally, one string per chunk of rows, so that large
+    exports can be streamed without building the whole file in memory.
+
+    Args:
+        header (list): The column names.
+        row_chunks (iterable): Iterable of lists of rows (sequences of values).
+
+    Yields:
+        str: The header line, then the CSV lines of each chunk.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(header)
+    yield buffer.getvalue()
+
+    for rows in row_chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
@@ -0,0 +1,16 @@
+import json
+
+def stream_ndjson(columns, row_chunks):
+    """
+    Renders newline-delimited JSON incrementally, one string per chunk of rows,
+    so that large exports can be streamed without building the whole file in memory.
+
+    Args:
+        columns (list): The keys of each object, in row order.
+        row_chunks (iterable): Iterable of lists of rows (sequences of JSON serializable values).
+
+    Yields:
+        str: One JSON object per line for each row of a chunk.
+    """
+    for rows in row_chunks:
+        yield ''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
@@ -1,25 +1,40 @@
-def generate_client_snippet(app_id, api_url="http://localhost:5000"):
+from pprint import pformat
+
+def generate_client_snippet(app_id, api_url="http://localhost:5000", jwks=None):
     """
     Generates a Python client script for license validation.
 
+    The app's public keys are embedded in the script: they are the trust anchor
+    of offline validation, and must never come from the writable token cache.
+
     Args:
         app_id (str): The ID of the application.
         api_url (str): The base URL of the KeyPilot API.
+        jwks (dict, optional): The app's JWKS document (see signing_keys.get_jwks).
 
     Returns:
         str: The complete Python client code.
     """
+    trusted_jwks = pformat(jwks or {'keys': []})
     snippet = f"""import requests
 import subprocess
 import platform
 import uuid
+import hashlib
 import jwt
 import json
+import os
 import sys
 
 # Configuration
 API_URL = "{api_url}"
 APP_ID = "{app_id}"
+# The app's public keys when this script was generated. Tokens are only ever
+# verified offline against these: the cache file is writable by anyone who
+# can run the program, so keys read from it could be the attacker's own
+TRUSTED_JWKS = {trusted_jwks}
+# Last token, so the license can be checked offline
+CACHE_FILE = os.path.join(os.path.expanduser("~"), f".keypilot_{{APP_ID}}.json")
 
 def get_hwid():
     \"\"\"
@@ -38,11 +53,66 @@ def get_hwid():
     except Exception:
         return str(uuid.getnode())
 
+def load_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except Exception:
+        return {{}}
+
+def save_cache(cache):
+    try:
+        with open(CACHE_FILE, "w") as f:
+            json.dump(cache, f)
+    except Exception:
+        pass
+
+def fetch_jwks():
+    \"\"\"
+    Downloads the public keys that verify this app's tokens, e.g. after a key
+    rotation. Only over TLS, and they are never cached.
+    \"\"\"
+    if not API_URL.startswith("https://"):
+        return {{"keys": []}}
+    response = requests.get(f"{{API_URL}}/api/v1/apps/{{APP_ID}}/jwks", timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+def verify_token(token, jwks, hwid):
+    \"\"\"
+    Verifies a token locally: signature, expiration, app and machine.
+    Returns the decoded claims, or None if the token cannot be trusted.
+    \"\"\"
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+        for key in jwks.get("keys", []):
+            if key.get("kid") == kid:
+                claims = jwt.decode(token, jwt.PyJWK(key).key, algorithms=[key["alg"]])
+                # The server binds tokens to the SHA-256 of the normalized HWID
+                if str(claims.get("app_id")) != APP_ID:
+                    return None
+                if claims.get("hwid") != hashlib.sha256(hwid.strip().lower().encode("utf-8")).hexdigest():
+                    return None
+                return claims
+    except jwt.InvalidTokenError:
+        pass
+    return None
+
 def validate_license(license_key):
     \"\"\"
-    Validates the license key against the KeyPilot API.
+    Validates the license key.
+    A cached token that still verifies against the embedded public keys is
+    accepted offline; otherwise the KeyPilot API is asked for a new one.
     \"\"\"
     hwid = get_hwid()
+    cache = load_cache()
+
+    if cache.get("license_key") == license_key and cache.get("token"):
+        decoded = verify_token(cache["token"], TRUSTED_JWKS, hwid)
+        if decoded:
+            print(f"License Valid (cached)! Data: {{decoded}}")
+            return True, decoded
+
     url = f"{{API_URL}}/api/v1/license/validate"
 
     payload = {{
@@ -61,9 +131,25 @@ def validate_license(license_key):
             token = data.get('token')
 
             if token:
-                # Decode without verification (client doesn't have the secret key)
-                # The server's 200 OK response is the primary validation.
-                decoded = jwt.decode(token, options={{"verify_signature": False}})
+                # Verify the signature with the embedded public keys, or with the
+                # server's current ones if the token was signed with a newer key
+                jwks = TRUSTED_JWKS
+                if not jwks.get("keys"):
+                    # Server signs with the app secret: the 200 OK response is the validation
+                    decoded = jwt.decode(token, options={{"verify_signature": False}})
+                    print(f"License Valid! Data: {{decoded}}")
+                    return True, decoded
+
+                decoded = verify_token(token, jwks, hwid)
+                if decoded:
+                    # Only tokens the embedded keys verify can be checked offline later
+                    save_cache({{"license_key": license_key, "token": token}})
+                else:
+                    decoded = verify_token(token, fetch_jwks(), hwid)
+                if not decoded:
+                    print("Error: Token signature could not be verified.")
+                    return False, None
+
                 print(f"License Valid! Data: {{decoded}}")
                 return True, decoded
             else: